@@ -31,21 +31,53 @@ LAYER IN THE HIERARCHY:
     NOT yet a multi-agent system (that's Phase 4+)
 """
 
+import asyncio
 import json
 import os
-from anthropic import Anthropic
-from tools import TOOL_DEFINITIONS, execute_tool
+import time
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from anthropic import Anthropic, AsyncAnthropic
+from anthropic.types import ToolUseBlock
+from cassette import wrap_async_client, wrap_client
+from checkpoints import delete_checkpoint, load_checkpoint, save_checkpoint
+from history import compact_history, content_to_dicts
+from prompt_cache import build_system, cached_tools, format_usage
+from result_encoding import encode_result
+from tools import (
+    TOOL_DEFINITIONS,
+    ToolTimeoutError,
+    execute_tool,
+    execute_tool_async,
+    prefetch_tool_calls,
+)
+from tracing import RunTrace
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Initialize the Anthropic client
 # WHY: The client handles auth (ANTHROPIC_API_KEY from .env) and HTTP
-client = Anthropic()
+# WHY wrap_client: lets cassette.py record/replay every call (ANTHROPIC_CASSETTE env)
+client = wrap_client(Anthropic())
+
+# Async twin for run_agent_async() — same auth, non-blocking HTTP
+# WHY a second client: one event loop can drive hundreds of in-flight agents
+# with this, instead of parking one OS thread per agent on network waits
+async_client = wrap_async_client(AsyncAnthropic())
 
 # The model to use — claude-sonnet-4-6 is the sweet spot: fast + capable
 MODEL = "claude-sonnet-4-6"
 
+# Model cascade — cheap model gathers data, MODEL writes the report
+# WHY: the early iterations only decide which tools to call. That's a routing
+# decision, the same kind apollo_tools.parse_prospect_query already hands to
+# Haiku. Paying Sonnet prices and latency for it is waste.
+ROUTER_MODEL = "claude-haiku-4-5-20251001"
+ROUTER_MAX_TOKENS = 1024  # Tool selection is short; hitting this means it started writing
+CASCADE = os.getenv("AGENT_CASCADE", "false").lower() in ("1", "true", "yes")
+
 # System prompts: one per mode
 # WHY this matters: The system prompt is your primary way to shape agent behavior.
 # Two modes allow one agent.py to serve both Bellissimo AI Labs and SustainCFO.
@@ -103,25 +135,280 @@ Start by introducing what you're about to do, then call your tools, then write t
 # Default mode — change to "xray" for SustainCFO financial deep-dives
 DEFAULT_MODE = "reveal"
 
+# Tool execution settings
+# WHY parallel: the model often requests all five financial tools in one turn.
+# Once those hit real QuickBooks/Xero APIs, running them one after another adds
+# their latencies together. A bounded thread pool makes the turn cost roughly
+# the slowest tool instead of the sum of all of them.
+PARALLEL_TOOLS = True
+TOOL_MAX_WORKERS = 5         # Upper bound on concurrent tool calls per turn
+# Per-tool timeouts and concurrency caps live with the tools (tools.TOOL_TIMEOUTS /
+# TOOL_CONCURRENCY) — a hung integration becomes an error result
+
+MAX_ITERATIONS = 10  # Safety limit — prevents infinite loops
+
+# History compaction (see history.py)
+# WHY: every iteration resends the full history, so old tool results are paid
+# for again and again. Past this many (estimated) tokens, old results are
+# shrunk to their headline numbers; the newest turn is always kept verbatim.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+
+# Prefetch mode — run every tool up front, then one model call writes the report
+# WHY: without it, X-Ray costs at least two full model round trips (one to ask
+# for the tools, one to write). Prefetching removes the first one. The normal
+# loop still runs afterwards, so the model can ask for anything that's missing.
+PREFETCH = os.getenv("AGENT_PREFETCH", "false").lower() in ("1", "true", "yes")
+
+# How tool results are written into the history: "json" or "compact" (tables, see
+# result_encoding.py). WHY: every result is resent on every later iteration, and
+# JSON repeats each key per row — compact writes it once.
+RESULT_FORMAT = os.getenv("AGENT_RESULT_FORMAT", "json")
+
+PREFETCH_NOTE = (
+    "All of this client's financial data has been pulled above. "
+    "Write the complete report now. Call a tool only if something essential is missing."
+)
+
+# Tool schemas with a prompt-cache breakpoint (see prompt_cache.py)
+# WHY: tools + system prompt are identical on every iteration of every run,
+# so after the first call they are read from cache instead of re-processed
+CACHED_TOOL_DEFINITIONS = cached_tools(TOOL_DEFINITIONS)
+
+
+ALL_TOOL_NAMES = frozenset(tool["name"] for tool in TOOL_DEFINITIONS)
+
+
+def _select_model(cascade: bool, tools_called: set) -> str:
+    """
+    Routing policy for one iteration.
+
+    The fast tier handles tool-gathering turns. Once every tool has been
+    called there is nothing left to gather — the next call writes the report,
+    so it goes straight to MODEL.
+    """
+    if cascade and not ALL_TOOL_NAMES <= tools_called:
+        return ROUTER_MODEL
+    return MODEL
+
+
+def _should_escalate(model: str, response) -> bool:
+    """
+    True when the fast tier tried to finish (end_turn) or ran out of tokens
+    mid-text. Its draft is discarded and the same request is re-sent to MODEL,
+    so the report itself is always written by the strong model.
+    """
+    return model != MODEL and response.stop_reason != "tool_use"
+
+
+def _request_kwargs(model: str, system_prompt: list[dict], messages: list[dict]) -> dict:
+    """Arguments for messages.create()/stream() — identical for every tier but max_tokens."""
+    return {
+        "model": model,
+        "max_tokens": ROUTER_MAX_TOKENS if model == ROUTER_MODEL else 4096,
+        "system": system_prompt,
+        "tools": CACHED_TOOL_DEFINITIONS,
+        "messages": messages,
+    }
+
+
+def _system_prompt_for(mode: str) -> list[dict]:
+    """Select the system prompt for a mode ("xray" or "reveal"), as cached blocks."""
+    return build_system(XRAY_SYSTEM_PROMPT if mode == "xray" else REVEAL_SYSTEM_PROMPT)
+
+
+def _initial_messages(client_name: str, context: str) -> list[dict]:
+    """Build the opening user message that starts every diagnostic."""
+    user_message = f"Run a full Business X-Ray diagnostic for: {client_name}"
+    if context:
+        user_message += f"\n\nAdditional context: {context}"
+    return [{"role": "user", "content": user_message}]
+
+
+def _final_text(response) -> str:
+    """Concatenate the text blocks of an end_turn response."""
+    final_text = ""
+    for block in response.content:
+        if hasattr(block, "text"):
+            final_text += block.text
+    return final_text
+
+
+def _prefetch_calls(client_name: str) -> list[ToolUseBlock]:
+    """The prefetch tool calls as tool_use blocks, as if the model had asked for them."""
+    return [
+        ToolUseBlock(type="tool_use", id=f"toolu_prefetch_{i}", name=call["name"], input=call["input"])
+        for i, call in enumerate(prefetch_tool_calls(client_name))
+    ]
 
-def run_agent(client_name: str, context: str = "", mode: str = DEFAULT_MODE) -> str:
+
+def _prefetch_turn(tool_calls: list, tool_results: list[dict]) -> list[dict]:
+    """
+    The assistant tool_use turn + user tool_result turn that carry prefetched data.
+
+    WHY this shape (not pasting JSON into the prompt): it is exactly what the
+    history would look like had the model called the tools itself, so the
+    tool contract, the prompts and history compaction all work unchanged.
+    """
+    return [
+        {"role": "assistant", "content": content_to_dicts(tool_calls)},
+        {"role": "user", "content": tool_results + [{"type": "text", "text": PREFETCH_NOTE}]},
+    ]
+
+
+def _checkpoint(
+    job_id: Optional[str],
+    client_name: str,
+    context: str,
+    mode: str,
+    iteration: int,
+    messages: list[dict],
+    tools_called: set,
+    trace: RunTrace,
+):
+    """
+    Save state after a completed turn (no-op without a job_id).
+    See checkpoints.py — a restart resumes here instead of from iteration 1.
+    """
+    if not job_id:
+        return
+    save_checkpoint(job_id, {
+        "client_name": client_name,
+        "context": context,
+        "mode": mode,
+        "iteration": iteration,
+        "messages": messages,
+        "tools_called": sorted(tools_called),
+        "trace_iterations": trace.iterations,
+        "history_tokens_saved": trace.history_tokens_saved,
+    })
+
+
+def _resume(job_id: Optional[str], trace: RunTrace) -> Optional[tuple[list[dict], int, set]]:
+    """
+    Load a job's checkpoint: (messages, iteration, tools_called), or None to start fresh.
+    The trace picks up the records from before the interruption.
+    """
+    state = load_checkpoint(job_id) if job_id else None
+    if state is None:
+        return None
+    trace.restore(state["trace_iterations"], state["history_tokens_saved"], state["iteration"])
+    print(f"[checkpoint] Resuming {job_id} after iteration {state['iteration']}")
+    return state["messages"], state["iteration"], set(state["tools_called"])
+
+
+def _tool_result(tool_use_id: str, result, is_error: bool = False) -> dict:
+    """Build one tool_result content block for the next user message."""
+    block = {
+        "type": "tool_result",
+        "tool_use_id": tool_use_id,
+        "content": encode_result(result, RESULT_FORMAT),
+    }
+    if is_error:
+        # WHY is_error: tells the model the call failed so it can flag the data gap
+        # in the report instead of treating the error text as real data
+        block["is_error"] = True
+    return block
+
+
+def _timed_execute_tool(tool_name: str, tool_input: dict):
+    """
+    Run one tool and return (result, is_error, wall_seconds) — used for the run trace.
+
+    A failure becomes an error result here, in the thread that ran the tool, so
+    its wall time is that call's own — not time since the batch was submitted.
+    """
+    started = time.monotonic()
+    try:
+        return execute_tool(tool_name, tool_input), False, time.monotonic() - started
+    except ToolTimeoutError as e:
+        return {"error": str(e)}, True, time.monotonic() - started
+    except Exception as e:
+        return {"error": f"{tool_name} failed: {e}"}, True, time.monotonic() - started
+
+
+def _execute_tool_calls(
+    tool_calls: list,
+    parallel: bool = PARALLEL_TOOLS,
+    trace: Optional[RunTrace] = None,
+    record: Optional[dict] = None,
+) -> list[dict]:
+    """
+    Execute every tool_use block from one response and return tool_result blocks.
+
+    Results come back in the same order as tool_calls, so each tool_result lines
+    up with its tool_use_id no matter which tool finished first.
+    A tool that raises or exceeds its timeout (tools.TOOL_TIMEOUTS) becomes an
+    error tool_result — one broken integration never aborts the whole run.
+    Per-tool wall times go to trace/record when given.
+    """
+    for block in tool_calls:
+        print(f"  -> Tool call: {block.name}({json.dumps(block.input)})")
+
+    turn_started = time.monotonic()
+
+    # (result, is_error, wall_seconds) in tool_use order
+    if not parallel or len(tool_calls) < 2:
+        outcomes = [_timed_execute_tool(block.name, block.input) for block in tool_calls]
+    else:
+        # execute_tool() enforces each tool's own timeout, so every future
+        # resolves by its deadline — a hung tool surfaces as an error result
+        executor = ThreadPoolExecutor(max_workers=min(TOOL_MAX_WORKERS, len(tool_calls)))
+        try:
+            futures = [
+                executor.submit(_timed_execute_tool, block.name, block.input)
+                for block in tool_calls
+            ]
+            outcomes = [future.result() for future in futures]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    tool_results = []
+    for block, (result, is_error, wall) in zip(tool_calls, outcomes):
+        print(f"  <- Result: {str(result)[:100]}...")  # truncate for readability
+        tool_results.append(_tool_result(block.id, result, is_error=is_error))
+        if trace and record is not None:
+            trace.record_tool(record, block.name, block.id, wall, is_error)
+    if trace and record is not None:
+        trace.record_tool_turn(record, time.monotonic() - turn_started)
+    return tool_results
+
+
+def run_agent(
+    client_name: str,
+    context: str = "",
+    mode: str = DEFAULT_MODE,
+    parallel_tools: bool = PARALLEL_TOOLS,
+    return_trace: bool = False,
+    prefetch: bool = PREFETCH,
+    cascade: bool = CASCADE,
+    job_id: Optional[str] = None,
+):
     """
     Run the Bellissimo diagnostic agent for a given client.
 
     Args:
-        client_name: Name of the business to diagnose
-        context:     Optional additional context from the user
-        mode:        "reveal" (Bellissimo full diagnostic) or "xray" (SustainCFO financial)
+        client_name:    Name of the business to diagnose
+        context:        Optional additional context from the user
+        mode:           "reveal" (Bellissimo full diagnostic) or "xray" (SustainCFO financial)
+        parallel_tools: Run the tool calls from one turn concurrently (default True)
+        return_trace:   Also return the per-iteration trace (see tracing.py)
+        prefetch:       Run every tool before the first model call so the report can
+                        come back in one call (the loop below remains the fallback)
+        cascade:        Tool-gathering turns on ROUTER_MODEL, the report on MODEL
+                        (per-tier latency/cost in the trace's "tiers")
+        job_id:         Checkpoint after every turn under this id, and resume from
+                        an existing checkpoint for it (see checkpoints.py)
 
     Returns:
-        The agent's final analysis as a string
+        The agent's final analysis as a string,
+        or (final_text, trace_dict) when return_trace=True
 
     HOW THE LOOP WORKS:
         messages starts with the user request.
         Each iteration: send to API → check stop reason
         If stop_reason == "tool_use":
             - Extract all tool_use blocks from the response
-            - Execute each tool
+            - Execute them (concurrently when parallel_tools is on)
             - Append assistant message (with tool_use blocks) to messages
             - Append user message (with tool_result blocks) to messages
             - Loop again
@@ -130,93 +417,387 @@ def run_agent(client_name: str, context: str = "", mode: str = DEFAULT_MODE) ->
     """
 
     # Select system prompt based on mode
-    system_prompt = XRAY_SYSTEM_PROMPT if mode == "xray" else REVEAL_SYSTEM_PROMPT
-
-    # Build the initial user message
-    user_message = f"Run a full Business X-Ray diagnostic for: {client_name}"
-    if context:
-        user_message += f"\n\nAdditional context: {context}"
+    system_prompt = _system_prompt_for(mode)
 
     # messages is the conversation history we maintain ourselves
     # WHY: The API is stateless — we must send full history every call
-    messages = [{"role": "user", "content": user_message}]
+    messages = _initial_messages(client_name, context)
 
     print(f"\n{'='*60}")
     print(f"Business X-Ray Agent - {client_name}")
     print(f"{'='*60}\n")
 
-    # THE AGENT LOOP
+    # One record per iteration: latency, tokens, stop_reason, tool wall times
+    trace = RunTrace(client_name, mode, primary_model=MODEL)
+    tools_called: set[str] = set()  # Drives the cascade's routing decision
     iteration = 0
-    max_iterations = 10  # Safety limit — prevents infinite loops
+
+    # RESUME: an interrupted run continues from its last completed turn
+    resumed = _resume(job_id, trace)
+    if resumed:
+        messages, iteration, tools_called = resumed
+
+    # PREFETCH: all tools concurrently, before the model is ever called
+    elif prefetch:
+        print("[Prefetch] Running all tools before the first model call...")
+        record = trace.start_iteration(0, "prefetch")
+        tool_calls = _prefetch_calls(client_name)
+        tool_results = _execute_tool_calls(tool_calls, parallel=True, trace=trace, record=record)
+        messages.extend(_prefetch_turn(tool_calls, tool_results))
+        tools_called.update(block.name for block in tool_calls)
+        _checkpoint(job_id, client_name, context, mode, iteration, messages, tools_called, trace)
+
+    # THE AGENT LOOP
+    max_iterations = MAX_ITERATIONS
 
     while iteration < max_iterations:
         iteration += 1
-        print(f"[Loop iteration {iteration}] Calling API...")
+
+        # Keep the resent history under budget before paying for it again
+        saved = compact_history(messages, HISTORY_TOKEN_BUDGET)
+        if saved:
+            trace.history_tokens_saved += saved
+            print(f"  [history] compacted old tool results (~{saved} tokens)")
+
+        model = _select_model(cascade, tools_called)
+        print(f"[Loop iteration {iteration}] Calling API ({model})...")
+        record = trace.start_iteration(iteration, model)
 
         # Send messages + tool definitions to the model
         # WHY tools param: tells the model what tools exist and their schemas
-        response = client.messages.create(
-            model=MODEL,
-            max_tokens=4096,
-            system=system_prompt,
-            tools=TOOL_DEFINITIONS,
-            messages=messages,
-        )
+        # WHY cached: system + tools carry cache breakpoints — repeat calls read them from cache
+        started = time.monotonic()
+        response = client.messages.create(**_request_kwargs(model, system_prompt, messages))
+        trace.record_response(record, response, time.monotonic() - started)
+
+        # CASCADE: the fast tier only gathers data — if it tries to write, redo on MODEL
+        if _should_escalate(model, response):
+            print(f"  [cascade] {model} stopped with {response.stop_reason} — escalating to {MODEL}")
+            record["discarded"] = True
+            record = trace.start_iteration(iteration, MODEL)
+            started = time.monotonic()
+            response = client.messages.create(**_request_kwargs(MODEL, system_prompt, messages))
+            trace.record_response(record, response, time.monotonic() - started)
 
         print(f"[Loop iteration {iteration}] stop_reason={response.stop_reason}")
+        print(f"  {format_usage(f'iteration {iteration}', response.usage)}")
 
         # CASE 1: Model wants to use tools
         if response.stop_reason == "tool_use":
             # Collect all tool calls from this response
-            # WHY loop: model can request multiple tools in one turn
-            tool_results = []
+            # WHY list: model can request multiple tools in one turn
+            tool_calls = [block for block in response.content if block.type == "tool_use"]
 
-            for block in response.content:
-                if block.type == "tool_use":
-                    tool_name = block.name
-                    tool_input = block.input
-                    tool_use_id = block.id
-
-                    print(f"  -> Tool call: {tool_name}({json.dumps(tool_input)})")
-
-                    # Execute the tool (calls functions in tools.py)
-                    result = execute_tool(tool_name, tool_input)
-
-                    print(f"  <- Result: {str(result)[:100]}...")  # truncate for readability
-
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": tool_use_id,
-                        "content": json.dumps(result),
-                    })
+            # Execute the tools (calls functions in tools.py)
+            tool_results = _execute_tool_calls(
+                tool_calls, parallel=parallel_tools, trace=trace, record=record
+            )
+            tools_called.update(block.name for block in tool_calls)
 
             # Append the assistant's response (with tool_use blocks) to history
-            messages.append({"role": "assistant", "content": response.content})
+            # WHY dicts: plain dicts can be measured and compacted (history.py)
+            messages.append({"role": "assistant", "content": content_to_dicts(response.content)})
 
             # Append tool results as a user message
             # WHY role=user: the API requires tool results come from the "user" turn
             messages.append({"role": "user", "content": tool_results})
+            _checkpoint(job_id, client_name, context, mode, iteration, messages, tools_called, trace)
 
             # Loop again — model will now process tool results
 
         # CASE 2: Model is done
         elif response.stop_reason == "end_turn":
             # Extract the final text response
-            final_text = ""
-            for block in response.content:
-                if hasattr(block, "text"):
-                    final_text += block.text
+            final_text = _final_text(response)
+            trace.finish("completed")
+            if job_id:
+                delete_checkpoint(job_id)
 
-            print(f"\n[Agent complete after {iteration} iterations]\n")
-            return final_text
+            print(f"\n[Agent complete after {iteration} iterations]")
+            print(f"[history] ~{trace.history_tokens_saved} input tokens saved by compaction this run\n")
+            return (final_text, trace.to_dict()) if return_trace else final_text
 
         else:
             # Unexpected stop reason — surface it clearly
+            trace.finish("failed")
             raise ValueError(f"Unexpected stop_reason: {response.stop_reason}")
 
+    trace.finish("failed")
     raise RuntimeError(f"Agent exceeded max_iterations ({max_iterations}). Check for loops.")
 
 
+# =============================================================================
+# ASYNC AGENT LOOP — same contract, no thread per run
+# =============================================================================
+
+async def _run_tool_call_async(
+    block,
+    trace: Optional[RunTrace] = None,
+    record: Optional[dict] = None,
+) -> dict:
+    """
+    Run one tool_use block — execute_tool_async() applies the tool's own timeout
+    and concurrency cap. Same guarantee as the sync path: a failure becomes an
+    error tool_result. Cancelling the run cancels the call (see _stream_tool_turn).
+    """
+    started = time.monotonic()
+    try:
+        result = await execute_tool_async(block.name, block.input)
+        is_error = False
+    except ToolTimeoutError as e:
+        result = {"error": str(e)}
+        is_error = True
+    except Exception as e:
+        result = {"error": f"{block.name} failed: {e}"}
+        is_error = True
+    if trace and record is not None:
+        trace.record_tool(record, block.name, block.id, time.monotonic() - started, is_error)
+    print(f"  <- Result: {str(result)[:100]}...")  # truncate for readability
+    return _tool_result(block.id, result, is_error=is_error)
+
+
+async def _stream_tool_turn(
+    tool_calls: list,
+    trace: RunTrace,
+    record: dict,
+    tool_results: list,
+) -> AsyncIterator[dict]:
+    """
+    Run one turn's tool calls concurrently, yielding tool_call / tool_result events.
+
+    tool_result events arrive in completion order; `tool_results` is filled in
+    tool_use order once every call has finished, ready for the next request.
+    """
+    names = {block.id: block.name for block in tool_calls}
+
+    for block in tool_calls:
+        print(f"  -> Tool call: {block.name}({json.dumps(block.input)})")
+        yield {
+            "type": "tool_call",
+            "tool_use_id": block.id,
+            "name": block.name,
+            "input": block.input,
+        }
+
+    tools_started = time.monotonic()
+    tasks = [
+        asyncio.create_task(_run_tool_call_async(block, trace, record))
+        for block in tool_calls
+    ]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            tool_result = await finished
+            yield {
+                "type": "tool_result",
+                "tool_use_id": tool_result["tool_use_id"],
+                "name": names[tool_result["tool_use_id"]],
+                "is_error": tool_result.get("is_error", False),
+                "content": tool_result["content"],
+            }
+    finally:
+        # A consumer that stops listening (closed SSE connection) must not
+        # leave tool calls running in the background
+        for task in tasks:
+            task.cancel()
+
+    # tasks is in tool_use order — results line up with tool_use ids
+    tool_results.extend(task.result() for task in tasks)
+    trace.record_tool_turn(record, time.monotonic() - tools_started)
+
+
+async def _stream_model_call(
+    model: str,
+    system_prompt: list[dict],
+    messages: list[dict],
+    iteration: int,
+    trace: RunTrace,
+) -> AsyncIterator[dict]:
+    """
+    One streamed API call, traced. Yields text_delta events, then a final
+    {"type": "response", "record": ..., "response": ...} for the caller to consume.
+    """
+    record = trace.start_iteration(iteration, model)
+    started = time.monotonic()
+    first_token_at = None
+
+    # messages.stream() delivers text as it is generated; the final message
+    # (with tool_use blocks and usage) is assembled by the SDK at the end
+    async with async_client.messages.stream(
+        **_request_kwargs(model, system_prompt, messages)
+    ) as stream:
+        async for event in stream:
+            if event.type == "text":
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                yield {"type": "text_delta", "iteration": iteration, "text": event.text}
+        response = await stream.get_final_message()
+    trace.record_response(
+        record,
+        response,
+        time.monotonic() - started,
+        ttft_s=(first_token_at - started) if first_token_at else None,
+    )
+    yield {"type": "response", "record": record, "response": response}
+
+
+async def stream_agent(
+    client_name: str,
+    context: str = "",
+    mode: str = DEFAULT_MODE,
+    prefetch: bool = PREFETCH,
+    cascade: bool = CASCADE,
+    job_id: Optional[str] = None,
+) -> AsyncIterator[dict]:
+    """
+    Streaming version of the agent loop — yields events as the run happens.
+
+    Event types (each a plain dict with a "type" key):
+        {"type": "resumed",     "iteration": n}   (only when continuing a checkpoint)
+        {"type": "iteration",   "iteration": n}
+        {"type": "text_delta",  "iteration": n, "text": "..."}
+        {"type": "tool_call",   "tool_use_id", "name", "input"}
+        {"type": "tool_result", "tool_use_id", "name", "is_error", "content"}
+        {"type": "done",        "result": final_text, "iterations": n, "trace": {...}}
+
+    WHY STREAM:
+        A full run takes 30–60 seconds. Streaming puts the first bytes on a
+        dashboard within about a second: tool activity as it happens, then the
+        report token by token as the model writes it.
+
+    Tools in a turn still run concurrently — tool_result events arrive in
+    completion order, but the history sent back to the model keeps tool_use order.
+    With prefetch=True the tool events come first, before any model call.
+    With cascade=True text from a fast-tier call is only sent once it is
+    known not to be escalated. With a job_id it checkpoints and resumes
+    exactly like run_agent().
+    """
+    system_prompt = _system_prompt_for(mode)
+    messages = _initial_messages(client_name, context)
+
+    print(f"\n[stream] Business X-Ray Agent - {client_name}")
+
+    trace = RunTrace(client_name, mode, primary_model=MODEL)
+    tools_called: set[str] = set()
+    iteration = 0
+
+    resumed = _resume(job_id, trace)
+    if resumed:
+        messages, iteration, tools_called = resumed
+        yield {"type": "resumed", "iteration": iteration}
+
+    elif prefetch:
+        record = trace.start_iteration(0, "prefetch")
+        tool_calls = _prefetch_calls(client_name)
+        tool_results = []
+        async for event in _stream_tool_turn(tool_calls, trace, record, tool_results):
+            yield event
+        messages.extend(_prefetch_turn(tool_calls, tool_results))
+        tools_called.update(block.name for block in tool_calls)
+        _checkpoint(job_id, client_name, context, mode, iteration, messages, tools_called, trace)
+
+    while iteration < MAX_ITERATIONS:
+        iteration += 1
+
+        saved = compact_history(messages, HISTORY_TOKEN_BUDGET)
+        if saved:
+            trace.history_tokens_saved += saved
+            print(f"  [history] compacted old tool results (~{saved} tokens)")
+
+        model = _select_model(cascade, tools_called)
+        print(f"[Loop iteration {iteration}] Calling API ({model})...")
+        yield {"type": "iteration", "iteration": iteration}
+
+        # Fast-tier text is held back: if the call escalates, the client never
+        # sees a draft that MODEL is about to rewrite
+        held_back: list[dict] = []
+        async for event in _stream_model_call(model, system_prompt, messages, iteration, trace):
+            if event["type"] != "response":
+                if model == MODEL:
+                    yield event
+                else:
+                    held_back.append(event)
+                continue
+            record, response = event["record"], event["response"]
+
+        if _should_escalate(model, response):
+            print(f"  [cascade] {model} stopped with {response.stop_reason} — escalating to {MODEL}")
+            record["discarded"] = True
+            async for event in _stream_model_call(MODEL, system_prompt, messages, iteration, trace):
+                if event["type"] != "response":
+                    yield event
+                    continue
+                record, response = event["record"], event["response"]
+        else:
+            for event in held_back:
+                yield event
+
+        print(f"[Loop iteration {iteration}] stop_reason={response.stop_reason}")
+        print(f"  {format_usage(f'iteration {iteration}', response.usage)}")
+
+        if response.stop_reason == "tool_use":
+            tool_calls = [block for block in response.content if block.type == "tool_use"]
+            tool_results = []
+            async for event in _stream_tool_turn(tool_calls, trace, record, tool_results):
+                yield event
+            tools_called.update(block.name for block in tool_calls)
+
+            messages.append({"role": "assistant", "content": content_to_dicts(response.content)})
+            messages.append({"role": "user", "content": tool_results})
+            _checkpoint(job_id, client_name, context, mode, iteration, messages, tools_called, trace)
+
+        elif response.stop_reason == "end_turn":
+            trace.finish("completed")
+            if job_id:
+                delete_checkpoint(job_id)
+            print(f"\n[Agent complete after {iteration} iterations]")
+            print(f"[history] ~{trace.history_tokens_saved} input tokens saved by compaction this run\n")
+            yield {
+                "type": "done",
+                "result": _final_text(response),
+                "iterations": iteration,
+                "trace": trace.to_dict(),
+            }
+            return
+
+        else:
+            trace.finish("failed")
+            raise ValueError(f"Unexpected stop_reason: {response.stop_reason}")
+
+    trace.finish("failed")
+    raise RuntimeError(f"Agent exceeded max_iterations ({MAX_ITERATIONS}). Check for loops.")
+
+
+async def run_agent_async(
+    client_name: str,
+    context: str = "",
+    mode: str = DEFAULT_MODE,
+    return_trace: bool = False,
+    prefetch: bool = PREFETCH,
+    cascade: bool = CASCADE,
+    job_id: Optional[str] = None,
+):
+    """
+    Async version of run_agent() — same modes, same tools, same return value
+    (including (final_text, trace_dict) when return_trace=True).
+
+    WHY THIS EXISTS:
+        run_agent() blocks its thread for the whole 30–60 second run, almost all
+        of it waiting on the network. Wrapped in asyncio.to_thread(), every
+        in-flight diagnostic pins one thread-pool slot. This version awaits
+        AsyncAnthropic and execute_tool_async() instead, so the FastAPI server
+        can hold hundreds of concurrent runs on one event loop.
+
+    It drains stream_agent() and returns the final report — one async loop
+    to maintain, with or without a live consumer.
+    """
+    async for event in stream_agent(
+        client_name, context, mode, prefetch=prefetch, cascade=cascade, job_id=job_id
+    ):
+        if event["type"] == "done":
+            return (event["result"], event["trace"]) if return_trace else event["result"]
+    raise RuntimeError("Agent stream ended without a final report")
+
+
 def main():
     """Entry point — runs a demo diagnostic."""
     result = run_agent(
@@ -19,12 +19,77 @@ WHY THIS FILE EXISTS:
     - A form submission fires POST /scope → agent runs → result stored
     - A Zapier/Make webhook fires any agent on a schedule
     - You call GET /jobs/{id} from your phone to check the result
-    - Multiple agents run in parallel — no waiting in line
+    - Multiple agents run concurrently on one event loop — no waiting in line
 
 ASYNC JOB PATTERN:
     Agents take 30–60 seconds (multiple Anthropic API round-trips).
     Synchronous HTTP would time out webhooks and block the server.
     Instead: submit a job → get a job_id → poll GET /jobs/{id} until done.
+    Or stream it: GET /jobs/{id}/stream (Server-Sent Events) shows tool calls
+    and the report text as they happen.
+
+WAITING FOR COMPLETION (instead of polling):
+    GET /jobs/{id}?wait=30 holds the request until the job finishes or 30s
+    pass, then answers like a normal GET — one request, no poll-interval lag.
+    WS /ws/jobs pushes status transitions for any number of jobs over one
+    connection: send {"subscribe": ["xry_1234abcd", ...]}.
+
+JOB STORE:
+    Every job is a row in a SQLite file (job_store.py, JOB_DB), so GET /jobs
+    and GET /jobs/{id} survive restarts. Only the jobs this process is
+    running are held in memory; everything else is read back from disk, and
+    old jobs are purged on a retention policy — memory stays flat however
+    many jobs run.
+
+JOB QUEUE:
+    Submissions don't start an agent directly. They are "pending" rows in the
+    job store, which AGENT_WORKERS workers claim one at a time, so a burst of
+    50 webhooks runs at most AGENT_WORKERS agents at once instead of tripping
+    Anthropic's rate limits all together. AGENT_PRIORITIES puts X-Ray (paying
+    clients) ahead of Scope (prospects). Once JOB_QUEUE_MAX jobs are waiting,
+    new submissions get 429 with a Retry-After estimate. GET /health reports
+    the queue depth.
+
+SCALING OUT (several processes):
+    Because the queue is the store, any number of processes on the host can
+    share one JOB_DB: a job is claimed by exactly one worker (one atomic
+    UPDATE), and GET /jobs/{id}, ?wait=, /ws/jobs and cancel work from
+    whichever process a request lands on. For example, the API on 4 cores
+    and the agents in their own pool:
+
+        AGENT_WORKERS=0 uvicorn agent_server:app --workers 4 --port 8000
+        AGENT_WORKERS=8 python agent_server.py worker
+
+    Workers heartbeat their running jobs every few seconds. A job whose
+    worker went silent for JOB_STALE_SECONDS (crash, kill -9) is claimed by
+    another worker and continues from its checkpoint. Live stream detail
+    (tool calls, report text) comes from the process running the job; the
+    others stream its status changes and the final report.
+    All processes must share the JOB_DB file and AGENT_CHECKPOINT_DIR on
+    local disk — SQLite locking is not safe over a network filesystem.
+
+DUPLICATE SUBMISSIONS (singleflight):
+    Zapier retries and double-clicked forms send the same request twice.
+    A submission with the same agent, client and context (case/whitespace
+    normalized — job_store.request_key) as a pending/running job attaches to
+    that job instead of starting another run; one that matches a job which
+    completed within JOB_DEDUP_WINDOW_SECONDS gets that job's report.
+    Either way the response carries the existing job_id and "deduplicated": true.
+
+COMPLETION WEBHOOKS:
+    Add "callback_url" to a submission and the finished job — the same JSON
+    GET /jobs/{id} returns — is POSTed to it, so an integration needn't poll.
+    Deliveries go through a durable queue in the job store (webhooks.py):
+    retried with exponential backoff, a few at a time per process and per
+    host, and any process can deliver them. GET /webhooks/stats shows delivery
+    counts, failures and latency.
+
+CHECKPOINT / RESUME:
+    Every job checkpoints after each agent turn (checkpoints.py). A worker
+    that shuts down mid-run hands its jobs back to the queue, so a deploy
+    mid-run continues from the last completed turn instead of starting over.
+    A job that failed (e.g. an API error on iteration 6) can be continued
+    with POST /jobs/{id}/resume.
 
 DEPLOY TO RAILWAY:
     1. Push this repo to GitHub
@@ -33,24 +98,41 @@ DEPLOY TO RAILWAY:
     4. Railway detects requirements.txt and deploys automatically
     5. Your agents are live at https://your-app.railway.app
 
+TOOL PROFILING:
+    GET /tools/stats returns per-tool call counts, p50/p95/p99 latency, payload
+    size and error rate (tool_stats.py), plus the result cache's hit rate.
+    The orchestrator's /status command summarizes it.
+
 AUTHENTICATION:
     All endpoints (except /health and /) require:
     Header: X-API-Key: <SERVER_API_KEY from .env>
 """
 
+import argparse
 import asyncio
+import json
+import math
 import os
+import signal
+import socket
+import time
 import uuid
+from collections import deque
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, HttpUrl
 
-from agent import run_agent
+from agent import stream_agent
+from checkpoints import delete_checkpoint, list_checkpoints, load_checkpoint
+from job_store import TERMINAL_STATUSES, open_job_store, request_key
+from tools import TOOL_CACHE, TOOL_STATS
+from webhooks import WebhookDispatcher, stats as webhook_stats
 
 load_dotenv()
 
@@ -58,14 +140,96 @@ load_dotenv()
 # APP SETUP
 # =============================================================================
 
+SERVER_API_KEY = os.getenv("SERVER_API_KEY")
+
+# Resume jobs whose worker died mid-run (and checkpoints with no job row)
+RESUME_ON_STARTUP = os.getenv("AGENT_RESUME_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# How often finished jobs past the retention policy are deleted (seconds)
+PURGE_INTERVAL_SECONDS = 3600
+
+# Agents this process runs at once — the rest wait in the queue (0 = API only)
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "4"))
+
+# Identifies this process's claims in the job store
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Idle workers look for work this often; a submission to this process wakes them at once
+JOB_POLL_SECONDS = 1.0
+
+# Running jobs are marked alive this often — also how fast a cancel from another process lands
+HEARTBEAT_SECONDS = 5.0
+
+# A running job not heartbeated for this long has lost its worker and is claimed again
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+# Waiting jobs beyond this get 429 — a burst can't queue unbounded work
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "100"))
+
+# A repeat of a request that completed this recently returns that job (0 = off)
+JOB_DEDUP_WINDOW_SECONDS = float(os.getenv("JOB_DEDUP_WINDOW_SECONDS", "300"))
+
+# Lower runs first. X-Ray is paid client work; Scope is a prospect diagnostic.
+AGENT_PRIORITIES = {
+    "xray": 0,
+    "scope": 10,
+}
+
+
+async def _purge_periodically():
+    while True:
+        deleted = store.purge()
+        if deleted:
+            print(f"[server] Purged {deleted} finished jobs past retention")
+        await asyncio.sleep(PURGE_INTERVAL_SECONDS)
+
+
+async def _heartbeat_periodically():
+    """Keep this process's running jobs claimed, and stop any cancelled from another process."""
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        for job_id in store.heartbeat(WORKER_ID, list(jobs)):
+            job = jobs.get(job_id)
+            if job is not None and not job.cancel_requested:
+                job.cancel_requested = True
+                job.task.cancel()
+
+
+def _start_background(workers: int) -> list:
+    """Workers, heartbeats, webhook delivery and retention — everything a process runs besides HTTP."""
+    global _work_available, _webhooks
+    _work_available = asyncio.Event()
+    _webhooks = WebhookDispatcher(store, lambda record: JobStatusResponse(**record).model_dump())
+    if RESUME_ON_STARTUP:
+        resume_interrupted_jobs()
+    tasks = [asyncio.create_task(_worker(n)) for n in range(workers)]
+    tasks.append(asyncio.create_task(_heartbeat_periodically()))
+    tasks.append(asyncio.create_task(_webhooks.run()))
+    tasks.append(asyncio.create_task(_purge_periodically()))
+    return tasks
+
+
+async def _stop_background(tasks: list):
+    # Cancelling a worker cancels the job it is running; the job goes back to the queue
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = _start_background(AGENT_WORKERS)
+    yield
+    await _stop_background(tasks)
+
+
 app = FastAPI(
     title="Bellissimo Agent Server",
     description="Always-on AI agents for Bellissimo AI Labs and SustainCFO",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-SERVER_API_KEY = os.getenv("SERVER_API_KEY")
-
 
 # =============================================================================
 # AUTHENTICATION
@@ -90,22 +254,46 @@ def require_api_key(x_api_key: str = Header(...)):
 @dataclass
 class Job:
     """
-    Represents one agent run — from submission through completion.
-    WHY dataclass: simple, no ORM needed for MVP. Swap for Redis/DB later.
+    The live state of one agent run in this process.
+
+    The persistent fields (everything up to trace) are mirrored to the job
+    store on every status change; the rest only exists while the run does.
     """
     job_id: str
     agent: str                    # "reveal" or "xray"
     client_name: str
     context: str
-    status: str                   # "pending" | "running" | "completed" | "failed"
+    status: str                   # "pending" | "running" | "completed" | "failed" | "cancelled"
     submitted_at: str
     completed_at: Optional[str] = None
     result: Optional[str] = None
     error: Optional[str] = None
+    trace: Optional[dict] = None  # Per-iteration latency/token trace (tracing.py)
 
+    # Live event log for GET /jobs/{id}/stream — agent events plus status changes
+    events: List[dict] = field(default_factory=list, repr=False)
+    # Wakes stream readers when a new event arrives
+    updated: asyncio.Condition = field(default_factory=asyncio.Condition, repr=False)
+    # Set once the job reaches a terminal status — GET /jobs/{id}?wait= blocks on it
+    finished: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    # Handed back to the queue at shutdown — listeners follow it in the store from here
+    requeued: bool = False
+    # The asyncio task running the agent — cancelled by POST /jobs/{id}/cancel
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    cancel_requested: bool = False
 
-# In-memory job store — survives for the lifetime of the server process.
-# Upgrade path: replace with Redis or a SQLite file for persistence.
+
+# External agent name -> internal agent.py mode ("scope" is the brand name for "reveal")
+AGENT_MODES = {"scope": "reveal", "xray": "xray"}
+
+# External agent name -> job_id prefix
+JOB_ID_PREFIXES = {"scope": "scp", "xray": "xry"}
+
+# Every job ever submitted (until retention purges it) — survives restarts
+store = open_job_store()
+
+# Jobs running in this process only. A job leaves this dict when it finishes;
+# jobs that are queued, finished or running in another process are read from the store.
 jobs: Dict[str, Job] = {}
 
 
@@ -114,6 +302,16 @@ def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+async def _publish(job: Job, event: dict):
+    """Append an event to the job's log and wake every stream reader (and waiter, when it's over)."""
+    async with job.updated:
+        job.events.append(event)
+        job.updated.notify_all()
+    if event["type"] == "status" and event["status"] in TERMINAL_STATUSES:
+        job.finished.set()
+        _notify_webhooks()
+
+
 # =============================================================================
 # PYDANTIC MODELS
 # =============================================================================
@@ -121,6 +319,7 @@ def _now() -> str:
 class AgentRequest(BaseModel):
     client_name: str
     context: str = ""
+    callback_url: Optional[HttpUrl] = None   # POSTed the finished job (webhooks.py)
 
 
 class JobSubmittedResponse(BaseModel):
@@ -130,6 +329,7 @@ class JobSubmittedResponse(BaseModel):
     client_name: str
     submitted_at: str
     poll_url: str
+    deduplicated: bool = False    # True = an identical request's existing job, not a new run
 
 
 class JobStatusResponse(BaseModel):
@@ -141,6 +341,7 @@ class JobStatusResponse(BaseModel):
     completed_at: Optional[str]
     result: Optional[str]
     error: Optional[str]
+    trace: Optional[dict] = None
 
 
 # =============================================================================
@@ -149,31 +350,348 @@ class JobStatusResponse(BaseModel):
 
 async def run_agent_background(job_id: str, mode: str):
     """
-    Runs the agent in a thread pool so the event loop stays unblocked.
-
-    WHY asyncio.to_thread():
-        run_agent() is synchronous — it makes sequential blocking HTTP calls
-        to the Anthropic API. asyncio.to_thread() runs it in a thread pool,
-        so the FastAPI event loop can handle other requests while agents run.
-        Multiple agents run truly in parallel this way.
+    Runs the agent directly on the server's event loop.
+
+    WHY the async agent (not asyncio.to_thread(run_agent)):
+        The sync agent holds a thread-pool slot for the whole 30–60 second run,
+        almost all of it spent waiting on the Anthropic API. The default pool
+        is small, so a burst of submissions used to queue behind each other.
+        The async agent only yields to the loop while waiting, so hundreds of
+        runs can be in flight at once with no thread-pool exhaustion.
+
+    WHY stream_agent():
+        Every event is appended to job.events as it happens, so
+        GET /jobs/{id}/stream can show progress long before the run finishes.
+
+    WHY job_id is passed through:
+        The agent checkpoints under it after every turn. If this process dies,
+        the worker that reclaims the job resumes it from that checkpoint.
+
+    CANCELLATION:
+        Cancelling the task unwinds stream_agent(): the open Anthropic stream is
+        closed and in-flight tool calls are cancelled, so an abandoned job stops
+        making outbound calls. A user cancel also drops the checkpoint; a
+        shutdown keeps it and hands the job back to the queue. Listeners then
+        get a non-terminal {"status": "pending", "requeued": true} event —
+        the job isn't over, it resumes on another worker.
     """
-    job = jobs[job_id]
-    job.status = "running"
+    job = jobs[job_id]  # Already "running" in the store — the worker claimed it
+    await _publish(job, {"type": "status", "status": "running"})
+    interrupted = False
 
     try:
-        result = await asyncio.to_thread(
-            run_agent,
-            job.client_name,
-            job.context,
-            mode,
-        )
+        async for event in stream_agent(job.client_name, job.context, mode, job_id=job_id):
+            if event["type"] == "done":
+                job.result = event["result"]
+                job.trace = event["trace"]
+            await _publish(job, event)
+        if job.result is None:
+            raise RuntimeError("Agent stream ended without a final report")
         job.status = "completed"
-        job.result = result
+    except asyncio.CancelledError:
+        if job.cancel_requested:
+            job.status = "cancelled"
+            delete_checkpoint(job_id)
+        else:
+            interrupted = True
+            raise  # Shutdown — keep the checkpoint; the next worker resumes from it
     except Exception as e:
         job.status = "failed"
         job.error = str(e)
     finally:
-        job.completed_at = _now()
+        if interrupted:
+            # Not over — back in the queue for another worker. Listeners are told so, not "cancelled"
+            store.release(job_id, WORKER_ID)
+            job.status, job.requeued = "pending", True
+            jobs.pop(job_id, None)
+            await _publish(job, {"type": "status", "status": "pending", "requeued": True})
+        else:
+            job.completed_at = _now()
+            store.update(
+                job_id, status=job.status, completed_at=job.completed_at,
+                result=job.result, error=job.error, trace=job.trace,
+            )
+            jobs.pop(job_id, None)
+            await _publish(job, {"type": "status", "status": job.status, "error": job.error})
+
+
+# =============================================================================
+# JOB QUEUE + WORKERS
+# =============================================================================
+
+# Set on a submission to this process, so an idle local worker claims it right away
+_work_available: Optional[asyncio.Event] = None
+_busy_workers = 0
+
+# Wall time of recent runs — feeds the Retry-After estimate
+_recent_run_seconds: deque = deque([45.0], maxlen=20)
+
+
+async def _wait_for_work():
+    """Sleep until a local submission or the next poll — other processes' submissions are polled."""
+    try:
+        await asyncio.wait_for(_work_available.wait(), timeout=JOB_POLL_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+    _work_available.clear()
+
+
+async def _worker(n: int):
+    """
+    Claim the most urgent job from the store, run it, repeat.
+
+    Each job still runs as its own task (kept on job.task) so POST
+    /jobs/{id}/cancel can cancel that one job without killing the worker.
+    """
+    global _busy_workers
+    reclaim_after = JOB_STALE_SECONDS if RESUME_ON_STARTUP else None
+    while True:
+        record = store.claim(WORKER_ID, reclaim_after=reclaim_after)
+        if record is None:
+            await _wait_for_work()
+            continue
+
+        job_id = record["job_id"]
+        job = jobs[job_id] = _job_from_record(record)
+        _busy_workers += 1
+        started = time.monotonic()
+        try:
+            job.task = asyncio.create_task(
+                run_agent_background(job_id, record["mode"] or AGENT_MODES[record["agent"]])
+            )
+            await job.task
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                # Shutdown — the worker itself is being cancelled. No-op if the run already released it
+                store.release(job_id, WORKER_ID)
+                raise
+            # Cancelled before its task started running — run_agent_background's handler never ran
+            job.status = "cancelled"
+            job.completed_at = _now()
+            store.update(job_id, status="cancelled", completed_at=job.completed_at)
+            delete_checkpoint(job_id)
+            await _publish(job, {"type": "status", "status": "cancelled", "error": None})
+        except Exception as e:
+            print(f"[server] worker {n}: {job_id} raised {e!r}")
+        finally:
+            jobs.pop(job_id, None)
+            _busy_workers -= 1
+            _recent_run_seconds.append(time.monotonic() - started)
+
+
+def _notify_workers():
+    """Wake this process's idle workers — a job was just queued."""
+    if _work_available is not None:
+        _work_available.set()
+
+
+# Delivers completion webhooks from the store — created with the workers
+_webhooks: Optional[WebhookDispatcher] = None
+
+
+def _notify_webhooks():
+    """A job finished, or a callback was added — deliver what's due now rather than at the next poll."""
+    if _webhooks is not None:
+        _webhooks.notify()
+
+
+def _register_callback(job_id: str, request: AgentRequest):
+    """Queue the request's callback_url for job_id — also when it attached to an existing job."""
+    if request.callback_url is not None:
+        store.add_webhook(job_id, str(request.callback_url))
+        _notify_webhooks()  # Due at once if that job has already finished
+
+
+def _retry_after(depth: int) -> int:
+    """Seconds until the queue has room again, roughly: one average run per round of running jobs."""
+    average = sum(_recent_run_seconds) / len(_recent_run_seconds)
+    rounds = max(1, depth - JOB_QUEUE_MAX + 1) / max(1, store.count(status="running"), AGENT_WORKERS)
+    return max(1, math.ceil(average * rounds))
+
+
+def _check_queue_capacity():
+    """Back-pressure: 429 + Retry-After once JOB_QUEUE_MAX jobs are waiting (across all processes)."""
+    depth = store.count(status="pending")
+    if depth >= JOB_QUEUE_MAX:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Job queue full ({JOB_QUEUE_MAX} waiting) — retry later",
+            headers={"Retry-After": str(_retry_after(depth))},
+        )
+
+
+def _find_duplicate(key: str) -> Optional[dict]:
+    """
+    An existing job for the same request: a pending/running one first, else one
+    that completed within JOB_DEDUP_WINDOW_SECONDS. A job being cancelled doesn't count.
+    """
+    duplicate = store.find_active(key)
+    if duplicate is None and JOB_DEDUP_WINDOW_SECONDS > 0:
+        since = datetime.now(timezone.utc).timestamp() - JOB_DEDUP_WINDOW_SECONDS
+        duplicate = store.find_completed(key, datetime.fromtimestamp(since, timezone.utc).isoformat())
+    return duplicate
+
+
+def _submit(agent: str, request: AgentRequest) -> JobSubmittedResponse:
+    """Queue a job — or hand back the identical one already queued/running/just finished."""
+    key = request_key(agent, request.client_name, request.context)
+    duplicate = _find_duplicate(key)
+    if duplicate is None:
+        _check_queue_capacity()
+        job_id = f"{JOB_ID_PREFIXES[agent]}_{uuid.uuid4().hex[:8]}"
+        record = {
+            "job_id": job_id,
+            "agent": agent,
+            "client_name": request.client_name,
+            "context": request.context,
+            "status": "pending",
+            "submitted_at": _now(),
+            "mode": AGENT_MODES[agent],
+            "priority": AGENT_PRIORITIES.get(agent, max(AGENT_PRIORITIES.values())),
+        }
+        if store.create(record):
+            _notify_workers()
+            _register_callback(job_id, request)
+            return JobSubmittedResponse(
+                job_id=job_id,
+                status="pending",
+                agent=agent,
+                client_name=request.client_name,
+                submitted_at=record["submitted_at"],
+                poll_url=f"/jobs/{job_id}",
+            )
+        # Another process queued the identical request a moment ago — attach to it
+        duplicate = store.find_active(key)
+        if duplicate is None:
+            raise HTTPException(status_code=409, detail="Conflicting submission — retry")
+
+    _register_callback(duplicate["job_id"], request)
+    return JobSubmittedResponse(
+        job_id=duplicate["job_id"],
+        status=duplicate["status"],
+        agent=agent,
+        client_name=duplicate["client_name"],
+        submitted_at=duplicate["submitted_at"],
+        poll_url=f"/jobs/{duplicate['job_id']}",
+        deduplicated=True,
+    )
+
+
+def _job_from_record(record: dict) -> Job:
+    """A live Job for a stored job this process just claimed."""
+    return Job(
+        job_id=record["job_id"],
+        agent=record["agent"],
+        client_name=record["client_name"],
+        context=record["context"],
+        status="running",
+        submitted_at=record["submitted_at"],
+    )
+
+
+def _record_from_checkpoint(state: dict) -> dict:
+    """A pending store row rebuilt from a checkpoint alone (its row was purged or never written)."""
+    agent = next(name for name, mode in AGENT_MODES.items() if mode == state["mode"])
+    return {
+        "job_id": state["job_id"],
+        "agent": agent,
+        "client_name": state["client_name"],
+        "context": state["context"],
+        "status": "pending",
+        "submitted_at": datetime.fromtimestamp(state["started_at"], timezone.utc).isoformat(),
+        "mode": state["mode"],
+        "priority": AGENT_PRIORITIES.get(agent, max(AGENT_PRIORITIES.values())),
+    }
+
+
+def resume_interrupted_jobs() -> list[str]:
+    """
+    Queue every checkpoint that has no job row. Called once at startup.
+
+    Jobs that do have a row need nothing here: a pending one is claimed as
+    usual, and a running one whose worker died is reclaimed once its
+    heartbeat is JOB_STALE_SECONDS old — either way it continues from its
+    checkpoint if it has one. Safe to run in several processes at once.
+    """
+    resumed = []
+    for state in list_checkpoints():
+        job_id = state["job_id"]
+        if store.get(job_id) is not None or not store.create(_record_from_checkpoint(state)):
+            continue
+        resumed.append(job_id)
+        print(f"[server] Resuming {job_id} ({state['client_name']}) after iteration {state['iteration']}")
+    return resumed
+
+
+def _sse(event_id: int, event: dict) -> str:
+    """Format one Server-Sent Events message."""
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _finished_events(record: dict) -> list[dict]:
+    """The closing events of a finished job, rebuilt from its store row."""
+    events = []
+    if record["result"] is not None:
+        events.append({"type": "done", "result": record["result"], "trace": record["trace"]})
+    events.append({"type": "status", "status": record["status"], "error": record["error"]})
+    return events
+
+
+def _replay_finished(record: dict, start: int) -> list[str]:
+    """SSE messages for a job that finished before the stream was opened."""
+    return [_sse(i, event) for i, event in enumerate(_finished_events(record)) if i >= start]
+
+
+async def _follow_stored(job_id: str, start: int):
+    """
+    SSE for a job this process isn't running (queued, or running in another
+    process): its status changes as the store sees them, then the report.
+    """
+    sent, status, last_sent = start, None, time.monotonic()
+    while True:
+        record = store.get(job_id)
+        if record is None:
+            return  # Purged
+        if record["status"] in TERMINAL_STATUSES:
+            for event in _finished_events(record):
+                yield _sse(sent, event)
+                sent += 1
+            return
+        if record["status"] != status:
+            status = record["status"]
+            yield _sse(sent, {"type": "status", "status": status})
+            sent += 1
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= 15:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(JOB_POLL_SECONDS)
+
+
+async def _wait_until_finished(job_id: str, timeout: float):
+    """
+    Return once the job is finished or `timeout` seconds pass. A job running
+    here is awaited on its event; any other is polled in the store.
+    """
+    deadline = time.monotonic() + timeout
+    while (remaining := deadline - time.monotonic()) > 0:
+        job = jobs.get(job_id)
+        if job is not None:
+            async with job.updated:
+                try:
+                    await asyncio.wait_for(
+                        job.updated.wait_for(lambda: job.status in TERMINAL_STATUSES or job.requeued),
+                        timeout=remaining,
+                    )
+                except asyncio.TimeoutError:
+                    return
+            if not job.requeued:
+                return
+            continue  # Handed back to the queue at shutdown — poll the store from here
+        record = store.get(job_id)
+        if record is None or record["status"] in TERMINAL_STATUSES:
+            return
+        await asyncio.sleep(min(JOB_POLL_SECONDS, remaining))
 
 
 # =============================================================================
@@ -190,6 +708,13 @@ def root():
             "scope": "POST /scope — Bellissimo full business diagnostic",
             "xray":   "POST /xray   — SustainCFO financial deep-dive",
         },
+        "stream": "GET /jobs/{job_id}/stream — live progress (Server-Sent Events)",
+        "wait": "GET /jobs/{job_id}?wait=30 — long-poll until the job finishes",
+        "notify": "WS /ws/jobs — status changes for many jobs over one WebSocket",
+        "resume": "POST /jobs/{job_id}/resume — continue a failed job from its checkpoint",
+        "cancel": "POST /jobs/{job_id}/cancel — stop a pending/running job and its tool calls",
+        "tool_stats": "GET /tools/stats — per-tool latency, payload size and error rate",
+        "webhooks": "callback_url on POST /scope or /xray — the finished job is POSTed to it; GET /webhooks/stats",
         "docs": "/docs",
     }
 
@@ -200,20 +725,34 @@ def health():
     Health check — no auth required.
     Railway and Render ping this to verify the service is alive.
     """
-    return {"status": "ok", "jobs_in_memory": len(jobs)}
+    return {
+        "status": "ok",
+        "worker_id": WORKER_ID,
+        "jobs_in_memory": len(jobs),
+        "jobs_stored": store.count(),
+        "queue": {
+            "depth": store.count(status="pending"),
+            "running": store.count(status="running"),   # Across every process
+            "max": JOB_QUEUE_MAX,
+            "workers": AGENT_WORKERS,                   # This process
+            "workers_busy": _busy_workers,
+        },
+    }
 
 
 @app.post("/scope", status_code=202)
 async def submit_scope(
     request: AgentRequest,
-    background_tasks: BackgroundTasks,
     _: str = Depends(require_api_key),
 ):
     """
     Submit a Bellissimo Scope diagnostic.
 
-    Returns immediately with a job_id (202 Accepted).
-    Poll GET /jobs/{job_id} until status == "completed".
+    Returns immediately with a job_id (202 Accepted), or 429 + Retry-After
+    if the queue is full. Poll GET /jobs/{job_id} until status == "completed",
+    or pass callback_url to have the finished job POSTed to you.
+    An identical request already in flight (or just completed) returns that
+    job instead, with "deduplicated": true.
 
     The Scope produces a 2-page intelligence report covering:
     - Business model clarity
@@ -223,41 +762,23 @@ async def submit_scope(
     - The big opportunity
     - Routing recommendation (SustainCFO vs Company OS)
     """
-    job_id = f"scp_{uuid.uuid4().hex[:8]}"
-    job = Job(
-        job_id=job_id,
-        agent="scope",
-        client_name=request.client_name,
-        context=request.context,
-        status="pending",
-        submitted_at=_now(),
-    )
-    jobs[job_id] = job
-
-    # "reveal" is the internal mode name in agent.py — "scope" is the external brand name
-    background_tasks.add_task(run_agent_background, job_id, "reveal")
-
-    return JobSubmittedResponse(
-        job_id=job_id,
-        status="pending",
-        agent="scope",
-        client_name=request.client_name,
-        submitted_at=job.submitted_at,
-        poll_url=f"/jobs/{job_id}",
-    )
+    # Runs as mode "reveal" in agent.py — "scope" is the external brand name
+    return _submit("scope", request)
 
 
 @app.post("/xray", status_code=202)
 async def submit_xray(
     request: AgentRequest,
-    background_tasks: BackgroundTasks,
     _: str = Depends(require_api_key),
 ):
     """
     Submit a SustainCFO X-Ray financial diagnostic.
 
-    Returns immediately with a job_id (202 Accepted).
-    Poll GET /jobs/{job_id} until status == "completed".
+    Returns immediately with a job_id (202 Accepted), or 429 + Retry-After
+    if the queue is full. Poll GET /jobs/{job_id} until status == "completed",
+    or pass callback_url to have the finished job POSTed to you.
+    An identical request already in flight (or just completed) returns that
+    job instead, with "deduplicated": true.
 
     The X-Ray produces a CFO-grade financial report covering:
     - Revenue health and growth trends
@@ -266,103 +787,410 @@ async def submit_xray(
     - Key financial ratios vs benchmarks
     - Top 3 priority recommendations
     """
-    job_id = f"xry_{uuid.uuid4().hex[:8]}"
-    job = Job(
-        job_id=job_id,
-        agent="xray",
-        client_name=request.client_name,
-        context=request.context,
-        status="pending",
-        submitted_at=_now(),
-    )
-    jobs[job_id] = job
-
-    background_tasks.add_task(run_agent_background, job_id, "xray")
-
-    return JobSubmittedResponse(
-        job_id=job_id,
-        status="pending",
-        agent="xray",
-        client_name=request.client_name,
-        submitted_at=job.submitted_at,
-        poll_url=f"/jobs/{job_id}",
-    )
+    return _submit("xray", request)
 
 
 @app.get("/jobs/{job_id}")
-def get_job(
+async def get_job(
     job_id: str,
+    wait: float = Query(0, ge=0, le=60),
     _: str = Depends(require_api_key),
 ):
     """
     Get the status and result of a job.
 
-    Poll this endpoint after submitting a job.
-    When status == "completed", result contains the full agent report.
+    Poll this endpoint after submitting a job — or long-poll it:
+    ?wait=30 holds the request until the job finishes (or 30s pass, max 60)
+    and returns the moment it does. Loop on it until status is final.
+
+    When status == "completed", result contains the full agent report
+    and trace shows where the time and tokens went, iteration by iteration.
     When status == "failed", error contains the exception message.
     """
-    if job_id not in jobs:
+    if wait:
+        await _wait_until_finished(job_id, wait)  # Still running after that — answer with the current status
+    record = store.get(job_id)
+    if record is None:
         raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return JobStatusResponse(**record)
+
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(
+    job_id: str,
+    last_event_id: Optional[str] = Header(None),
+    _: str = Depends(require_api_key),
+):
+    """
+    Stream a job's progress as Server-Sent Events.
+
+    Events: status, iteration, tool_call, tool_result, text_delta, done.
+    Replays everything so far, then pushes new events until the job finishes
+    (or a shutdown hands it back to the queue: status "pending", requeued).
+    Reconnecting clients send Last-Event-ID (browsers do this automatically)
+    and pick up where they left off. A job queued or running in another
+    server process streams its status changes and the final report only.
+
+    Example:
+        curl -N -H "X-API-Key: $KEY" http://localhost:8000/jobs/xry_1234abcd/stream
+    """
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+    job = jobs.get(job_id)
+    if job is None:
+        record = store.get(job_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+        if record["status"] in TERMINAL_STATUSES:
+            # Finished — the live event log is gone; replay the outcome from the store
+            return StreamingResponse(
+                iter(_replay_finished(record, start)),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
+        return StreamingResponse(
+            _follow_stored(job_id, start),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
-    job = jobs[job_id]
-    return JobStatusResponse(
-        job_id=job.job_id,
-        status=job.status,
-        agent=job.agent,
-        client_name=job.client_name,
-        submitted_at=job.submitted_at,
-        completed_at=job.completed_at,
-        result=job.result,
-        error=job.error,
+    async def event_source():
+        sent = start
+        while True:
+            async with job.updated:
+                try:
+                    # Wake on a new event, or every 15s to send a keep-alive
+                    await asyncio.wait_for(
+                        job.updated.wait_for(lambda: len(job.events) > sent),
+                        timeout=15,
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                new_events = job.events[sent:]
+
+            if not new_events:
+                # SSE comment line — keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+
+            for event in new_events:
+                yield _sse(sent, event)
+                sent += 1
+
+            last = new_events[-1]
+            if last["type"] == "status" and (last["status"] in TERMINAL_STATUSES or last.get("requeued")):
+                # Requeued: this process is shutting down — reconnecting follows the job wherever it resumes
+                return
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+def _status_message(job_id: str, status: str, error: Optional[str] = None) -> dict:
+    return {"type": "status", "job_id": job_id, "status": status, "error": error}
+
+
+async def _watch_job(job_id: str, outbox: asyncio.Queue):
+    """Feed one job's status transitions into a WebSocket's outbox until it finishes."""
+    job = jobs.get(job_id)
+    if job is None:
+        # Not running here — follow it in the store
+        await _watch_stored(job_id, outbox)
+        return
+
+    await outbox.put(_status_message(job_id, job.status, job.error))
+    seen = len(job.events)
+    while True:
+        async with job.updated:
+            await job.updated.wait_for(lambda: len(job.events) > seen)
+            new_events = job.events[seen:]
+        seen += len(new_events)
+        for event in new_events:
+            if event["type"] != "status":
+                continue
+            await outbox.put(_status_message(job_id, event["status"], event.get("error")))
+            if event["status"] in TERMINAL_STATUSES:
+                return
+            if event.get("requeued"):
+                # Handed back to the queue at shutdown — keep following it wherever it resumes
+                await _watch_stored(job_id, outbox, status=event["status"])
+                return
+
+
+async def _watch_stored(job_id: str, outbox: asyncio.Queue, status: Optional[str] = None):
+    """_watch_job() for a job not running in this process: poll the store. `status` = last one sent."""
+    sent_any = status is not None
+    while True:
+        record = store.get(job_id)
+        if record is None:
+            if not sent_any:
+                await outbox.put({"type": "error", "job_id": job_id, "detail": "Job not found"})
+            return
+        if record["status"] != status:
+            status, sent_any = record["status"], True
+            await outbox.put(_status_message(job_id, status, record["error"]))
+        if status in TERMINAL_STATUSES:
+            return
+        await asyncio.sleep(JOB_POLL_SECONDS)
+
+
+@app.websocket("/ws/jobs")
+async def jobs_socket(
+    websocket: WebSocket,
+    api_key: Optional[str] = None,
+    x_api_key: Optional[str] = Header(None),
+):
+    """
+    Push status transitions for many jobs over one WebSocket.
+
+    Auth: X-API-Key header, or ?api_key= for browsers (they can't set WS headers).
+
+    Client sends:  {"subscribe": ["xry_1234abcd", "scp_..."]}   {"unsubscribe": [...]}
+    Server sends:  {"type": "status", "job_id": ..., "status": "running", "error": null}
+                   — the current status right away, then every change until it's final.
+                   {"type": "error", "job_id": ..., "detail": "Job not found"}
+    """
+    if not SERVER_API_KEY or (x_api_key or api_key) != SERVER_API_KEY:
+        await websocket.close(code=1008)  # Policy violation
+        return
+    await websocket.accept()
+
+    # One sender: every watcher writes to the outbox, only this task writes to the socket
+    outbox: asyncio.Queue = asyncio.Queue()
+    watchers: Dict[str, asyncio.Task] = {}
+
+    async def send_loop():
+        while True:
+            await websocket.send_json(await outbox.get())
+
+    sender = asyncio.create_task(send_loop())
+    try:
+        while True:
+            message = await websocket.receive_json()
+            for job_id in message.get("subscribe", []):
+                if job_id not in watchers or watchers[job_id].done():
+                    watchers[job_id] = asyncio.create_task(_watch_job(job_id, outbox))
+            for job_id in message.get("unsubscribe", []):
+                task = watchers.pop(job_id, None)
+                if task:
+                    task.cancel()
+    except (WebSocketDisconnect, ValueError):
+        pass  # Client went away (or sent something that isn't JSON)
+    finally:
+        for task in (sender, *watchers.values()):
+            task.cancel()
+
+
+@app.post("/jobs/{job_id}/resume", status_code=202)
+async def resume_job(
+    job_id: str,
+    _: str = Depends(require_api_key),
+):
+    """
+    Continue a failed job from its last checkpoint.
+
+    Only the turns after the checkpoint are re-run — the Anthropic calls and
+    tool executions before it are not paid for twice. Poll or stream the same
+    job_id as before.
+    """
+    state = load_checkpoint(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"No checkpoint for job: {job_id}")
+
+    record = store.get(job_id)
+    if record is not None and record["status"] != "failed":
+        raise HTTPException(status_code=409, detail=f"Job is {record['status']}, not failed: {job_id}")
+    _check_queue_capacity()
+    if record is None:
+        queued = store.create(_record_from_checkpoint(state))
+    else:
+        queued = store.requeue(job_id)
+    if not queued:
+        # Resumed by someone else a moment ago, or an identical request is pending/running
+        raise HTTPException(status_code=409, detail=f"Job can't be resumed right now: {job_id}")
+    _notify_workers()
+
+    return {
+        "job_id": job_id,
+        "status": "pending",
+        "resumed_from_iteration": state["iteration"],
+        "poll_url": f"/jobs/{job_id}",
+    }
+
+
+@app.post("/jobs/{job_id}/cancel", status_code=202)
+async def cancel_job(
+    job_id: str,
+    _: str = Depends(require_api_key),
+):
+    """
+    Cancel a pending or running job.
+
+    The agent's task is cancelled: the in-flight Anthropic request is closed
+    and running tool calls are cancelled, so no further outbound calls are
+    made for this job. Its checkpoint is discarded — a cancelled job is not resumed.
+    A job running in another server process stops within HEARTBEAT_SECONDS.
+    """
+    previous = store.request_cancel(job_id)
+    if previous is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if previous in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {previous}: {job_id}")
+
+    if previous == "pending":
+        # No worker had claimed it — the store already marked it cancelled
+        delete_checkpoint(job_id)
+        _notify_webhooks()
+        return {"job_id": job_id, "status": "cancelled", "poll_url": f"/jobs/{job_id}"}
+
+    job = jobs.get(job_id)
+    if job is not None:
+        job.cancel_requested = True
+        job.task.cancel()
+    # Otherwise its worker sees cancel_requested on the next heartbeat
+    return {"job_id": job_id, "status": "cancelling", "poll_url": f"/jobs/{job_id}"}
+
+
+def _utc_iso(value: Optional[str], name: str) -> Optional[str]:
+    """A date/datetime query param → ISO 8601 UTC, the format submitted_at is stored in."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be ISO 8601 (e.g. 2025-03-01 or 2025-03-01T09:00:00Z)")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
 @app.get("/jobs")
 def list_jobs(
     status: Optional[str] = None,
+    agent: Optional[str] = None,
+    client_name: Optional[str] = None,
+    submitted_after: Optional[str] = None,
+    submitted_before: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     _: str = Depends(require_api_key),
 ):
     """
-    List all jobs, optionally filtered by status.
+    List jobs, newest first, one page at a time.
+
+    Query params (all optional, combinable):
+        ?status=pending | running | completed | failed | cancelled
+        ?agent=scope | xray
+        ?client_name=Acme Manufacturing Co.     (case-insensitive exact match)
+        ?submitted_after=2025-03-01&submitted_before=2025-04-01   (ISO 8601; naive = UTC)
+        ?limit=100 (max 1000)
+        ?cursor=<next_cursor from the previous page>
+
+    Every filter is answered from an index (job_store.py), so a dashboard
+    refresh costs the same at 100 jobs or 100,000. Keep passing next_cursor
+    until it comes back null. total counts every stored job that matches.
+    Reports aren't included — fetch GET /jobs/{id} for one (result_bytes
+    shows how big it is).
+    """
+    filters = {
+        "status": status,
+        "agent": agent,
+        "client_name": client_name,
+        "submitted_after": _utc_iso(submitted_after, "submitted_after"),
+        "submitted_before": _utc_iso(submitted_before, "submitted_before"),
+    }
+    try:
+        page, next_cursor = store.list_jobs(limit=limit, cursor=cursor, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "total": store.count(**filters),
+        "jobs": page,
+        "next_cursor": next_cursor,
+    }
+
+
+@app.get("/tools/stats")
+def tool_stats(
+    reset: bool = False,
+    _: str = Depends(require_api_key),
+):
+    """
+    Per-tool profile since startup (or the last reset), slowest p95 first.
 
     Query params:
-        ?status=pending | running | completed | failed
+        ?reset=true — return the snapshot, then start a fresh window
 
-    Useful for dashboards and monitoring. Returns newest jobs first.
+    Shows which tool dominates a diagnostic — check it after swapping a
+    simulated tool for a real integration.
     """
-    job_list = list(jobs.values())
+    snapshot = TOOL_STATS.snapshot()
+    if reset:
+        TOOL_STATS.reset()
+    snapshot["cache"] = TOOL_CACHE.stats() if TOOL_CACHE else None
+    return snapshot
 
-    if status:
-        job_list = [j for j in job_list if j.status == status]
 
-    # Newest first
-    job_list.sort(key=lambda j: j.submitted_at, reverse=True)
+@app.get("/webhooks/stats")
+def webhooks_stats(
+    _: str = Depends(require_api_key),
+):
+    """
+    Completion webhook deliveries across every process sharing the job store.
 
-    return {
-        "total": len(job_list),
-        "jobs": [
-            {
-                "job_id": j.job_id,
-                "agent": j.agent,
-                "client_name": j.client_name,
-                "status": j.status,
-                "submitted_at": j.submitted_at,
-                "completed_at": j.completed_at,
-            }
-            for j in job_list
-        ],
-    }
+    deliveries: pending / delivered / failed (gave up) counts, and
+                failed_attempts — every attempt that didn't get a 2xx, retries included.
+    latency_ms: p50/p95/p99/max of the POST itself ("request") and of job
+                completion → delivered ("after_completion"), over recent deliveries.
+    """
+    return webhook_stats(store)
 
 
 # =============================================================================
-# LOCAL DEV ENTRY POINT
+# WORKER-ONLY PROCESS
 # =============================================================================
 
-if __name__ == "__main__":
-    import uvicorn
+async def run_worker_pool(workers: int = AGENT_WORKERS):
+    """
+    Run agents without serving HTTP — `python agent_server.py worker`.
+
+    Claims jobs from the same JOB_DB the API processes write to. Ctrl-C (or
+    SIGTERM from systemd) hands running jobs back to the queue.
+    """
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    tasks = _start_background(workers)
+    print(f"[worker] {WORKER_ID}: {workers} workers on {store.path}")
+    try:
+        await stop.wait()
+    finally:
+        await _stop_background(tasks)
 
-    print("\nBellissimo Agent Server — Local Dev")
-    print("Docs: http://localhost:8000/docs")
-    print("Health: http://localhost:8000/health\n")
 
-    uvicorn.run("agent_server:app", host="0.0.0.0", port=8000, reload=True)
+# =============================================================================
+# LOCAL DEV ENTRY POINT
+# =============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bellissimo Agent Server")
+    parser.add_argument("command", nargs="?", choices=("serve", "worker"), default="serve",
+                        help="serve: local dev server (default); worker: agents only, no HTTP")
+    parser.add_argument("--workers", type=int, default=AGENT_WORKERS,
+                        help="Agents run at once by `worker` (default: $AGENT_WORKERS)")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        try:
+            asyncio.run(run_worker_pool(args.workers))
+        except KeyboardInterrupt:
+            pass
+    else:
+        import uvicorn
+
+        print("\nBellissimo Agent Server — Local Dev")
+        print("Docs: http://localhost:8000/docs")
+        print("Health: http://localhost:8000/health\n")
+
+        uvicorn.run("agent_server:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,368 @@
+"""
+ar_engine.py — AR aging computed from raw invoice/payment ledgers
+=================================================================
+
+WHAT THIS FILE DOES:
+    Reads a client's invoice ledger (a CSV export of invoices and payments)
+    and computes what get_accounts_receivable reports:
+        - open AR in current / 31–60 / 61–90 / 90+ day buckets
+        - the top overdue accounts (customers with balances past 90 days)
+        - AR days (DSO): open AR ÷ trailing-365-day invoicing × 365
+
+WHY STREAMING:
+    Real clients hand us ledgers with hundreds of thousands of lines. Loading
+    that into a list of dicts costs hundreds of MB per run. Instead the CSV is
+    read in chunks and folded into a temporary SQLite table (one row per
+    invoice: invoiced, paid). SQLite pages spill to a temp file beyond a fixed
+    cache size, so memory stays bounded no matter how big the ledger is.
+    The aging itself is two SQL aggregates over that table.
+
+WHY AN ON-DISK CACHE:
+    A 500K-line ledger takes seconds to fold. The result is cached as JSON in
+    AR_CACHE_DIR, stamped with the ledger's size and modification time — edit
+    or replace the ledger and the next call recomputes; otherwise every
+    process (server, batch runner, CLI) reuses the same result.
+    (tools.TOOL_CACHE still applies on top, with its 5-minute AR TTL.)
+
+LEDGER FORMAT (one row per invoice or payment):
+    type        invoice | payment   (credit / credit memo count as payments)
+    customer    customer name
+    invoice_id  invoice number — payments name the invoice they apply to
+    date        invoice date / payment date
+    amount      positive; "$1,234.50" and "(500)" are accepted
+    Payments without an invoice_id are reported as unapplied_payments;
+    invoices without one can't be matched to payments, so they are skipped
+    and counted as invoices_without_id.
+
+WHERE LEDGERS LIVE:
+    AR_LEDGER_DIR/<client-slug>.csv — e.g. ar_ledgers/acme-manufacturing-co.csv.
+    When a client has a ledger there, get_accounts_receivable uses it.
+
+USAGE:
+    python ar_engine.py compute ar_ledgers/acme-manufacturing-co.csv
+    python ar_engine.py synth big_ledger.csv --rows 500000     # benchmark input
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from data_store import parse_amount
+from metrics_engine import AR_BUCKETS, ar_metrics, client_row
+
+load_dotenv()
+
+_HERE = Path(__file__).parent
+AR_LEDGER_DIR = Path(os.getenv("AR_LEDGER_DIR", _HERE / "ar_ledgers"))
+AR_CACHE_DIR = Path(os.getenv("AR_CACHE_DIR", _HERE / "ar_cache"))
+
+CHUNK_ROWS = 10_000          # CSV rows folded into SQLite per executemany
+SQLITE_CACHE_KIB = 16_384    # Page cache cap — beyond this SQLite spills to its temp file
+TOP_OVERDUE = 10
+DSO_WINDOW_DAYS = 365
+
+# Bumped whenever the computation changes, so old cache entries are ignored
+ENGINE_VERSION = 2
+
+PAYMENT_TYPES = {"payment", "credit", "credit memo"}
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d-%b-%Y", "%Y/%m/%d")
+
+
+def _slug(name: str) -> str:
+    """'Acme Manufacturing Co.' -> 'acme-manufacturing-co'"""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def ledger_path(client_name: str) -> Optional[Path]:
+    """The client's ledger in AR_LEDGER_DIR, or None if there isn't one."""
+    path = AR_LEDGER_DIR / f"{_slug(client_name)}.csv"
+    return path if path.is_file() else None
+
+
+@lru_cache(maxsize=8192)
+def parse_date(text: str) -> str:
+    """
+    '03/31/2024' / '31-Mar-2024' / '2024-03-31' → '2024-03-31'.
+
+    Memoized: a ledger has at most a few thousand distinct dates across
+    hundreds of thousands of rows, and strptime dominated the fold time.
+    """
+    text = text.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {text!r}")
+
+
+# =============================================================================
+# STREAMING FOLD — CSV chunks → one row per invoice in a temp SQLite table
+# =============================================================================
+
+def _chunks(reader: csv.DictReader, size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _fold_ledger(conn: sqlite3.Connection, path: Path) -> dict:
+    """Stream the ledger into the invoices table. Returns row counts and the latest date seen."""
+    conn.execute(
+        """
+        CREATE TABLE invoices (
+            invoice_id    TEXT PRIMARY KEY,
+            customer      TEXT,
+            invoice_date  TEXT,
+            invoiced      REAL NOT NULL DEFAULT 0,
+            paid          REAL NOT NULL DEFAULT 0
+        )
+        """
+    )
+    add_invoice = """
+        INSERT INTO invoices (invoice_id, customer, invoice_date, invoiced) VALUES (?, ?, ?, ?)
+        ON CONFLICT (invoice_id) DO UPDATE SET
+            customer = excluded.customer,
+            invoice_date = excluded.invoice_date,
+            invoiced = invoiced + excluded.invoiced
+    """
+    add_payment = """
+        INSERT INTO invoices (invoice_id, paid) VALUES (?, ?)
+        ON CONFLICT (invoice_id) DO UPDATE SET paid = paid + excluded.paid
+    """
+
+    stats = {"ledger_rows": 0, "unapplied_payments": 0.0, "invoices_without_id": 0, "latest_date": ""}
+    with path.open(newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = {"type", "customer", "invoice_id", "date", "amount"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path}: missing required column(s) {sorted(missing)}")
+
+        for chunk in _chunks(reader, CHUNK_ROWS):
+            invoices, payments = [], []
+            for row in chunk:
+                amount = abs(parse_amount(row["amount"]) or 0)
+                day = parse_date(row["date"])
+                stats["latest_date"] = max(stats["latest_date"], day)
+                invoice_id = (row["invoice_id"] or "").strip()
+                if row["type"].strip().lower() in PAYMENT_TYPES:
+                    if invoice_id:
+                        payments.append((invoice_id, amount))
+                    else:
+                        stats["unapplied_payments"] += amount
+                elif invoice_id:
+                    invoices.append((invoice_id, row["customer"].strip(), day, amount))
+                else:
+                    # All of them would share the '' key and sum into one phantom invoice
+                    stats["invoices_without_id"] += 1
+            with conn:
+                conn.executemany(add_invoice, invoices)
+                conn.executemany(add_payment, payments)
+            stats["ledger_rows"] += len(chunk)
+    return stats
+
+
+_OPEN_INVOICES = """
+    SELECT customer,
+           invoiced - paid AS open_amount,
+           julianday(:as_of) - julianday(invoice_date) AS age
+    FROM invoices
+    WHERE invoice_date IS NOT NULL AND invoice_date <= :as_of AND invoiced - paid > 0.005
+"""
+
+
+def compute_ar_aging(path: Path, client_name: str, as_of: Optional[str] = None) -> dict:
+    """
+    Compute the AR aging report for one ledger — same shape as
+    get_accounts_receivable, plus ar_days and ledger stats.
+
+    as_of: 'YYYY-MM-DD' aging date; defaults to the latest date in the ledger
+           (today for a ledger with no rows — the report is then all zeros).
+    """
+    started = time.perf_counter()
+    conn = sqlite3.connect("")  # "" = private temp database, spills to disk past the cache
+    try:
+        conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KIB}")
+        stats = _fold_ledger(conn, Path(path))
+        as_of = parse_date(as_of) if as_of else (stats["latest_date"] or date.today().isoformat())
+        params = {"as_of": as_of, "top": TOP_OVERDUE, "window": f"-{DSO_WINDOW_DAYS} days"}
+
+        buckets = conn.execute(
+            f"""
+            SELECT COALESCE(SUM(CASE WHEN age <= 30 THEN open_amount END), 0),
+                   COALESCE(SUM(CASE WHEN age > 30 AND age <= 60 THEN open_amount END), 0),
+                   COALESCE(SUM(CASE WHEN age > 60 AND age <= 90 THEN open_amount END), 0),
+                   COALESCE(SUM(CASE WHEN age > 90 THEN open_amount END), 0),
+                   COUNT(*)
+            FROM ({_OPEN_INVOICES})
+            """,
+            params,
+        ).fetchone()
+        overdue = conn.execute(
+            f"""
+            SELECT customer, SUM(open_amount), CAST(MAX(age) AS INTEGER)
+            FROM ({_OPEN_INVOICES}) WHERE age > 90
+            GROUP BY customer ORDER BY SUM(open_amount) DESC LIMIT :top
+            """,
+            params,
+        ).fetchall()
+        trailing_sales = conn.execute(
+            """
+            SELECT COALESCE(SUM(invoiced), 0) FROM invoices
+            WHERE invoice_date > date(:as_of, :window) AND invoice_date <= :as_of
+            """,
+            params,
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+    amounts = [round(v, 2) for v in buckets[:4]]
+    m = client_row(ar_metrics(np.array([amounts])))
+    total_ar = round(m["total_ar"], 2)
+    return {
+        "client": client_name,
+        "as_of": datetime.strptime(as_of, "%Y-%m-%d").strftime("%B %d, %Y"),
+        "total_ar": total_ar,
+        "aging_buckets": {
+            name: {"amount": amount, "pct": pct}
+            for name, amount, pct in zip(AR_BUCKETS, amounts, m["bucket_pct"])
+        },
+        "top_overdue_accounts": [
+            {"customer": customer, "amount": round(amount, 2), "days_outstanding": days}
+            for customer, amount, days in overdue
+        ],
+        "ar_days": round(total_ar / trailing_sales * DSO_WINDOW_DAYS) if trailing_sales else None,
+        "open_invoices": buckets[4],
+        "unapplied_payments": round(stats["unapplied_payments"], 2),
+        "invoices_without_id": stats["invoices_without_id"],
+        "ledger_rows": stats["ledger_rows"],
+        "compute_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+# =============================================================================
+# ON-DISK RESULT CACHE — invalidated by the ledger's size + mtime
+# =============================================================================
+
+def _cache_file(path: Path) -> Path:
+    """One cache file per ledger — a recompute overwrites the stale entry."""
+    digest = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:16]
+    return AR_CACHE_DIR / f"{digest}.json"
+
+
+def _fingerprint(path: Path, as_of: Optional[str]) -> dict:
+    st = path.stat()
+    return {
+        "ledger": str(path.resolve()),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "as_of": as_of,
+        "version": ENGINE_VERSION,
+    }
+
+
+def cached_ar_aging(path: Path, client_name: str, as_of: Optional[str] = None) -> dict:
+    """
+    compute_ar_aging() behind the on-disk cache.
+
+    A hit requires the same ledger size, mtime, as_of and engine version as
+    when the entry was written — any change to the ledger file is a miss.
+    """
+    path = Path(path)
+    fingerprint = _fingerprint(path, as_of)
+    cache_file = _cache_file(path)
+    try:
+        entry = json.loads(cache_file.read_text(encoding="utf-8"))
+        if entry["fingerprint"] == fingerprint:
+            return {**entry["result"], "client": client_name}
+    except (OSError, ValueError, KeyError):
+        pass  # No entry, or unreadable — recompute
+
+    result = compute_ar_aging(path, client_name, as_of)
+    AR_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # A temp file of our own: concurrent misses on the same ledger mustn't write one shared path
+    tmp = tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=AR_CACHE_DIR, prefix=cache_file.stem, suffix=".tmp", delete=False
+    )
+    try:
+        with tmp:
+            json.dump({"fingerprint": fingerprint, "result": result}, tmp)
+        os.replace(tmp.name, cache_file)
+    except BaseException:
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+    return result
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def synth_ledger(path: Path, rows: int, customers: int = 400, seed: int = 0):
+    """Write a random invoice/payment ledger — roughly 70% of invoices get paid."""
+    rng = random.Random(seed)
+    start = date(2023, 1, 1)
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["type", "customer", "invoice_id", "date", "amount"])
+        written = invoice_no = 0
+        while written < rows:
+            invoice_no += 1
+            customer = f"Customer {rng.randrange(customers):04d}"
+            issued = start + timedelta(days=rng.randrange(790))
+            amount = round(rng.uniform(200, 25_000), 2)
+            writer.writerow(["invoice", customer, f"INV-{invoice_no}", issued.isoformat(), amount])
+            written += 1
+            if rng.random() < 0.7 and written < rows:
+                paid_on = issued + timedelta(days=rng.randrange(15, 75))
+                writer.writerow(["payment", customer, f"INV-{invoice_no}", paid_on.isoformat(), amount])
+                written += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AR aging from invoice ledgers.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    comp = sub.add_parser("compute", help="Compute AR aging for a ledger CSV (bypasses the cache)")
+    comp.add_argument("ledger", type=Path)
+    comp.add_argument("--as-of", help="Aging date (default: latest date in the ledger)")
+    syn = sub.add_parser("synth", help="Write a synthetic ledger for benchmarking")
+    syn.add_argument("out", type=Path)
+    syn.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    if args.command == "compute":
+        result = compute_ar_aging(args.ledger, args.ledger.stem, args.as_of)
+        print(json.dumps(result, indent=2))
+        print(f"[ar_engine] {result['ledger_rows']:,} rows in {result['compute_ms']:.0f} ms")
+        try:
+            import resource  # Unix only
+            peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"[ar_engine] peak RSS {peak_mib:.0f} MiB")
+        except ImportError:
+            pass
+    else:
+        synth_ledger(args.out, args.rows)
+        print(f"[ar_engine] wrote {args.rows:,} ledger rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+batch_runner.py — Bulk diagnostics for a client portfolio
+==========================================================
+
+WHAT THIS FILE DOES:
+    Runs a diagnostic (X-Ray by default) for every client in a CSV or JSON file,
+    with a concurrency cap, writes each report the moment it finishes, and
+    prints a throughput summary at the end.
+
+    SustainCFO's monthly X-Ray for 12–15 clients becomes one command instead of
+    15 POST /xray calls and 15 polling loops.
+
+USAGE:
+    python batch_runner.py clients.csv
+    python batch_runner.py clients.json --mode reveal --concurrency 3 --out batch_reports
+
+INPUT FORMAT:
+    CSV  — header row with client_name, and optional context, mode columns
+    JSON — a list of {"client_name": ..., "context": ..., "mode": ...} objects
+    A per-row mode overrides --mode; it must be one of MODES, like --mode.
+
+RATE LIMITS:
+    Each run makes several Anthropic calls, so N concurrent runs can trip the
+    account's rate limit together. RateLimitScheduler handles this in two ways:
+    1. Paces run starts (--runs-per-minute) so a batch ramps up instead of bursting
+    2. On a 429, pauses ALL workers until the retry-after time passes (not just
+       the one that got it), then retries that client — up to --max-retries times
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import anthropic
+
+from agent import run_agent_async
+
+_HERE = Path(__file__).parent
+DEFAULT_OUT_DIR = _HERE / "batch_reports"
+
+# agent.py modes — anything else silently runs the reveal diagnostic
+MODES = ("xray", "reveal")
+
+
+@dataclass
+class BatchItem:
+    client_name: str
+    context: str = ""
+    mode: str = "xray"
+    attempts: int = 0
+    index: int = 0     # 1-based position in the batch — keeps output files unique
+
+
+@dataclass
+class BatchOutcome:
+    item: BatchItem
+    ok: bool
+    seconds: float
+    report_path: Optional[Path] = None
+    error: Optional[str] = None
+    trace: Optional[dict] = field(default=None, repr=False)
+
+
+def _slug(name: str) -> str:
+    """'Acme Manufacturing Co.' -> 'acme-manufacturing-co'"""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def load_clients(path: Path, default_mode: str) -> list[BatchItem]:
+    """
+    Read clients from a .csv or .json file.
+
+    Raises ValueError naming every row with an unknown mode — before any run
+    starts, so a typo'd "x-ray" can't spend a batch on the wrong diagnostic.
+    """
+    if path.suffix.lower() == ".json":
+        rows = json.loads(path.read_text(encoding="utf-8"))
+        first_row = 1
+    else:
+        with path.open(newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        first_row = 2  # Row 1 is the header
+
+    items, bad_modes = [], []
+    for number, row in enumerate(rows, start=first_row):
+        name = (row.get("client_name") or "").strip()
+        if not name:
+            continue
+        mode = (row.get("mode") or "").strip().lower() or default_mode
+        if mode not in MODES:
+            bad_modes.append(f"row {number} ({name}): {row['mode']!r}")
+            continue
+        items.append(BatchItem(
+            client_name=name,
+            context=(row.get("context") or "").strip(),
+            mode=mode,
+        ))
+    if bad_modes:
+        raise ValueError(
+            f"{path}: unknown mode (expected one of {', '.join(MODES)}) in " + "; ".join(bad_modes)
+        )
+    return items
+
+
+# =============================================================================
+# RATE-LIMIT-AWARE SCHEDULER
+# =============================================================================
+
+class RateLimitScheduler:
+    """
+    Gate that every worker passes before starting a run.
+
+    - Paces starts to runs_per_minute (evenly spaced, not bursty)
+    - After a 429, holds every worker until the shared cooldown expires
+    """
+
+    def __init__(self, runs_per_minute: float):
+        self.interval = 60.0 / runs_per_minute if runs_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start, self._resume_at)
+            self._next_start = start_at + self.interval
+        delay = start_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def back_off(self, seconds: float):
+        """Pause all workers for `seconds` (from a 429's retry-after)."""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def _retry_after_seconds(error: anthropic.RateLimitError, default: float = 30.0) -> float:
+    """Read retry-after from a 429 response; fall back to `default`."""
+    try:
+        return float(error.response.headers.get("retry-after", default))
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+def _write_report(out_dir: Path, item: BatchItem, report: str, trace: dict) -> Path:
+    """
+    Save the report as markdown and its trace as JSON next to it.
+
+    The item's index is part of the name: the same client twice in one file,
+    or two names with the same slug ("Acme Co." / "ACME co"), must not
+    overwrite each other's reports.
+    """
+    stem = f"{date.today():%Y-%m-%d}_{item.index:03d}_{_slug(item.client_name)}_{item.mode}"
+    report_path = out_dir / f"{stem}.md"
+    report_path.write_text(report, encoding="utf-8")
+    (out_dir / f"{stem}.trace.json").write_text(json.dumps(trace, indent=2), encoding="utf-8")
+    return report_path
+
+
+async def run_batch(
+    items: list[BatchItem],
+    out_dir: Path = DEFAULT_OUT_DIR,
+    concurrency: int = 4,
+    runs_per_minute: float = 20,
+    max_retries: int = 3,
+) -> list[BatchOutcome]:
+    """
+    Run every item with at most `concurrency` diagnostics in flight.
+    Reports are written as each run finishes, not at the end.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    scheduler = RateLimitScheduler(runs_per_minute)
+    queue: asyncio.Queue[BatchItem] = asyncio.Queue()
+    for index, item in enumerate(items, start=1):
+        item.index = index
+        queue.put_nowait(item)
+    outcomes: list[BatchOutcome] = []
+
+    async def worker():
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await scheduler.acquire()
+            item.attempts += 1
+            started = time.monotonic()
+            try:
+                report, trace = await run_agent_async(
+                    item.client_name, item.context, item.mode, return_trace=True
+                )
+                path = _write_report(out_dir, item, report, trace)
+                outcome = BatchOutcome(item, True, time.monotonic() - started, path, trace=trace)
+                print(f"[batch] done   {item.client_name} ({outcome.seconds:.1f}s) -> {path.name}")
+            except anthropic.RateLimitError as e:
+                wait = _retry_after_seconds(e)
+                scheduler.back_off(wait)
+                if item.attempts <= max_retries:
+                    print(f"[batch] 429 on {item.client_name} — pausing {wait:.0f}s, will retry")
+                    queue.put_nowait(item)
+                    continue
+                outcome = BatchOutcome(item, False, time.monotonic() - started, error=str(e))
+                print(f"[batch] FAILED {item.client_name}: rate limited {item.attempts}x")
+            except Exception as e:
+                outcome = BatchOutcome(item, False, time.monotonic() - started, error=str(e))
+                print(f"[batch] FAILED {item.client_name}: {e}")
+            outcomes.append(outcome)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return outcomes
+
+
+def summarize(outcomes: list[BatchOutcome], wall_seconds: float) -> str:
+    """Throughput summary: counts, wall time, runs/min, latency spread, tokens."""
+    ok = [o for o in outcomes if o.ok]
+    failed = [o for o in outcomes if not o.ok]
+    durations = sorted(o.seconds for o in ok)
+    tokens_in = sum(o.trace["totals"]["input_tokens"] for o in ok if o.trace)
+    tokens_out = sum(o.trace["totals"]["output_tokens"] for o in ok if o.trace)
+    cache_read = sum(o.trace["totals"]["cache_read_input_tokens"] for o in ok if o.trace)
+
+    lines = [
+        "",
+        "Batch Summary",
+        "-------------",
+        f"Clients:      {len(outcomes)}  (ok {len(ok)}, failed {len(failed)})",
+        f"Wall time:    {wall_seconds:.1f}s",
+    ]
+    if wall_seconds:
+        lines.append(f"Throughput:   {len(ok) / wall_seconds * 60:.1f} reports/min")
+    if durations:
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        lines += [
+            f"Run latency:  median {statistics.median(durations):.1f}s, "
+            f"p95 {p95:.1f}s, max {durations[-1]:.1f}s",
+            f"Tokens:       in {tokens_in:,} (cache read {cache_read:,}), out {tokens_out:,}",
+        ]
+    for o in failed:
+        lines.append(f"  FAILED {o.item.client_name}: {o.error}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run diagnostics for a list of clients.")
+    parser.add_argument("clients", type=Path, help="CSV or JSON file of clients")
+    parser.add_argument("--mode", default="xray", choices=MODES,
+                        help="Default mode for rows without one (default: xray)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Max diagnostics in flight at once (default: 4)")
+    parser.add_argument("--runs-per-minute", type=float, default=20,
+                        help="Max run starts per minute, 0 = unpaced (default: 20)")
+    parser.add_argument("--max-retries", type=int, default=3,
+                        help="Retries per client after a 429 (default: 3)")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT_DIR,
+                        help="Directory for reports (default: batch_reports/)")
+    args = parser.parse_args()
+
+    try:
+        items = load_clients(args.clients, args.mode)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"[batch] {len(items)} clients, concurrency={args.concurrency}")
+
+    started = time.monotonic()
+    outcomes = asyncio.run(run_batch(
+        items,
+        out_dir=args.out,
+        concurrency=args.concurrency,
+        runs_per_minute=args.runs_per_minute,
+        max_retries=args.max_retries,
+    ))
+    print(summarize(outcomes, time.monotonic() - started))
+
+
+if __name__ == "__main__":
+    main()
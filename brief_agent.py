@@ -16,6 +16,11 @@ CONTEXT LOADING:
     Reads STRATEGIC_NORTH_STAR.md and PROJECT_THREADS.md at runtime so the
     brief is grounded in actual strategy, not just the task list.
     Both files live next to this script on VPS (/opt/bellissimo/).
+
+PROMPT CACHING:
+    The identity + context files form a stable prefix marked with a cache
+    breakpoint (prompt_cache.py). Only today's date and the task list change
+    between calls, and both sit after the breakpoint.
 """
 
 import os
@@ -23,6 +28,9 @@ import anthropic
 from datetime import date
 from pathlib import Path
 
+from cassette import wrap_client
+from prompt_cache import build_system, log_usage
+
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
 # Resolve paths relative to this file so it works locally and on VPS
@@ -64,7 +72,7 @@ def generate_brief(tasks: list[dict]) -> str:
     Calls Claude with all active tasks and returns a formatted daily brief.
     Runs synchronously -- wrap in asyncio.to_thread() from async callers.
     """
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    client = wrap_client(anthropic.Anthropic(api_key=ANTHROPIC_API_KEY))
     today = date.today().strftime("%A, %B %d").replace(" 0", " ")  # "Saturday, February 28" (cross-platform)
     task_text = _format_tasks_for_prompt(tasks)
 
@@ -72,15 +80,17 @@ def generate_brief(tasks: list[dict]) -> str:
     north_star = _load_context_file("STRATEGIC_NORTH_STAR.md", max_chars=3000)
     threads = _load_context_file("PROJECT_THREADS.md", max_chars=2500)
 
-    system_prompt = f"""You are Bellissimo OS — JB's personal operating system and chief of staff.
+    # Stable prefix — identical across calls until the context files change (cached)
+    stable_context = f"""You are Bellissimo OS — JB's personal operating system and chief of staff.
 
 === STRATEGIC CONTEXT (read this first) ===
 {north_star}
 
 === ACTIVE WORK THREADS ===
-{threads}
+{threads}"""
 
-=== YOUR MISSION ===
+    # Dynamic suffix — contains today's date, so it goes after the breakpoint
+    mission = f"""=== YOUR MISSION ===
 JB reads this brief on his iPhone at 5am. It must be immediately actionable.
 North star metric: Revenue per JB hour. Everything else is noise.
 
@@ -108,6 +118,8 @@ CONSTRAINT:
 
 Be direct. No filler. JB wants to be pushed, not agreed with."""
 
+    system_prompt = build_system(stable_context, dynamic=mission)
+
     response = client.messages.create(
         model="claude-sonnet-4-6",
         max_tokens=800,
@@ -118,4 +130,5 @@ Be direct. No filler. JB wants to be pushed, not agreed with."""
         }]
     )
 
+    log_usage("brief", response.usage)
     return response.content[0].text
@@ -0,0 +1,441 @@
+"""
+cassette.py — Record/replay harness for Anthropic API calls
+============================================================
+
+WHAT THIS FILE DOES:
+    record — wraps a real Anthropic client and saves every request/response
+             pair to a JSON "cassette" file
+    replay — serves those responses back with no network, optionally with
+             injected latency, so runs are fast and deterministic
+
+WHY:
+    run_agent, brief_agent.generate_brief and meeting_prep_agent.run_meeting_prep
+    can't be benchmarked or regression-tested without live calls — slow, paid,
+    and different every time. On a replayed cassette the only thing being
+    measured is our own code: serialization, tool dispatch, history growth.
+
+HOW TO USE:
+    Any call site that builds its client through wrap_client() /
+    wrap_async_client() is switched by environment variables:
+
+        ANTHROPIC_CASSETTE=cassettes/acme_xray.json
+        ANTHROPIC_CASSETTE_MODE=record        # or: replay
+        ANTHROPIC_CASSETTE_LATENCY_MS=0       # replay only: per-call delay
+
+    Or from the command line:
+        python cassette.py record --cassette cassettes/acme.json --client "Acme Manufacturing Co."
+        python cassette.py bench  --cassette cassettes/acme.json --runs 50
+        python cassette.py bench  --cassette cassettes/acme.json --latency-ms 800 --concurrency 10
+        python cassette.py bench  --cassette cassettes/acme.json --tool-cache   # warm-cache numbers
+
+MATCHING:
+    Replay looks up each request by a hash of (model, system, tools, messages).
+    If the exact request isn't on the cassette (e.g. the history budget changed),
+    it falls back to the next unserved response in recorded order.
+    Pass strict=True to raise instead.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Optional
+
+from anthropic.types import Message
+
+# Chunk size for replayed text deltas — mimics token-sized streaming events
+_REPLAY_CHUNK_CHARS = 8
+
+
+def _jsonable(value):
+    """Convert request kwargs (which may hold SDK objects) to plain JSON data."""
+    return json.loads(json.dumps(
+        value,
+        default=lambda o: o.model_dump(exclude_none=True) if hasattr(o, "model_dump") else str(o),
+    ))
+
+
+def request_key(request: dict) -> str:
+    """Stable fingerprint of the parts of a request that determine the response."""
+    relevant = {k: request.get(k) for k in ("model", "system", "tools", "messages")}
+    canonical = json.dumps(_jsonable(relevant), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# CASSETTE — the file of recorded interactions
+# =============================================================================
+
+class Cassette:
+    """
+    A JSON file of {"request": ..., "response": ...} interactions.
+
+    consume=True (default) serves each recorded response once, like the real
+    conversation. consume=False serves matching responses any number of times —
+    used by the benchmark so many identical runs can replay concurrently.
+    """
+
+    def __init__(self, path: Path, strict: bool = False, consume: bool = True):
+        self.path = Path(path)
+        self.strict = strict
+        self.consume = consume
+        self.interactions: list[dict] = []
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self.interactions = json.loads(self.path.read_text(encoding="utf-8"))
+        self.rewind()
+
+    def rewind(self):
+        """Reset replay position — every recorded response is servable again."""
+        self._by_key: dict[str, deque] = defaultdict(deque)
+        for index, interaction in enumerate(self.interactions):
+            self._by_key[interaction["key"]].append(index)
+        self._served: set[int] = set()
+        self._cursor = 0
+
+    def record(self, request: dict, response: Message):
+        request = _jsonable(request)
+        with self._lock:
+            self.interactions.append({
+                "key": request_key(request),
+                "request": request,
+                "response": response.model_dump(mode="json"),
+            })
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.interactions, indent=1), encoding="utf-8")
+
+    def next_response(self, request: dict) -> Message:
+        with self._lock:
+            index = self._match(request)
+            if self.consume:
+                self._served.add(index)
+        return Message.model_validate(self.interactions[index]["response"])
+
+    def _match(self, request: dict) -> int:
+        candidates = self._by_key.get(request_key(request))
+        if candidates and not self.consume:
+            return candidates[0]
+        while candidates:
+            index = candidates.popleft()
+            if index not in self._served:
+                return index
+        if self.strict:
+            raise LookupError(f"Request not found on cassette {self.path}")
+        while self._cursor < len(self.interactions):
+            index = self._cursor
+            self._cursor += 1
+            if index not in self._served:
+                return index
+        raise LookupError(f"Cassette {self.path} exhausted ({len(self.interactions)} responses)")
+
+
+# =============================================================================
+# RECORDING WRAPPERS — pass through to the real client, save every pair
+# =============================================================================
+
+class _RecordingStream:
+    """Wraps a real stream manager; records the final message on exit."""
+
+    def __init__(self, manager, cassette: Cassette, request: dict):
+        self._manager, self._cassette, self._request = manager, cassette, request
+
+    def __enter__(self):
+        self._stream = self._manager.__enter__()
+        return self._stream
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self._cassette.record(self._request, self._stream.get_final_message())
+        return self._manager.__exit__(*exc)
+
+    async def __aenter__(self):
+        self._stream = await self._manager.__aenter__()
+        return self._stream
+
+    async def __aexit__(self, *exc):
+        if exc[0] is None:
+            self._cassette.record(self._request, await self._stream.get_final_message())
+        return await self._manager.__aexit__(*exc)
+
+
+class _RecordingMessages:
+    def __init__(self, messages, cassette: Cassette):
+        self._messages, self._cassette = messages, cassette
+
+    def create(self, **kwargs):
+        response = self._messages.create(**kwargs)
+        self._cassette.record(kwargs, response)
+        return response
+
+    def stream(self, **kwargs):
+        return _RecordingStream(self._messages.stream(**kwargs), self._cassette, kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+
+class _AsyncRecordingMessages(_RecordingMessages):
+    async def create(self, **kwargs):
+        response = await self._messages.create(**kwargs)
+        self._cassette.record(kwargs, response)
+        return response
+
+
+# =============================================================================
+# REPLAY — serve recorded responses, no network
+# =============================================================================
+
+class _ReplayEvent:
+    """Minimal stand-in for the SDK's TextEvent (type="text", text=delta)."""
+
+    def __init__(self, text: str):
+        self.type = "text"
+        self.text = text
+
+
+def _text_chunks(message: Message):
+    for block in message.content:
+        if block.type == "text":
+            for i in range(0, len(block.text), _REPLAY_CHUNK_CHARS):
+                yield block.text[i:i + _REPLAY_CHUNK_CHARS]
+
+
+class _ReplayStream:
+    """Replays a recorded message through the messages.stream() interface."""
+
+    def __init__(self, message: Message, latency_s: float):
+        self._message, self._latency_s = message, latency_s
+
+    def __enter__(self):
+        time.sleep(self._latency_s)
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return (_ReplayEvent(chunk) for chunk in _text_chunks(self._message))
+
+    def get_final_message(self) -> Message:
+        return self._message
+
+    async def __aenter__(self):
+        await asyncio.sleep(self._latency_s)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def _aiter(self):
+        for chunk in _text_chunks(self._message):
+            yield _ReplayEvent(chunk)
+
+    def __aiter__(self):
+        return self._aiter()
+
+
+class _AsyncReplayStream(_ReplayStream):
+    async def get_final_message(self) -> Message:
+        return self._message
+
+
+class _ReplayMessages:
+    def __init__(self, cassette: Cassette, latency_s: float):
+        self._cassette, self._latency_s = cassette, latency_s
+
+    def create(self, **kwargs) -> Message:
+        time.sleep(self._latency_s)
+        return self._cassette.next_response(kwargs)
+
+    def stream(self, **kwargs) -> _ReplayStream:
+        return _ReplayStream(self._cassette.next_response(kwargs), self._latency_s)
+
+
+class _AsyncReplayMessages(_ReplayMessages):
+    async def create(self, **kwargs) -> Message:
+        await asyncio.sleep(self._latency_s)
+        return self._cassette.next_response(kwargs)
+
+    def stream(self, **kwargs) -> _AsyncReplayStream:
+        return _AsyncReplayStream(self._cassette.next_response(kwargs), self._latency_s)
+
+
+class CassetteClient:
+    """Drop-in for Anthropic / AsyncAnthropic — only .messages is intercepted."""
+
+    def __init__(self, messages, inner=None):
+        self.messages = messages
+        self._inner = inner
+
+    def __getattr__(self, name):
+        if self._inner is None:
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+
+# =============================================================================
+# WIRING — env-driven wrappers for every call site
+# =============================================================================
+
+_cassettes: dict[str, Cassette] = {}
+
+
+def _configured() -> Optional[tuple[str, Cassette, float]]:
+    """(mode, cassette, latency_s) from the environment, or None if disabled."""
+    path = os.getenv("ANTHROPIC_CASSETTE")
+    if not path:
+        return None
+    mode = os.getenv("ANTHROPIC_CASSETTE_MODE", "replay").lower()
+    latency_s = float(os.getenv("ANTHROPIC_CASSETTE_LATENCY_MS", "0")) / 1000
+    # One Cassette per file, shared by every call site in the process
+    cassette = _cassettes.setdefault(path, Cassette(Path(path)))
+    return mode, cassette, latency_s
+
+
+def wrap_client(client):
+    """Return `client`, or a recording/replaying wrapper if ANTHROPIC_CASSETTE is set."""
+    config = _configured()
+    if config is None:
+        return client
+    mode, cassette, latency_s = config
+    if mode == "record":
+        return CassetteClient(_RecordingMessages(client.messages, cassette), inner=client)
+    return CassetteClient(_ReplayMessages(cassette, latency_s), inner=client)
+
+
+def wrap_async_client(client):
+    """Async twin of wrap_client() for AsyncAnthropic."""
+    config = _configured()
+    if config is None:
+        return client
+    mode, cassette, latency_s = config
+    if mode == "record":
+        return CassetteClient(_AsyncRecordingMessages(client.messages, cassette), inner=client)
+    return CassetteClient(_AsyncReplayMessages(cassette, latency_s), inner=client)
+
+
+# =============================================================================
+# CLI — record a run, or benchmark the loop on a replayed cassette
+# =============================================================================
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _bench(args):
+    """
+    Replay the cassette `runs` times and report loop overhead (excluding API time).
+
+    Every run repeats the same tool calls, so with tools.TOOL_CACHE on all but
+    the first would be served from memory. It is off for the bench unless
+    --tool-cache is passed; then it starts empty and its hit rate is reported.
+    """
+    import agent
+    import tools
+
+    cassette = Cassette(Path(args.cassette), strict=args.strict, consume=False)
+    if not cassette.interactions:
+        raise SystemExit(f"No interactions on {args.cassette} — record one first")
+
+    # Rebuild the recorded run's inputs from its opening user message, so the
+    # replayed requests match the cassette exactly
+    opening = cassette.interactions[0]["request"]["messages"][0]["content"]
+    first_line, _, rest = opening.partition("\n\n")
+    client_name = args.client or first_line.split(": ", 1)[-1]
+    context = args.context or rest.removeprefix("Additional context: ")
+
+    latency_s = args.latency_ms / 1000
+    agent.async_client = CassetteClient(_AsyncReplayMessages(cassette, latency_s))
+
+    cache = tools.TOOL_CACHE if args.tool_cache else None
+    if args.tool_cache and cache is None:
+        raise SystemExit("--tool-cache: the tool cache is disabled (TOOL_CACHE_ENABLED)")
+    tools.TOOL_CACHE = cache
+    if cache is not None:
+        cache.clear()
+        before = cache.stats()
+
+    async def one_run():
+        _, trace = await agent.run_agent_async(client_name, context, args.mode, return_trace=True)
+        return trace
+
+    async def bench():
+        traces = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def guarded():
+            async with semaphore:
+                traces.append(await one_run())
+
+        started = time.monotonic()
+        await asyncio.gather(*(guarded() for _ in range(args.runs)))
+        return traces, time.monotonic() - started
+
+    traces, wall = asyncio.run(bench())
+    overhead = [t["total_ms"] - t["totals"]["api_latency_ms"] for t in traces]
+    tool_ms = [t["totals"]["tool_wall_ms"] for t in traces]
+    print("\nReplay Benchmark")
+    print("----------------")
+    print(f"Runs:            {len(traces)} (concurrency {args.concurrency}, "
+          f"injected latency {args.latency_ms:.0f}ms/call)")
+    print(f"Wall time:       {wall:.2f}s  ({len(traces) / wall:.1f} runs/s)")
+    print(f"Loop overhead:   median {statistics.median(overhead):.1f}ms, "
+          f"p95 {_percentile(overhead, 0.95):.1f}ms  (run time minus API time)")
+    print(f"Tool wall time:  median {statistics.median(tool_ms):.1f}ms")
+    if cache is None:
+        print("Tool cache:      off (pass --tool-cache for warm-cache numbers)")
+    else:
+        after = cache.stats()
+        hits, misses = after["hits"] - before["hits"], after["misses"] - before["misses"]
+        print(f"Tool cache:      on, {hits} hits / {misses} misses "
+              f"({hits / max(hits + misses, 1):.0%} of tool calls served from memory)")
+
+
+def _record(args):
+    import agent
+
+    os.environ["ANTHROPIC_CASSETTE"] = args.cassette
+    os.environ["ANTHROPIC_CASSETTE_MODE"] = "record"
+    agent.async_client = wrap_async_client(agent.AsyncAnthropic())
+    report = asyncio.run(agent.run_agent_async(args.client, args.context, args.mode))
+    print(report)
+    print(f"\nRecorded {len(_cassettes[args.cassette].interactions)} interactions to {args.cassette}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay Anthropic API interactions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Run one live diagnostic and save it to a cassette")
+    rec.add_argument("--cassette", required=True)
+    rec.add_argument("--client", required=True)
+    rec.add_argument("--context", default="")
+    rec.add_argument("--mode", default="xray", choices=["xray", "reveal"])
+    rec.set_defaults(func=_record)
+
+    bench = sub.add_parser("bench", help="Replay a cassette repeatedly and time the loop")
+    bench.add_argument("--cassette", required=True)
+    bench.add_argument("--client", default=None, help="Defaults to the recorded client")
+    bench.add_argument("--context", default="")
+    bench.add_argument("--mode", default="xray", choices=["xray", "reveal"])
+    bench.add_argument("--runs", type=int, default=20)
+    bench.add_argument("--concurrency", type=int, default=1)
+    bench.add_argument("--latency-ms", type=float, default=0.0)
+    bench.add_argument("--strict", action="store_true", help="Fail on unmatched requests")
+    bench.add_argument("--tool-cache", action="store_true",
+                       help="Keep tools.TOOL_CACHE on (starts empty) instead of timing uncached tools")
+    bench.set_defaults(func=_bench)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+checkpoints.py — Per-job checkpoints so interrupted agent runs can resume
+=========================================================================
+
+WHAT THIS FILE DOES:
+    After every completed turn the agent loop saves its state — the message
+    history, the iteration counter, which tools have run, and the trace so
+    far — to one JSON file per job:
+
+        checkpoints/xry_1a2b3c4d.json
+
+    When a run dies partway (deploy, process restart, an API error on
+    iteration 6), run_agent/stream_agent called with the same job_id pick up
+    from that file instead of starting over.
+
+WHY:
+    Every iteration before the crash was a paid Anthropic call, and every tool
+    result in the history was a tool execution. Restarting from scratch pays
+    for all of them again. Resuming pays only for what is left.
+
+WHAT IS SAVED (and what isn't):
+    Only completed turns: the assistant's tool_use message together with its
+    tool_result message. A crash mid-API-call or mid-tool-turn repeats that one
+    turn — never more.
+
+ATOMIC WRITES:
+    Each save writes a temp file and os.replace()s it over the old checkpoint,
+    so a crash during the write leaves the previous checkpoint intact instead
+    of a half-written JSON file.
+
+CONFIG (.env):
+    AGENT_CHECKPOINT_DIR            — where checkpoint files live (default: checkpoints/)
+    AGENT_CHECKPOINT_MAX_AGE_HOURS  — older checkpoints are not resumed (default: 24)
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_HERE = Path(__file__).parent
+CHECKPOINT_DIR = Path(os.getenv("AGENT_CHECKPOINT_DIR", _HERE / "checkpoints"))
+CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("AGENT_CHECKPOINT_MAX_AGE_HOURS", "24"))
+
+
+def _path(job_id: str) -> Path:
+    return CHECKPOINT_DIR / f"{job_id}.json"
+
+
+def save_checkpoint(job_id: str, state: dict):
+    """
+    Persist one job's state. Keeps the original started_at across saves.
+
+    state must be JSON-serializable — the agent keeps its history as plain
+    dicts (history.content_to_dicts) for exactly this reason.
+    """
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    previous = load_checkpoint(job_id)
+    now = time.time()
+    payload = {
+        **state,
+        "job_id": job_id,
+        "started_at": previous["started_at"] if previous else now,
+        "updated_at": now,
+    }
+    path = _path(job_id)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(payload), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_checkpoint(job_id: str) -> Optional[dict]:
+    """Return the saved state for job_id, or None if there is none (or it's unreadable)."""
+    try:
+        return json.loads(_path(job_id).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable checkpoint for %s: %s", job_id, e)
+        return None
+
+
+def delete_checkpoint(job_id: str):
+    """Remove a job's checkpoint — called once the run completes."""
+    _path(job_id).unlink(missing_ok=True)
+
+
+def list_checkpoints(max_age_hours: float = CHECKPOINT_MAX_AGE_HOURS) -> list[dict]:
+    """
+    Every resumable checkpoint, oldest first.
+
+    Checkpoints older than max_age_hours are deleted instead of returned:
+    a half-finished report from yesterday is better rerun on fresh data.
+    """
+    if not CHECKPOINT_DIR.exists():
+        return []
+    cutoff = time.time() - max_age_hours * 3600
+    states = []
+    for path in CHECKPOINT_DIR.glob("*.json"):
+        state = load_checkpoint(path.stem)
+        if state is None:
+            continue
+        if state.get("updated_at", 0) < cutoff:
+            logger.info("Dropping stale checkpoint %s", path.stem)
+            delete_checkpoint(path.stem)
+            continue
+        states.append(state)
+    return sorted(states, key=lambda s: s["started_at"])
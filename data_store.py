@@ -0,0 +1,707 @@
+"""
+data_store.py — Indexed local store for client financial data
+==============================================================
+
+WHAT THIS FILE DOES:
+    A SQLite database of per-client financials — monthly revenue, monthly
+    expenses by category, cash-flow statements, KPIs and AR aging — that the
+    tools in tools.py read from instead of their hard-coded Acme data.
+    Plus a bulk importer for CSV exports from accounting software.
+
+    Set FINANCIAL_DB=financial.db in .env to switch the tools over.
+    Leave it unset and they keep returning the simulated Acme data.
+
+WHY SQLITE:
+    One file, no server, in the standard library — and every table is keyed
+    (client_id, period), so a tool call is an index range lookup:
+
+        SELECT ... FROM revenue_monthly WHERE client_id = ? ORDER BY month DESC LIMIT 12
+
+    reads 12 rows no matter whether the file holds ten clients or ten thousand.
+    `python data_store.py explain` prints the query plans to prove it.
+
+PLUGGABLE:
+    tools.py only needs an object with the five FinancialDataSource methods
+    below. A QuickBooks or Xero client that implements them drops in the same
+    way — assign it to tools.DATA_STORE.
+
+IMPORTING:
+    python data_store.py import revenue   exports/revenue.csv
+    python data_store.py import expenses  exports/expenses.csv --db financial.db
+    python data_store.py synth --clients 5000 --months 60     # load-test data
+
+    Every CSV has a client_name column plus the dataset's columns (DATASETS).
+    Dates may be "2024-03", "2024-03-31", "Mar 2024" or "03/31/2024"; amounts
+    may carry "$", thousands separators, or (parentheses) for negatives —
+    the way accounting exports write them. Re-importing a period overwrites it.
+
+    Every import bumps its dataset's row in the imports table and calls
+    IMPORT_HOOKS — tools.py uses both to drop cached results the import made
+    stale, whether it ran in the server's process or from this CLI.
+"""
+
+import argparse
+import csv
+import logging
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Protocol
+
+import numpy as np
+from dotenv import load_dotenv
+
+from metrics_engine import AR_BUCKETS, ar_metrics, cash_flow_metrics, client_row, columns, revenue_metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_HERE = Path(__file__).parent
+DEFAULT_DB_PATH = _HERE / "financial.db"
+
+# Trailing months covered by each get_expense_breakdown period
+EXPENSE_PERIOD_MONTHS = {"last_month": 1, "last_quarter": 3, "last_year": 12}
+
+CASH_FLOW_FIELDS = (
+    "net_income",
+    "depreciation_amortization",
+    "changes_in_working_capital",
+    "accounts_receivable_change",
+    "accounts_payable_change",
+    "inventory_change",
+    "equipment_purchases",
+    "loan_repayments",
+    "owner_distributions",
+    "beginning_cash",
+    "monthly_burn_rate",
+)
+
+KEY_METRIC_FIELDS = (
+    "gross_margin_pct",
+    "net_margin_pct",
+    "ebitda_margin_pct",
+    "current_ratio",
+    "quick_ratio",
+    "cash_balance",
+    "months_of_runway",
+    "ar_days",
+    "ap_days",
+    "inventory_turns",
+    "top_customer_pct_revenue",
+    "top_3_customers_pct_revenue",
+    "top_customer_name",
+    "industry",
+)
+
+# Columns that hold text, not amounts
+_TEXT_FIELDS = {"top_customer_name", "industry", "category", "expense_type", "customer"}
+
+# Benchmarks shown alongside KPIs, by industry label
+INDUSTRY_BENCHMARKS = {
+    "Manufacturing (SMB)": {
+        "gross_margin_benchmark": "35-45%",
+        "ar_days_benchmark": "<45",
+        "current_ratio_benchmark": ">2.0",
+    },
+}
+
+# dataset name -> (table, key columns after client_id, value columns)
+DATASETS = {
+    "revenue": ("revenue_monthly", ("month",), ("recurring", "project", "one_time")),
+    "expenses": ("expense_monthly", ("month", "category"), ("expense_type", "amount")),
+    "cash_flow": ("cash_flow", ("period_end",), CASH_FLOW_FIELDS),
+    "key_metrics": ("key_metrics", ("as_of",), KEY_METRIC_FIELDS),
+    "ar_aging": ("ar_aging", ("as_of",), AR_BUCKETS),
+    "ar_overdue": ("ar_overdue", ("as_of", "customer"), ("amount", "days_outstanding")),
+}
+
+# Every data table is WITHOUT ROWID with (client_id, period, ...) as its primary
+# key, so rows are physically clustered by client and sorted by period.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    client_id  INTEGER PRIMARY KEY,
+    name       TEXT NOT NULL UNIQUE COLLATE NOCASE
+);
+
+CREATE TABLE IF NOT EXISTS revenue_monthly (
+    client_id  INTEGER NOT NULL REFERENCES clients(client_id),
+    month      TEXT NOT NULL,                 -- 'YYYY-MM'
+    recurring  NUMERIC,
+    project    NUMERIC,
+    one_time   NUMERIC,
+    PRIMARY KEY (client_id, month)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS expense_monthly (
+    client_id     INTEGER NOT NULL REFERENCES clients(client_id),
+    month         TEXT NOT NULL,
+    category      TEXT NOT NULL,
+    expense_type  TEXT,                       -- 'fixed' | 'variable'
+    amount        NUMERIC,
+    PRIMARY KEY (client_id, month, category)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cash_flow (
+    client_id                   INTEGER NOT NULL REFERENCES clients(client_id),
+    period_end                  TEXT NOT NULL,   -- last month of the 12-month statement
+    net_income                  NUMERIC,
+    depreciation_amortization   NUMERIC,
+    changes_in_working_capital  NUMERIC,
+    accounts_receivable_change  NUMERIC,
+    accounts_payable_change     NUMERIC,
+    inventory_change            NUMERIC,
+    equipment_purchases         NUMERIC,
+    loan_repayments             NUMERIC,
+    owner_distributions         NUMERIC,
+    beginning_cash              NUMERIC,
+    monthly_burn_rate           NUMERIC,
+    PRIMARY KEY (client_id, period_end)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS key_metrics (
+    client_id                    INTEGER NOT NULL REFERENCES clients(client_id),
+    as_of                        TEXT NOT NULL,
+    gross_margin_pct             NUMERIC,
+    net_margin_pct               NUMERIC,
+    ebitda_margin_pct            NUMERIC,
+    current_ratio                NUMERIC,
+    quick_ratio                  NUMERIC,
+    cash_balance                 NUMERIC,
+    months_of_runway             NUMERIC,
+    ar_days                      NUMERIC,
+    ap_days                      NUMERIC,
+    inventory_turns              NUMERIC,
+    top_customer_pct_revenue     NUMERIC,
+    top_3_customers_pct_revenue  NUMERIC,
+    top_customer_name            TEXT,
+    industry                     TEXT,
+    PRIMARY KEY (client_id, as_of)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ar_aging (
+    client_id          INTEGER NOT NULL REFERENCES clients(client_id),
+    as_of              TEXT NOT NULL,
+    current_0_30_days  NUMERIC,
+    late_31_60_days    NUMERIC,
+    late_61_90_days    NUMERIC,
+    overdue_90_plus    NUMERIC,
+    PRIMARY KEY (client_id, as_of)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ar_overdue (
+    client_id         INTEGER NOT NULL REFERENCES clients(client_id),
+    as_of             TEXT NOT NULL,
+    customer          TEXT NOT NULL,
+    amount            NUMERIC,
+    days_outstanding  INTEGER,
+    PRIMARY KEY (client_id, as_of, customer)
+) WITHOUT ROWID;
+
+-- One row per dataset, bumped by every import — readers in other processes poll it
+CREATE TABLE IF NOT EXISTS imports (
+    dataset      TEXT PRIMARY KEY,
+    version      INTEGER NOT NULL,
+    imported_at  TEXT NOT NULL
+);
+"""
+
+# Called with the dataset name after each import in this process commits.
+# Append your own callable to react to new data.
+IMPORT_HOOKS: list[Callable[[str], None]] = []
+
+
+class FinancialDataSource(Protocol):
+    """What tools.py needs from a data source — one method per tool, tool-shaped dicts back."""
+
+    def revenue_data(self, client_name: str, months: int = 12) -> dict: ...
+    def expense_breakdown(self, client_name: str, period: str = "last_quarter") -> dict: ...
+    def cash_flow_statement(self, client_name: str) -> dict: ...
+    def key_metrics(self, client_name: str) -> dict: ...
+    def accounts_receivable(self, client_name: str) -> dict: ...
+
+
+# =============================================================================
+# PARSING — dates and amounts the way accounting exports write them
+# =============================================================================
+
+_MONTH_FORMATS = ("%Y-%m", "%Y-%m-%d", "%b %Y", "%B %Y", "%m/%Y", "%m/%d/%Y", "%Y/%m/%d")
+
+
+def parse_month(text: str) -> str:
+    """'Mar 2024' / '2024-03-31' / '03/31/2024' → '2024-03'."""
+    text = text.strip()
+    for fmt in _MONTH_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m")
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {text!r}")
+
+
+def parse_amount(text: str):
+    """
+    '$1,234.50' → 1234.5, '(500)' / '$(500)' / '-$500' → -500, '' → None.
+    Whole numbers come back as int. Anything else raises ValueError.
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        number = float(text)  # Plain numbers — skip the cleanup below
+        if math.isfinite(number):
+            return int(number) if number.is_integer() else number
+    except ValueError:
+        pass
+    # Currency symbols, thousands separators and spaces go first, so "$(500)" reads as "(500)"
+    cleaned = re.sub(r"[\s,$€£]", "", text)
+    negative = cleaned.startswith("(") and cleaned.endswith(")")
+    if negative:
+        cleaned = cleaned[1:-1]
+    try:
+        number = float(cleaned)
+    except ValueError:
+        raise ValueError(f"Unrecognized amount: {text!r}") from None
+    if not math.isfinite(number):
+        raise ValueError(f"Unrecognized amount: {text!r}")
+    number = -number if negative else number
+    return int(number) if number.is_integer() else number
+
+
+def _month_label(month: str, fmt: str = "%b %Y") -> str:
+    """'2024-03' → 'Mar 2024' (the shape the simulated tools return)."""
+    return datetime.strptime(month, "%Y-%m").strftime(fmt)
+
+
+def _shift_month(month: str, delta: int) -> str:
+    """'2024-03' shifted by delta months."""
+    year, mon = map(int, month.split("-"))
+    index = year * 12 + (mon - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+# =============================================================================
+# STORE
+# =============================================================================
+
+class FinancialDataStore:
+    """
+    SQLite-backed FinancialDataSource.
+
+    One connection per thread: run_agent executes tools on a thread pool and
+    execute_tool_async on asyncio.to_thread workers, and sqlite3 connections
+    must not be shared across threads.
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            # WAL: the importer can write while tools keep reading
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _client_id(self, client_name: str) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT client_id FROM clients WHERE name = ?", (client_name.strip(),)
+        ).fetchone()
+        return row["client_id"] if row else None
+
+    @staticmethod
+    def _missing(client_name: str, what: str) -> dict:
+        return {"error": f"No {what} on file for client: {client_name}"}
+
+    # -------------------------------------------------------------------------
+    # READS — one per tool, each an index range lookup on (client_id, period)
+    # -------------------------------------------------------------------------
+
+    def revenue_data(self, client_name: str, months: int = 12) -> dict:
+        client_id = self._client_id(client_name)
+        rows = self._conn().execute(
+            """
+            SELECT month, COALESCE(recurring, 0) AS recurring,
+                   COALESCE(project, 0) AS project, COALESCE(one_time, 0) AS one_time
+            FROM revenue_monthly WHERE client_id = ?
+            ORDER BY month DESC LIMIT ?
+            """,
+            (client_id, months),
+        ).fetchall() if client_id else []
+        if not rows:
+            return self._missing(client_name, "revenue data")
+
+        data = [
+            {"month": _month_label(r["month"]), "recurring": r["recurring"],
+             "project": r["project"], "one_time": r["one_time"]}
+            for r in reversed(rows)
+        ]
+        return {
+            "client": client_name,
+            "months_returned": len(data),
+            "monthly_detail": data,
+            "summary": client_row(revenue_metrics(**columns(data, ("recurring", "project", "one_time")))),
+        }
+
+    def expense_breakdown(self, client_name: str, period: str = "last_quarter") -> dict:
+        if period not in EXPENSE_PERIOD_MONTHS:
+            return {"error": f"Unknown period: {period}. Use one of {list(EXPENSE_PERIOD_MONTHS)}"}
+        client_id = self._client_id(client_name)
+        conn = self._conn()
+        latest = conn.execute(
+            "SELECT MAX(month) AS month FROM expense_monthly WHERE client_id = ?", (client_id,)
+        ).fetchone()["month"] if client_id else None
+        if latest is None:
+            return self._missing(client_name, "expense data")
+
+        start = _shift_month(latest, -(EXPENSE_PERIOD_MONTHS[period] - 1))
+        rows = conn.execute(
+            """
+            SELECT category, expense_type, SUM(amount) AS amount
+            FROM expense_monthly
+            WHERE client_id = ? AND month BETWEEN ? AND ?
+            GROUP BY category, expense_type
+            ORDER BY amount DESC
+            """,
+            (client_id, start, latest),
+        ).fetchall()
+
+        fixed = sum(r["amount"] or 0 for r in rows if r["expense_type"] == "fixed")
+        variable = sum(r["amount"] or 0 for r in rows if r["expense_type"] != "fixed")
+        return {
+            "client": client_name,
+            "period": period,
+            "months_covered": f"{_month_label(start)} – {_month_label(latest)}",
+            "total_expenses": fixed + variable,
+            "fixed_expenses": fixed,
+            "variable_expenses": variable,
+            "categories": {r["category"]: r["amount"] for r in rows},
+        }
+
+    def cash_flow_statement(self, client_name: str) -> dict:
+        client_id = self._client_id(client_name)
+        row = self._conn().execute(
+            "SELECT * FROM cash_flow WHERE client_id = ? ORDER BY period_end DESC LIMIT 1",
+            (client_id,),
+        ).fetchone() if client_id else None
+        if row is None:
+            return self._missing(client_name, "cash flow statement")
+
+        v = {name: row[name] or 0 for name in CASH_FLOW_FIELDS}
+        investing = v["equipment_purchases"]
+        financing = v["loan_repayments"] + v["owner_distributions"]
+        m = client_row(cash_flow_metrics(
+            net_income=np.array([v["net_income"]]),
+            depreciation_amortization=np.array([v["depreciation_amortization"]]),
+            changes_in_working_capital=np.array([v["changes_in_working_capital"]]),
+            total_investing_cf=np.array([investing]),
+            total_financing_cf=np.array([financing]),
+            beginning_cash=np.array([v["beginning_cash"]]),
+            monthly_burn_rate=np.array([v["monthly_burn_rate"]]),
+        ))
+        return {
+            "client": client_name,
+            "period": f"12 months ending {_month_label(row['period_end'])}",
+            "operating_cash_flow": {
+                "net_income": v["net_income"],
+                "depreciation_amortization": v["depreciation_amortization"],
+                "changes_in_working_capital": v["changes_in_working_capital"],
+                "accounts_receivable_change": v["accounts_receivable_change"],
+                "accounts_payable_change": v["accounts_payable_change"],
+                "inventory_change": v["inventory_change"],
+                "total_operating_cf": m["total_operating_cf"],
+            },
+            "investing_cash_flow": {
+                "equipment_purchases": v["equipment_purchases"],
+                "total_investing_cf": investing,
+            },
+            "financing_cash_flow": {
+                "loan_repayments": v["loan_repayments"],
+                "owner_distributions": v["owner_distributions"],
+                "total_financing_cf": financing,
+            },
+            "summary": {
+                "net_cash_change": m["net_cash_change"],
+                "beginning_cash": v["beginning_cash"],
+                "ending_cash_balance": m["ending_cash_balance"],
+                "monthly_burn_rate": v["monthly_burn_rate"],
+                "months_of_runway": m["months_of_runway"],
+                "free_cash_flow": m["free_cash_flow"],
+            },
+        }
+
+    def key_metrics(self, client_name: str) -> dict:
+        client_id = self._client_id(client_name)
+        row = self._conn().execute(
+            "SELECT * FROM key_metrics WHERE client_id = ? ORDER BY as_of DESC LIMIT 1",
+            (client_id,),
+        ).fetchone() if client_id else None
+        if row is None:
+            return self._missing(client_name, "key metrics")
+
+        result = {
+            "client": client_name,
+            "as_of": _month_label(row["as_of"], "%B %Y"),
+            "profitability": {k: row[k] for k in ("gross_margin_pct", "net_margin_pct", "ebitda_margin_pct")},
+            "liquidity": {k: row[k] for k in ("current_ratio", "quick_ratio", "cash_balance", "months_of_runway")},
+            "efficiency": {k: row[k] for k in ("ar_days", "ap_days", "inventory_turns")},
+            "concentration_risk": {
+                k: row[k] for k in ("top_customer_pct_revenue", "top_3_customers_pct_revenue", "top_customer_name")
+            },
+        }
+        if row["industry"]:
+            result["benchmarks"] = {"industry": row["industry"], **INDUSTRY_BENCHMARKS.get(row["industry"], {})}
+        return result
+
+    def accounts_receivable(self, client_name: str) -> dict:
+        client_id = self._client_id(client_name)
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT * FROM ar_aging WHERE client_id = ? ORDER BY as_of DESC LIMIT 1",
+            (client_id,),
+        ).fetchone() if client_id else None
+        if row is None:
+            return self._missing(client_name, "AR aging report")
+
+        amounts = {name: row[name] or 0 for name in AR_BUCKETS}
+        m = client_row(ar_metrics(np.array([[amounts[name] for name in AR_BUCKETS]])))
+        overdue = conn.execute(
+            """
+            SELECT customer, amount, days_outstanding FROM ar_overdue
+            WHERE client_id = ? AND as_of = ?
+            ORDER BY amount DESC LIMIT 10
+            """,
+            (client_id, row["as_of"]),
+        ).fetchall()
+        return {
+            "client": client_name,
+            "as_of": _month_label(row["as_of"], "%B %Y"),
+            "total_ar": m["total_ar"],
+            "aging_buckets": {
+                name: {"amount": amounts[name], "pct": pct}
+                for name, pct in zip(AR_BUCKETS, m["bucket_pct"])
+            },
+            "top_overdue_accounts": [dict(r) for r in overdue],
+        }
+
+    # -------------------------------------------------------------------------
+    # WRITES — bulk import
+    # -------------------------------------------------------------------------
+
+    def _client_ids(self, names: Iterable[str]) -> dict[str, int]:
+        """
+        Insert any new clients; return {stripped name: client_id} for the given names.
+
+        Names are matched by SQLite (the column's NOCASE collation), the same
+        comparison client lookups use — never by a Python-side lower().
+        """
+        conn = self._conn()
+        names = list({n.strip() for n in names})
+        conn.executemany("INSERT OR IGNORE INTO clients (name) VALUES (?)", [(n,) for n in names])
+        ids = {}
+        for chunk_start in range(0, len(names), 500):  # stay under SQLite's bound-parameter limit
+            chunk = names[chunk_start:chunk_start + 500]
+            placeholders = ", ".join(["(?)"] * len(chunk))
+            for row in conn.execute(
+                f"""
+                WITH wanted(name) AS (VALUES {placeholders})
+                SELECT wanted.name AS wanted, clients.client_id
+                FROM wanted JOIN clients ON clients.name = wanted.name
+                """,
+                chunk,
+            ):
+                ids[row["wanted"]] = row["client_id"]
+        return ids
+
+    def import_rows(
+        self,
+        dataset: str,
+        rows: Iterable[dict],
+        batch_size: int = 5000,
+        source: str = "input",
+        first_row: int = 1,
+    ) -> int:
+        """
+        Upsert rows (dicts keyed by CSV column) into a dataset's table.
+
+        Rows are written in batches inside one transaction — one fsync for the
+        whole import instead of one per row. A cell that can't be parsed aborts
+        the import (nothing is written) with a ValueError naming `source`, the
+        row — numbered from first_row — and the column.
+        """
+        table, keys, values = DATASETS[dataset]
+        cols = ("client_id", *keys, *values)
+        sql = f"INSERT OR REPLACE INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+        date_cols = {"month", "period_end", "as_of"}
+
+        def convert(name: str, raw):
+            if name in date_cols:
+                return parse_month(raw)
+            if name in _TEXT_FIELDS:
+                return (raw or "").strip() or None
+            return parse_amount(raw)
+
+        def convert_row(number: int, row: dict) -> list:
+            converted = []
+            for name in (*keys, *values):
+                try:
+                    converted.append(convert(name, row.get(name)))
+                except ValueError as e:
+                    raise ValueError(f"{source}: row {number}, column {name!r}: {e}") from None
+            return converted
+
+        conn = self._conn()
+        count = 0
+        with conn:
+            for batch in _batched(enumerate(rows, start=first_row), batch_size):
+                ids = self._client_ids(r["client_name"] for _, r in batch)
+                conn.executemany(sql, [
+                    (ids[r["client_name"].strip()], *convert_row(number, r))
+                    for number, r in batch
+                ])
+                count += len(batch)
+            conn.execute(
+                "INSERT INTO imports (dataset, version, imported_at) VALUES (?, 1, ?) "
+                "ON CONFLICT (dataset) DO UPDATE SET version = version + 1, imported_at = excluded.imported_at",
+                (dataset, datetime.now(timezone.utc).isoformat()),
+            )
+        logger.info("Imported %d %s rows into %s", count, dataset, self.path)
+        for hook in IMPORT_HOOKS:
+            try:
+                hook(dataset)
+            except Exception:
+                logger.exception("Import hook %r failed", hook)
+        return count
+
+    def import_versions(self) -> dict[str, int]:
+        """{dataset: version} — a version changes whenever that dataset is imported, by any process."""
+        return dict(self._conn().execute("SELECT dataset, version FROM imports").fetchall())
+
+    def import_csv(self, dataset: str, path: Path) -> int:
+        """Bulk-load one CSV export. Streams the file — no need to fit it in memory."""
+        with Path(path).open(newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            missing = {"client_name", *DATASETS[dataset][1]} - set(reader.fieldnames or ())
+            if missing:
+                raise ValueError(f"{path}: missing required column(s) {sorted(missing)}")
+            # Row 1 is the header — data rows are numbered as a spreadsheet shows them
+            return self.import_rows(dataset, reader, source=str(path), first_row=2)
+
+
+def _batched(rows: Iterable[tuple[int, dict]], size: int) -> Iterator[list[tuple[int, dict]]]:
+    """(row number, row) pairs in lists of `size`, skipping rows with no client_name."""
+    batch = []
+    for number, row in rows:
+        if (row.get("client_name") or "").strip():
+            batch.append((number, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def open_data_store() -> Optional[FinancialDataStore]:
+    """The store named by FINANCIAL_DB, or None (tools fall back to simulated data)."""
+    path = os.getenv("FINANCIAL_DB")
+    return FinancialDataStore(path) if path else None
+
+
+# =============================================================================
+# CLI — import, synthetic load-test data, query plans
+# =============================================================================
+
+def synth(store: FinancialDataStore, n_clients: int, n_months: int, seed: int = 0) -> int:
+    """Fill the store with random clients (revenue, expenses, cash flow, AR) for load testing."""
+    rng = random.Random(seed)
+    end = "2025-02"
+    months = [_shift_month(end, -i) for i in reversed(range(n_months))]
+    categories = (("salaries_benefits", "fixed"), ("rent_utilities", "fixed"),
+                  ("cost_of_goods_sold", "variable"), ("marketing", "variable"))
+
+    def clients():
+        for i in range(n_clients):
+            yield f"Synthetic Client {i:05d}", rng.randint(20_000, 400_000)
+
+    revenue, expenses, cash, aging = [], [], [], []
+    for name, base in clients():
+        for month in months:
+            revenue.append({"client_name": name, "month": month, "recurring": str(base),
+                            "project": str(rng.randint(0, base // 4)), "one_time": str(rng.randint(0, 10_000))})
+        for month in months[-12:]:
+            for category, kind in categories:
+                expenses.append({"client_name": name, "month": month, "category": category,
+                                 "expense_type": kind, "amount": str(rng.randint(1_000, base // 3))})
+        cash.append({"client_name": name, "period_end": end,
+                     **{f: str(rng.randint(-50_000, 300_000)) for f in CASH_FLOW_FIELDS}})
+        aging.append({"client_name": name, "as_of": end,
+                      **{b: str(rng.randint(0, base)) for b in AR_BUCKETS}})
+
+    return sum(store.import_rows(dataset, rows) for dataset, rows in
+               (("revenue", revenue), ("expenses", expenses), ("cash_flow", cash), ("ar_aging", aging)))
+
+
+def explain(store: FinancialDataStore):
+    """Print the query plan of every tool read — each should SEARCH on the primary key, never SCAN."""
+    conn = store._conn()
+    queries = {
+        "client lookup": ("SELECT client_id FROM clients WHERE name = ?", ("x",)),
+        "revenue": ("SELECT * FROM revenue_monthly WHERE client_id = ? ORDER BY month DESC LIMIT 12", (1,)),
+        "expenses": ("SELECT category, SUM(amount) FROM expense_monthly "
+                     "WHERE client_id = ? AND month BETWEEN ? AND ? GROUP BY category", (1, "a", "b")),
+        "cash flow": ("SELECT * FROM cash_flow WHERE client_id = ? ORDER BY period_end DESC LIMIT 1", (1,)),
+        "key metrics": ("SELECT * FROM key_metrics WHERE client_id = ? ORDER BY as_of DESC LIMIT 1", (1,)),
+        "ar aging": ("SELECT * FROM ar_aging WHERE client_id = ? ORDER BY as_of DESC LIMIT 1", (1,)),
+    }
+    for label, (sql, params) in queries.items():
+        plan = "; ".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+        print(f"  {label:<13} {plan}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local financial data store for the agent tools.")
+    parser.add_argument("--db", type=Path, default=Path(os.getenv("FINANCIAL_DB") or DEFAULT_DB_PATH),
+                        help="SQLite file (default: $FINANCIAL_DB or financial.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Bulk-import a CSV export")
+    imp.add_argument("dataset", choices=sorted(DATASETS))
+    imp.add_argument("csv", type=Path)
+
+    syn = sub.add_parser("synth", help="Generate synthetic clients for load testing")
+    syn.add_argument("--clients", type=int, default=5000)
+    syn.add_argument("--months", type=int, default=60)
+
+    sub.add_parser("explain", help="Show query plans for the tool lookups")
+    args = parser.parse_args()
+
+    store = FinancialDataStore(args.db)
+    if args.command == "import":
+        count = store.import_csv(args.dataset, args.csv)
+        print(f"[data_store] imported {count:,} {args.dataset} rows into {args.db}")
+    elif args.command == "synth":
+        started = time.perf_counter()
+        count = synth(store, args.clients, args.months)
+        print(f"[data_store] wrote {count:,} rows in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        lookups = 1000
+        for i in range(lookups):
+            store.revenue_data(f"Synthetic Client {random.randrange(args.clients):05d}")
+        print(f"[data_store] revenue lookup: {(time.perf_counter() - started) / lookups * 1000:.3f} ms avg")
+    else:
+        explain(store)
+
+
+if __name__ == "__main__":
+    main()
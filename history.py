@@ -0,0 +1,139 @@
+"""
+history.py — Token-budgeted compaction of the agent's message history
+======================================================================
+
+THE PROBLEM:
+    The API is stateless, so the agent loop resends the full history on every
+    iteration. Each tool turn appends the assistant's tool_use blocks plus the
+    JSON tool results, so input tokens grow roughly quadratically over a run:
+    iteration 6 pays again for every tool result from iterations 1–5.
+
+THE FIX:
+    Once the history passes a token budget, shrink OLD tool results in place.
+    The newest turn is always kept verbatim — that's what the model is reasoning
+    about right now. Older results have already been read and acted on;
+    their headline numbers and flags are enough for the final report.
+
+TWO LEVELS (applied oldest-first, only until the history fits):
+    1. shrink    — drop row-level detail (lists of records like monthly_detail,
+                   top_overdue_accounts); keep every scalar, nested total and flag
+    2. summarize — keep only top-level scalars, "summary" and "flags"
+
+    Compacted results carry "_compacted": "<level>" so they're never processed twice
+    and the model can tell it is looking at a digest. Results sent in the compact
+    table format (result_encoding.py) are decoded, shrunk and re-encoded the same way.
+
+TOKEN ESTIMATE:
+    ~4 characters per token for JSON-heavy content. Good enough for a budget
+    check without an extra API round-trip (client.messages.count_tokens is exact
+    but costs a request).
+"""
+
+import json
+from typing import Any
+
+from result_encoding import decode_result, detect_format, encode_result
+
+CHARS_PER_TOKEN = 4
+
+# Keys that survive the "summarize" level
+SUMMARY_KEYS = ("summary", "flags")
+
+
+def content_to_dicts(content: list) -> list[dict]:
+    """
+    Convert SDK content blocks (TextBlock, ToolUseBlock) to plain dicts.
+
+    WHY: the history must be measurable and JSON-serializable. Plain dicts
+    are accepted by the API exactly like the SDK objects they came from.
+    """
+    return [
+        block.model_dump(exclude_none=True) if hasattr(block, "model_dump") else block
+        for block in content
+    ]
+
+
+def estimate_tokens(messages: list[dict]) -> int:
+    """Rough token count for a message list (chars / CHARS_PER_TOKEN)."""
+    return len(json.dumps(messages, default=str)) // CHARS_PER_TOKEN
+
+
+def _is_record_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(v, dict) for v in value)
+
+
+def _shrink(result: dict) -> dict:
+    """Level 1: replace lists of records with a row count, recursively."""
+    out = {}
+    for key, value in result.items():
+        if _is_record_list(value):
+            out[key] = f"[{len(value)} rows omitted to save context]"
+        elif isinstance(value, dict):
+            out[key] = _shrink(value)
+        else:
+            out[key] = value
+    return out
+
+
+def _summarize(result: dict) -> dict:
+    """Level 2: keep only top-level scalars plus summary/flags."""
+    return {
+        key: value
+        for key, value in result.items()
+        if key in SUMMARY_KEYS or not isinstance(value, (dict, list))
+    }
+
+
+_LEVELS = (("shrink", _shrink), ("summarize", _summarize))
+
+
+def _tool_result_blocks(messages: list[dict]):
+    """Yield every tool_result block in messages, oldest first."""
+    for message in messages:
+        if message["role"] != "user" or not isinstance(message["content"], list):
+            continue
+        for block in message["content"]:
+            if isinstance(block, dict) and block.get("type") == "tool_result":
+                yield block
+
+
+def compact_history(messages: list[dict], budget_tokens: int, keep_last: int = 2) -> int:
+    """
+    Shrink old tool results in place until the history fits budget_tokens.
+
+    Args:
+        messages:      The agent's history (modified in place)
+        budget_tokens: Compaction starts once estimate_tokens(messages) exceeds this
+        keep_last:     Trailing messages left untouched — 2 = the newest
+                       assistant tool_use turn + its tool_result turn
+
+    Returns:
+        Estimated tokens saved by this call (0 if already under budget).
+    """
+    before = estimate_tokens(messages)
+    if before <= budget_tokens:
+        return 0
+
+    old = messages[:-keep_last] if keep_last else messages
+    current = before
+    for level, compact in _LEVELS:
+        for block in _tool_result_blocks(old):
+            if current <= budget_tokens:
+                return before - current
+            try:
+                result = decode_result(block["content"])
+            except (TypeError, ValueError):
+                continue  # Not a structured payload (plain text) — leave it alone
+            if not isinstance(result, dict) or result.get("_compacted") == level:
+                continue
+            if level == "shrink" and result.get("_compacted") == "summarize":
+                continue
+
+            fmt = detect_format(block["content"])
+            compacted = encode_result({**compact(result), "_compacted": level}, fmt)
+            saved = (len(block["content"]) - len(compacted)) // CHARS_PER_TOKEN
+            if saved > 0:
+                block["content"] = compacted
+                current -= saved
+
+    return before - current
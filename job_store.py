@@ -0,0 +1,676 @@
+"""
+job_store.py — Persistent job records for agent_server.py
+==========================================================
+
+WHAT THIS FILE DOES:
+    Stores every agent_server job — who it was for, its status, timestamps,
+    the final report, the trace — in a SQLite file, so GET /jobs and
+    GET /jobs/{id} keep answering after a restart or deploy.
+
+WHY SQLITE (WAL):
+    The server used to keep every job in a dict. A restart lost them all,
+    and every finished report stayed in memory forever. Now the process only
+    holds the jobs that are actually running; everything else is a row on
+    disk. WAL mode lets the polling endpoints read while a finishing job writes.
+
+LAYOUT:
+    jobs          one row per job. Every listing filter has an index that
+                  ends in (submitted_at, job_id): status, agent, client_name
+                  (case-insensitive) and plain submission time. So "newest 50
+                  failed jobs", "Acme's jobs in March" or "the page after this
+                  cursor" is an index range read, not a table scan + sort.
+    result_z      the report, zlib-compressed, in its own column. Listing
+                  queries never select it, so GET /jobs reads a few hundred
+                  bytes per job no matter how long the reports are.
+    request_key   hash of (agent, normalized client, normalized context).
+                  Indexed, so "same request finished in the last 5 minutes?"
+                  is one lookup — the report is addressed by what was asked.
+
+QUEUE:
+    The table is also the job queue, so any number of server/worker
+    processes on one host can share it. A submission is a "pending" row;
+    claim() hands the most urgent one (lowest priority value, then oldest)
+    to exactly one worker with a single atomic UPDATE. The claiming worker
+    heartbeats its running rows; a row whose heartbeat is older than
+    JOB_STALE_SECONDS belongs to a worker that died and is claimed again.
+    Cancelling a running job sets cancel_requested — the owning worker sees
+    it on its next heartbeat. A partial unique index on request_key over
+    pending/running rows makes duplicate submissions from two processes at
+    once collapse onto one job: the second insert is simply ignored.
+
+WEBHOOKS:
+    webhooks      one row per (job, callback_url) — the outbound delivery
+                  queue for webhooks.py. A row waits until its job finishes,
+                  then is claimed with a lease (next_attempt_at pushed into
+                  the future), so a process that dies mid-delivery just lets
+                  the lease run out and another one retries. Each row keeps
+                  its attempts, last error and delivery latency.
+
+PAGINATION:
+    list_jobs() pages by keyset, not OFFSET: the cursor is the (submitted_at,
+    job_id) of the last row returned, and the next page starts just below it.
+    Page 500 costs the same as page 1, and a job submitted while someone is
+    paging doesn't shift rows between pages.
+
+        python job_store.py explain    # query plans for the listing filters
+
+RETENTION:
+    purge() deletes finished jobs older than JOB_RETENTION_DAYS and keeps at
+    most JOB_MAX_STORED finished jobs (newest first). agent_server runs it at
+    startup and hourly. Pending/running jobs are never purged.
+
+PLUGGABLE:
+    agent_server only needs the JobStore methods below. A Postgres or Redis
+    implementation drops in the same way — assign it to agent_server.store.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Protocol
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv("JOB_DB", "jobs.db")
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "30"))
+JOB_MAX_STORED = int(os.getenv("JOB_MAX_STORED", "10000"))
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+ACTIVE_STATUSES = ("pending", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id        TEXT PRIMARY KEY,
+    agent         TEXT NOT NULL,
+    client_name   TEXT NOT NULL,
+    context       TEXT NOT NULL DEFAULT '',
+    status        TEXT NOT NULL,
+    submitted_at  TEXT NOT NULL,       -- ISO 8601 UTC, so text order = time order
+    completed_at  TEXT,
+    error         TEXT,
+    trace         TEXT,                -- JSON
+    result_bytes  INTEGER,             -- uncompressed size of the report
+    result_z      BLOB,                -- zlib(report) — never read by listings
+    request_key   TEXT,                -- request_key(agent, client, context)
+    mode          TEXT,                -- agent.py mode the job runs as
+    priority      INTEGER NOT NULL DEFAULT 0,   -- lower is claimed first
+    worker_id     TEXT,                -- "host:pid" of the worker that claimed it
+    heartbeat_at  REAL,                -- unix time of that worker's last heartbeat
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_time ON jobs (submitted_at, job_id);
+CREATE INDEX IF NOT EXISTS jobs_status_time ON jobs (status, submitted_at, job_id);
+CREATE INDEX IF NOT EXISTS jobs_agent_time ON jobs (agent, submitted_at, job_id);
+CREATE INDEX IF NOT EXISTS jobs_client_time ON jobs (client_name COLLATE NOCASE, submitted_at, job_id);
+DROP INDEX IF EXISTS jobs_status_submitted;   -- superseded by jobs_status_time
+DROP INDEX IF EXISTS jobs_submitted;          -- superseded by jobs_time
+
+CREATE TABLE IF NOT EXISTS webhooks (
+    delivery_id     INTEGER PRIMARY KEY,
+    job_id          TEXT NOT NULL,
+    url             TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'pending',   -- pending | delivered | failed
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,     -- unix time; pushed ahead while a process holds the lease
+    created_at      REAL NOT NULL,
+    delivered_at    REAL,
+    request_ms      REAL,              -- duration of the last POST
+    lag_ms          REAL,              -- job completed_at → delivered
+    last_error      TEXT,
+    UNIQUE (job_id, url)
+);
+CREATE INDEX IF NOT EXISTS webhooks_due ON webhooks (status, next_attempt_at);
+"""
+
+# Columns added since the first release — SQLiteJobStore adds any an older file lacks
+MIGRATED_COLUMNS = {
+    "request_key": "TEXT",
+    "mode": "TEXT",
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+    "worker_id": "TEXT",
+    "heartbeat_at": "REAL",
+    "cancel_requested": "INTEGER NOT NULL DEFAULT 0",
+}
+
+# Created after the column migration
+INDEXES_AFTER_MIGRATION = """
+CREATE INDEX IF NOT EXISTS jobs_request_completed ON jobs (request_key, completed_at);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, submitted_at);
+"""
+
+# At most one live job per request — the cross-process half of duplicate detection
+ACTIVE_REQUEST_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_request_active ON jobs (request_key)
+    WHERE status IN ('pending', 'running') AND cancel_requested = 0
+"""
+
+# Columns returned by listings — everything except the report and trace
+SUMMARY_COLUMNS = "job_id, agent, client_name, status, submitted_at, completed_at, result_bytes"
+
+_UPDATABLE = {"status", "completed_at", "error", "trace", "result", "context"}
+
+
+class JobStore(Protocol):
+    """What agent_server.py needs from a job store. Jobs go in and come out as dicts."""
+
+    def create(self, job: dict) -> bool: ...
+    def update(self, job_id: str, **fields) -> None: ...
+    def requeue(self, job_id: str) -> bool: ...
+    def claim(self, worker_id: str, reclaim_after: Optional[float] = None) -> Optional[dict]: ...
+    def heartbeat(self, worker_id: str, job_ids: list[str]) -> list[str]: ...
+    def release(self, job_id: str, worker_id: str) -> None: ...
+    def request_cancel(self, job_id: str) -> Optional[str]: ...
+    def add_webhook(self, job_id: str, url: str) -> None: ...
+    def claim_webhooks(self, limit: int, lease_seconds: float) -> list[dict]: ...
+    def finish_webhook(self, delivery_id: int, request_ms: float, error: Optional[str] = None,
+                       lag_ms: Optional[float] = None, retry_at: Optional[float] = None) -> None: ...
+    def webhook_counts(self) -> dict: ...
+    def recent_deliveries(self, limit: int = 1000) -> list[dict]: ...
+    def get(self, job_id: str) -> Optional[dict]: ...
+    def list_jobs(self, limit: int = 100, cursor: Optional[str] = None, **filters) -> tuple[list[dict], Optional[str]]: ...
+    def find_active(self, key: str) -> Optional[dict]: ...
+    def find_completed(self, key: str, since: str) -> Optional[dict]: ...
+    def count(self, **filters) -> int: ...
+    def purge(self, max_age_days: float = JOB_RETENTION_DAYS, max_jobs: int = JOB_MAX_STORED) -> int: ...
+
+
+def request_key(agent: str, client_name: str, context: str) -> str:
+    """
+    Identity of a request: same agent, same client, same context → same key.
+
+    Case and whitespace are normalized so "Acme Co. " and "acme  co." from a
+    retried webhook or a double-clicked form count as one request.
+    """
+    def normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip().casefold()
+
+    identity = "\0".join((agent, normalize(client_name), normalize(context)))
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def encode_cursor(submitted_at: str, job_id: str) -> str:
+    """Opaque page cursor for the row a page ended on."""
+    return base64.urlsafe_b64encode(f"{submitted_at}|{job_id}".encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """encode_cursor() back to (submitted_at, job_id). Raises ValueError if it isn't one."""
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        submitted_at, job_id = text.split("|", 1)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    return submitted_at, job_id
+
+
+def _filter_sql(
+    status: Optional[str] = None,
+    agent: Optional[str] = None,
+    client_name: Optional[str] = None,
+    submitted_after: Optional[str] = None,
+    submitted_before: Optional[str] = None,
+) -> tuple[str, list]:
+    """WHERE clause + params for the listing filters. Each one maps onto an index prefix."""
+    clauses, params = [], []
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if agent:
+        clauses.append("agent = ?")
+        params.append(agent)
+    if client_name:
+        clauses.append("client_name = ? COLLATE NOCASE")
+        params.append(client_name.strip())
+    if submitted_after:
+        clauses.append("submitted_at >= ?")
+        params.append(submitted_after)
+    if submitted_before:
+        clauses.append("submitted_at < ?")
+        params.append(submitted_before)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _compress(text: Optional[str]) -> tuple[Optional[int], Optional[bytes]]:
+    if text is None:
+        return None, None
+    raw = text.encode("utf-8")
+    return len(raw), zlib.compress(raw, 6)
+
+
+class SQLiteJobStore:
+    """
+    SQLite-backed JobStore.
+
+    One connection per thread: FastAPI runs plain `def` endpoints on a
+    thread pool, and sqlite3 connections must not be shared across threads.
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in MIGRATED_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+        conn.executescript(INDEXES_AFTER_MIGRATION)
+        try:
+            conn.execute(ACTIVE_REQUEST_INDEX)
+        except sqlite3.IntegrityError:
+            # A file from before the index already holds two live copies of a request
+            logger.warning("jobs_request_active not created: duplicate live jobs in %s", self.path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: commits don't fsync — a crash can lose the last
+            # status change, never corrupt the file. Checkpoints cover the agent state.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -------------------------------------------------------------------------
+    # WRITES
+    # -------------------------------------------------------------------------
+
+    def create(self, job: dict) -> bool:
+        """
+        Insert a job. False (and nothing written) if the job_id exists, or if
+        it is pending and an identical request is already pending/running.
+        """
+        result_bytes, result_z = _compress(job.get("result"))
+        with self._conn() as conn:
+            inserted = conn.execute(
+                """
+                INSERT OR IGNORE INTO jobs (job_id, agent, client_name, context, status,
+                    submitted_at, completed_at, error, trace, result_bytes, result_z,
+                    request_key, mode, priority)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job["job_id"], job["agent"], job["client_name"], job.get("context", ""),
+                    job["status"], job["submitted_at"], job.get("completed_at"), job.get("error"),
+                    json.dumps(job["trace"]) if job.get("trace") is not None else None,
+                    result_bytes, result_z,
+                    request_key(job["agent"], job["client_name"], job.get("context", "")),
+                    job.get("mode"), job.get("priority", 0),
+                ),
+            ).rowcount
+        return inserted == 1
+
+    def update(self, job_id: str, **fields) -> None:
+        """Set some columns: update(job_id, status="completed", result="...", trace={...})."""
+        unknown = set(fields) - _UPDATABLE
+        if unknown:
+            raise ValueError(f"Not updatable: {sorted(unknown)}")
+        columns = {k: v for k, v in fields.items() if k not in ("result", "trace")}
+        if "trace" in fields:
+            columns["trace"] = json.dumps(fields["trace"]) if fields["trace"] is not None else None
+        if "result" in fields:
+            columns["result_bytes"], columns["result_z"] = _compress(fields["result"])
+        if not columns:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        with self._conn() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*columns.values(), job_id))
+
+    def requeue(self, job_id: str) -> bool:
+        """
+        Put a failed job back in the queue (POST /jobs/{id}/resume). False if it
+        isn't failed, or an identical request is already pending/running.
+        """
+        try:
+            with self._conn() as conn:
+                requeued = conn.execute(
+                    "UPDATE jobs SET status = 'pending', error = NULL, completed_at = NULL, "
+                    "worker_id = NULL, heartbeat_at = NULL WHERE job_id = ? AND status = 'failed'",
+                    (job_id,),
+                ).rowcount == 1
+                if requeued:
+                    # Its callbacks heard about the failure — they fire again when the rerun finishes
+                    conn.execute(
+                        "UPDATE webhooks SET status = 'pending', attempts = 0, next_attempt_at = ?, "
+                        "delivered_at = NULL, request_ms = NULL, lag_ms = NULL, last_error = NULL "
+                        "WHERE job_id = ?",
+                        (time.time(), job_id),
+                    )
+                return requeued
+        except sqlite3.IntegrityError:
+            return False
+
+    def purge(self, max_age_days: float = JOB_RETENTION_DAYS, max_jobs: int = JOB_MAX_STORED) -> int:
+        """Delete finished jobs past the retention window or beyond the newest max_jobs. Returns rows deleted."""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat()
+        placeholders = ", ".join("?" * len(TERMINAL_STATUSES))
+        with self._conn() as conn:
+            deleted = conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND submitted_at < ?",
+                (*TERMINAL_STATUSES, cutoff),
+            ).rowcount
+            deleted += conn.execute(
+                f"""
+                DELETE FROM jobs WHERE job_id IN (
+                    SELECT job_id FROM jobs WHERE status IN ({placeholders})
+                    ORDER BY submitted_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (*TERMINAL_STATUSES, max_jobs),
+            ).rowcount
+            conn.execute("DELETE FROM webhooks WHERE job_id NOT IN (SELECT job_id FROM jobs)")
+        return deleted
+
+    # -------------------------------------------------------------------------
+    # QUEUE
+    # -------------------------------------------------------------------------
+
+    def claim(self, worker_id: str, reclaim_after: Optional[float] = None) -> Optional[dict]:
+        """
+        Take the next job for worker_id and mark it running. None if there is none.
+
+        First a running job whose worker stopped heartbeating more than
+        reclaim_after seconds ago (None = never reclaim), then the most urgent
+        pending one. Each is one UPDATE, so two workers can't claim the same row.
+        A stale job someone asked to cancel is marked cancelled, not reclaimed.
+        """
+        now = time.time()
+        candidates = []
+        if reclaim_after is not None:
+            with self._conn() as conn:
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', completed_at = ? "
+                    "WHERE status = 'running' AND cancel_requested = 1 AND COALESCE(heartbeat_at, 0) < ?",
+                    (datetime.now(timezone.utc).isoformat(), now - reclaim_after),
+                )
+            candidates.append((
+                "status = 'running' AND cancel_requested = 0 AND COALESCE(heartbeat_at, 0) < ?",
+                (now - reclaim_after,),
+            ))
+        candidates.append(("status = 'pending'", ()))
+        for where, params in candidates:
+            with self._conn() as conn:
+                # fetchall(), not fetchone(): a RETURNING statement must finish before the commit
+                rows = conn.execute(
+                    f"""
+                    UPDATE jobs SET status = 'running', worker_id = ?, heartbeat_at = ?
+                    WHERE job_id = (
+                        SELECT job_id FROM jobs WHERE {where}
+                        ORDER BY priority, submitted_at LIMIT 1
+                    )
+                    RETURNING job_id, agent, client_name, context, mode, submitted_at
+                    """,
+                    (worker_id, now, *params),
+                ).fetchall()
+            if rows:
+                return dict(rows[0])
+        return None
+
+    def heartbeat(self, worker_id: str, job_ids: list[str]) -> list[str]:
+        """Mark worker_id's running jobs alive. Returns the ones someone asked to cancel."""
+        if not job_ids:
+            return []
+        placeholders = ", ".join("?" * len(job_ids))
+        with self._conn() as conn:
+            conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? "
+                f"WHERE worker_id = ? AND status = 'running' AND job_id IN ({placeholders})",
+                (time.time(), worker_id, *job_ids),
+            )
+            rows = conn.execute(
+                f"SELECT job_id FROM jobs WHERE cancel_requested = 1 AND job_id IN ({placeholders})",
+                job_ids,
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def release(self, job_id: str, worker_id: str) -> None:
+        """Hand a running job back to the queue (worker shutdown) — the next claim resumes it."""
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', worker_id = NULL, heartbeat_at = NULL "
+                "WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+                (job_id, worker_id),
+            )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job wherever it is. Returns its status before the call (None if unknown):
+        "pending" — now cancelled; "running" — flagged for its worker; anything else — unchanged.
+        """
+        # Conditional UPDATEs, not read-then-write: a worker may claim the job in between
+        with self._conn() as conn:
+            if conn.execute(
+                "UPDATE jobs SET status = 'cancelled', completed_at = ?, cancel_requested = 1 "
+                "WHERE job_id = ? AND status = 'pending'",
+                (datetime.now(timezone.utc).isoformat(), job_id),
+            ).rowcount:
+                return "pending"
+            if conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'",
+                (job_id,),
+            ).rowcount:
+                return "running"
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    # -------------------------------------------------------------------------
+    # WEBHOOKS
+    # -------------------------------------------------------------------------
+
+    def add_webhook(self, job_id: str, url: str) -> None:
+        """Queue a POST to url once the job finishes. Registering the same url twice is a no-op."""
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO webhooks (job_id, url, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, url, now, now),
+            )
+
+    def claim_webhooks(self, limit: int, lease_seconds: float) -> list[dict]:
+        """
+        Up to `limit` due deliveries whose job has finished, oldest due first.
+
+        Claiming pushes next_attempt_at lease_seconds ahead: nobody else picks
+        them up meanwhile, and if this process dies they come due again.
+        """
+        now = time.time()
+        placeholders = ", ".join("?" * len(TERMINAL_STATUSES))
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"""
+                UPDATE webhooks SET next_attempt_at = ?
+                WHERE delivery_id IN (
+                    SELECT w.delivery_id FROM webhooks w JOIN jobs j ON j.job_id = w.job_id
+                    WHERE w.status = 'pending' AND w.next_attempt_at <= ?
+                      AND j.status IN ({placeholders})
+                    ORDER BY w.next_attempt_at LIMIT ?
+                )
+                RETURNING delivery_id, job_id, url, attempts, created_at
+                """,
+                (now + lease_seconds, now, *TERMINAL_STATUSES, limit),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def finish_webhook(
+        self,
+        delivery_id: int,
+        request_ms: float,
+        error: Optional[str] = None,
+        lag_ms: Optional[float] = None,
+        retry_at: Optional[float] = None,
+    ) -> None:
+        """
+        Record one attempt. No error → delivered. An error with retry_at → try
+        again then; without → failed for good.
+        """
+        if error is None:
+            status, next_attempt_at = "delivered", None
+        elif retry_at is not None:
+            status, next_attempt_at = "pending", retry_at
+        else:
+            status, next_attempt_at = "failed", None
+        with self._conn() as conn:
+            conn.execute(
+                """
+                UPDATE webhooks SET status = ?, attempts = attempts + 1,
+                    next_attempt_at = COALESCE(?, next_attempt_at), request_ms = ?, last_error = ?,
+                    lag_ms = ?, delivered_at = CASE WHEN ? = 'delivered' THEN ? END
+                WHERE delivery_id = ?
+                """,
+                (status, next_attempt_at, request_ms, error, lag_ms, status, time.time(), delivery_id),
+            )
+
+    def webhook_counts(self) -> dict:
+        """Deliveries per status, plus every failed attempt (retries included)."""
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) AS n, SUM(attempts) AS attempts FROM webhooks GROUP BY status"
+        ).fetchall()
+        counts = {status: 0 for status in ("pending", "delivered", "failed")}
+        failed_attempts = 0
+        for row in rows:
+            counts[row["status"]] = row["n"]
+            # A delivered row's last attempt succeeded; every other attempt failed
+            failed_attempts += row["attempts"] - (row["n"] if row["status"] == "delivered" else 0)
+        return {**counts, "failed_attempts": failed_attempts}
+
+    def recent_deliveries(self, limit: int = 1000) -> list[dict]:
+        """Latency of the newest successful deliveries."""
+        rows = self._conn().execute(
+            "SELECT request_ms, lag_ms, attempts FROM webhooks WHERE status = 'delivered' "
+            "ORDER BY delivered_at DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    # -------------------------------------------------------------------------
+    # READS
+    # -------------------------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """One job, report and trace included. None if unknown (or purged)."""
+        row = self._conn().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        result_z = job.pop("result_z")
+        job["result"] = zlib.decompress(result_z).decode("utf-8") if result_z is not None else None
+        job["trace"] = json.loads(job["trace"]) if job["trace"] else None
+        return job
+
+    def list_jobs(
+        self, limit: int = 100, cursor: Optional[str] = None, **filters
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        One page of jobs, newest first, summary columns only — never touches result_z.
+
+        filters: status, agent, client_name (case-insensitive), submitted_after /
+        submitted_before (ISO 8601, UTC). Returns (jobs, next_cursor); next_cursor
+        is None on the last page. Raises ValueError for a malformed cursor.
+        """
+        where, params = _filter_sql(**filters)
+        if cursor:
+            where += (" AND " if where else " WHERE ") + "(submitted_at, job_id) < (?, ?)"
+            params.extend(decode_cursor(cursor))
+        rows = self._conn().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM jobs{where} ORDER BY submitted_at DESC, job_id DESC LIMIT ?",
+            (*params, limit + 1),  # One extra row says whether another page exists
+        ).fetchall()
+        page = [dict(r) for r in rows[:limit]]
+        next_cursor = encode_cursor(page[-1]["submitted_at"], page[-1]["job_id"]) if len(rows) > limit else None
+        return page, next_cursor
+
+    def find_active(self, key: str) -> Optional[dict]:
+        """The pending/running job with this request_key, unless it is being cancelled."""
+        row = self._conn().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM jobs "
+            "WHERE request_key = ? AND status IN ('pending', 'running') AND cancel_requested = 0",
+            (key,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def find_completed(self, key: str, since: str) -> Optional[dict]:
+        """The newest completed job with this request_key that finished at or after `since` (ISO)."""
+        row = self._conn().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM jobs "
+            "WHERE request_key = ? AND completed_at >= ? AND status = 'completed' "
+            "ORDER BY completed_at DESC LIMIT 1",
+            (key, since),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def count(self, **filters) -> int:
+        """Jobs matching the list_jobs() filters — counted on the same indexes."""
+        where, params = _filter_sql(**filters)
+        return self._conn().execute(f"SELECT COUNT(*) FROM jobs{where}", params).fetchone()[0]
+
+
+def open_job_store() -> SQLiteJobStore:
+    """The store at JOB_DB (default jobs.db in the working directory)."""
+    return SQLiteJobStore(DEFAULT_DB_PATH)
+
+
+# =============================================================================
+# CLI — query plans, manual purge
+# =============================================================================
+
+EXPLAIN_QUERIES = {
+    "newest page": {},
+    "by status": {"status": "failed"},
+    "by agent": {"agent": "xray"},
+    "by client": {"client_name": "Acme Manufacturing Co."},
+    "date range": {"submitted_after": "2025-03-01", "submitted_before": "2025-04-01"},
+    "client + range": {"client_name": "Acme", "submitted_after": "2025-03-01"},
+}
+
+
+def explain(store: SQLiteJobStore):
+    """Print SQLite's plan for each listing filter — each should SEARCH an index, never SCAN + sort."""
+    cursor = encode_cursor("2025-03-15T00:00:00+00:00", "xry_00000000")
+    for label, filters in EXPLAIN_QUERIES.items():
+        where, params = _filter_sql(**filters)
+        where += (" AND " if where else " WHERE ") + "(submitted_at, job_id) < (?, ?)"
+        params.extend(decode_cursor(cursor))
+        plan = store._conn().execute(
+            f"EXPLAIN QUERY PLAN SELECT {SUMMARY_COLUMNS} FROM jobs{where} "
+            "ORDER BY submitted_at DESC, job_id DESC LIMIT 101",
+            params,
+        ).fetchall()
+        print(f"{label}:")
+        for row in plan:
+            print(f"    {row['detail']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="agent_server job store maintenance.")
+    parser.add_argument("--db", type=Path, default=Path(DEFAULT_DB_PATH),
+                        help="SQLite file (default: $JOB_DB or jobs.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("explain", help="Show query plans for the GET /jobs filters")
+    sub.add_parser("purge", help="Apply the retention policy now")
+    args = parser.parse_args()
+
+    store = SQLiteJobStore(args.db)
+    if args.command == "explain":
+        explain(store)
+    else:
+        print(f"[job_store] purged {store.purge():,} finished jobs; {store.count():,} remain")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,11 @@ WHY this pattern (research → Claude → template):
     Raw search results are noise. Claude turns them into signal.
     The template forces the output into something usable 60 seconds before a call.
     Context (emails) is the highest-quality signal — it comes first in the prompt.
+
+PROMPT CACHING:
+    Business description + north star are the same for every person, so they
+    form a cached prefix (prompt_cache.py). The output template names the person
+    and the date, so it sits after the breakpoint.
 """
 
 import os
@@ -23,6 +28,9 @@ import anthropic
 from datetime import date
 from pathlib import Path
 
+from cassette import wrap_client
+from prompt_cache import build_system, log_usage
+
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
 # Paths — relative to this file so they work identically locally and on VPS
@@ -114,9 +122,10 @@ def run_meeting_prep(name: str, context: str = "") -> tuple[str, Path]:
     north_star = _load_north_star()
     today = date.today().strftime("%Y-%m-%d")
 
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    client = wrap_client(anthropic.Anthropic(api_key=ANTHROPIC_API_KEY))
 
-    system_prompt = f"""You are Bellissimo OS — JB's personal operating system and chief of staff.
+    # Stable prefix — same for every person (cached)
+    stable_context = f"""You are Bellissimo OS — JB's personal operating system and chief of staff.
 
 JB runs two businesses:
 - Bellissimo AI Labs: AI consulting firm. Builds company operating systems + AI automation.
@@ -129,9 +138,10 @@ Strategic context:
 
 YOUR JOB:
 Generate a meeting prep brief JB will read 60 seconds before his call.
-Be direct. No filler. Identify the real opportunity and give JB the exact words.
+Be direct. No filler. Identify the real opportunity and give JB the exact words."""
 
-OUTPUT FORMAT (use exactly this structure — no deviations):
+    # Dynamic suffix — names the person and today's date, so it goes after the breakpoint
+    output_format = f"""OUTPUT FORMAT (use exactly this structure — no deviations):
 
 # Meeting Prep: {name}
 Date: {today}
@@ -165,6 +175,8 @@ relationship/career/advisory play rather than a sale, say so explicitly.]
 ---
 *Generated by Bellissimo OS*"""
 
+    system_prompt = build_system(stable_context, dynamic=output_format)
+
     # Build user message — context (email/LinkedIn) comes first if provided
     # because it's the highest-quality signal
     user_parts = []
@@ -184,6 +196,7 @@ relationship/career/advisory play rather than a sale, say so explicitly.]
         messages=[{"role": "user", "content": "\n\n---\n\n".join(user_parts)}],
     )
 
+    log_usage(f"meeting_prep:{_slug(name)}", response.usage)
     brief_text = response.content[0].text
 
     # Save to file
@@ -0,0 +1,319 @@
+"""
+metrics_engine.py — Vectorized financial metrics (one client or a whole portfolio)
+===================================================================================
+
+WHAT THIS FILE DOES:
+    Computes the derived numbers behind the tools in tools.py — revenue totals,
+    growth and mix, expense structure, cash-flow roll-ups, AR aging shares —
+    with NumPy, one array per column:
+
+        recurring  shape (clients, months)      ← one row per client
+        net_income shape (clients,)             ← one value per client
+
+    Every function works on any number of rows, so the same code path serves
+    a single tool call (1 row) and a portfolio pass over every client at once.
+
+WHY:
+    The tools used to compute metrics with Python generator sums over lists of
+    dicts — fine for one client, but the SustainCFO portfolio view needs the
+    same numbers for every client. Looping per client in Python costs
+    microseconds per dict access; one NumPy reduction over a (clients, months)
+    array does the whole portfolio in the time a few clients used to take.
+
+HOW THE TOOLS USE IT:
+    tools.py builds 1-row arrays from the client's records, calls the engine,
+    and turns the row back into plain Python numbers with client_row().
+    Tool output is unchanged — execute_tool() and the agent don't know it's here.
+
+BENCHMARK:
+    python metrics_engine.py bench                       # 10k clients × 60 months
+    python metrics_engine.py bench --clients 2000 --months 24
+    Compares the vectorized pass against the per-client Python loop and checks
+    that both give the same numbers.
+"""
+
+import argparse
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# AR aging bucket order — columns of the ar_buckets array
+AR_BUCKETS = ("current_0_30_days", "late_31_60_days", "late_61_90_days", "overdue_90_plus")
+
+
+# =============================================================================
+# CONVERSION HELPERS
+# =============================================================================
+
+def columns(records: list[dict], fields: tuple[str, ...]) -> dict[str, np.ndarray]:
+    """
+    One client's records → 1-row arrays, one per field.
+
+    [{"recurring": 180000, "project": 45000}, ...] → {"recurring": array([[180000, ...]]), ...}
+    """
+    return {name: np.array([[r[name] for r in records]]) for name in fields}
+
+
+def _scalar(value):
+    """NumPy scalar → plain Python number (json.dumps can't serialize np.int64). NaN → None."""
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def client_row(metrics: dict[str, np.ndarray], index: int = 0) -> dict:
+    """Pull one client's metrics out of a portfolio result as plain Python values."""
+    out = {}
+    for name, values in metrics.items():
+        row = values[index]
+        out[name] = [_scalar(v) for v in row] if np.ndim(row) else _scalar(row)
+    return out
+
+
+def _pct(part: np.ndarray, whole: np.ndarray) -> np.ndarray:
+    """part / whole × 100, NaN where whole is 0 (a portfolio can't raise per client)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(whole != 0, part / whole * 100, np.nan)
+
+
+# =============================================================================
+# METRICS — every argument is an array with one row per client
+# =============================================================================
+
+def revenue_metrics(
+    recurring: np.ndarray,
+    project: np.ndarray,
+    one_time: np.ndarray,
+    months: Optional[int] = None,
+) -> dict[str, np.ndarray]:
+    """
+    Revenue summary per client from (clients, months) arrays.
+
+    months: use only the trailing N months (the tool's "months" argument).
+    """
+    if months is not None:
+        recurring, project, one_time = recurring[:, -months:], project[:, -months:], one_time[:, -months:]
+
+    monthly_total = recurring + project + one_time
+    total = monthly_total.sum(axis=1)
+    first_month = monthly_total[:, 0]
+    last_month = monthly_total[:, -1]
+
+    return {
+        "total_revenue_period": total,
+        "avg_monthly_revenue": np.round(total / monthly_total.shape[1], 0),
+        "latest_month_revenue": last_month,
+        "revenue_growth_pct": np.round(_pct(last_month - first_month, first_month), 1),
+        "recurring_pct_of_total": np.round(_pct(recurring.sum(axis=1), total), 1),
+    }
+
+
+def expense_metrics(
+    fixed: np.ndarray,
+    variable: np.ndarray,
+    categories: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """
+    Expense structure per client.
+
+    fixed, variable: (clients,)   categories: (clients, n_categories)
+    """
+    total = fixed + variable
+    return {
+        "total_expenses": total,
+        "fixed_pct_of_total": np.round(_pct(fixed, total), 1),
+        "category_pct_of_total": np.round(_pct(categories, total[:, None]), 1),
+        "largest_category_index": categories.argmax(axis=1),
+    }
+
+
+def cash_flow_metrics(
+    net_income: np.ndarray,
+    depreciation_amortization: np.ndarray,
+    changes_in_working_capital: np.ndarray,
+    total_investing_cf: np.ndarray,
+    total_financing_cf: np.ndarray,
+    beginning_cash: np.ndarray,
+    monthly_burn_rate: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """Cash-flow roll-ups per client — operating CF, free cash flow, runway."""
+    operating = net_income + depreciation_amortization + changes_in_working_capital
+    net_change = operating + total_investing_cf + total_financing_cf
+    ending_cash = beginning_cash + net_change
+    with np.errstate(divide="ignore", invalid="ignore"):
+        runway = np.where(monthly_burn_rate > 0, ending_cash / monthly_burn_rate, np.nan)
+    return {
+        "total_operating_cf": operating,
+        "net_cash_change": net_change,
+        "ending_cash_balance": ending_cash,
+        "free_cash_flow": operating + total_investing_cf,
+        "months_of_runway": np.round(runway, 1),
+    }
+
+
+def ar_metrics(ar_buckets: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    AR aging per client. ar_buckets: (clients, 4) amounts in AR_BUCKETS order.
+    """
+    total = ar_buckets.sum(axis=1)
+    return {
+        "total_ar": total,
+        "bucket_pct": np.round(_pct(ar_buckets, total[:, None]), 1),
+        "overdue_60_plus_pct": np.round(_pct(ar_buckets[:, 2:].sum(axis=1), total), 1),
+    }
+
+
+# =============================================================================
+# PORTFOLIO — every metric for every client in one pass
+# =============================================================================
+
+@dataclass
+class PortfolioFrame:
+    """
+    Column arrays for a set of clients. Row i of every array is clients[i].
+
+    Monthly revenue columns are (clients, months); everything else is
+    (clients,) except expense_categories (clients, n_categories) and
+    ar_buckets (clients, 4).
+    """
+    clients: list[str]
+    recurring: np.ndarray
+    project: np.ndarray
+    one_time: np.ndarray
+    fixed_expenses: np.ndarray
+    variable_expenses: np.ndarray
+    expense_categories: np.ndarray
+    net_income: np.ndarray
+    depreciation_amortization: np.ndarray
+    changes_in_working_capital: np.ndarray
+    total_investing_cf: np.ndarray
+    total_financing_cf: np.ndarray
+    beginning_cash: np.ndarray
+    monthly_burn_rate: np.ndarray
+    ar_buckets: np.ndarray
+
+
+def portfolio_metrics(frame: PortfolioFrame, months: Optional[int] = None) -> dict[str, dict]:
+    """The full metric set for every client: {"revenue": {...}, "expenses": ..., "cash_flow": ..., "ar": ...}."""
+    return {
+        "revenue": revenue_metrics(frame.recurring, frame.project, frame.one_time, months),
+        "expenses": expense_metrics(
+            frame.fixed_expenses, frame.variable_expenses, frame.expense_categories
+        ),
+        "cash_flow": cash_flow_metrics(
+            frame.net_income,
+            frame.depreciation_amortization,
+            frame.changes_in_working_capital,
+            frame.total_investing_cf,
+            frame.total_financing_cf,
+            frame.beginning_cash,
+            frame.monthly_burn_rate,
+        ),
+        "ar": ar_metrics(frame.ar_buckets),
+    }
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def synthetic_portfolio(n_clients: int, n_months: int, seed: int = 0) -> PortfolioFrame:
+    """Random but plausible SMB financials — for benchmarks only."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(20_000, 400_000, size=(n_clients, 1))
+    trend = 1 + rng.uniform(-0.2, 0.4, (n_clients, 1)) * np.linspace(0, 1, n_months)[None, :]
+    recurring = (base * trend * rng.uniform(0.95, 1.05, (n_clients, n_months))).astype(np.int64)
+    fixed = rng.integers(50_000, 1_500_000, n_clients)
+    return PortfolioFrame(
+        clients=[f"Client {i}" for i in range(n_clients)],
+        recurring=recurring,
+        project=rng.integers(0, 80_000, (n_clients, n_months)),
+        one_time=rng.integers(0, 20_000, (n_clients, n_months)),
+        fixed_expenses=fixed,
+        variable_expenses=rng.integers(10_000, 800_000, n_clients),
+        expense_categories=rng.integers(1_000, 400_000, (n_clients, 10)),
+        net_income=rng.integers(-100_000, 500_000, n_clients),
+        depreciation_amortization=rng.integers(0, 80_000, n_clients),
+        changes_in_working_capital=rng.integers(-200_000, 50_000, n_clients),
+        total_investing_cf=-rng.integers(0, 150_000, n_clients),
+        total_financing_cf=rng.integers(-150_000, 100_000, n_clients),
+        beginning_cash=rng.integers(10_000, 1_000_000, n_clients),
+        monthly_burn_rate=rng.integers(5_000, 200_000, n_clients),
+        ar_buckets=rng.integers(0, 200_000, (n_clients, len(AR_BUCKETS))),
+    )
+
+
+def _loop_revenue(frame: PortfolioFrame) -> list[dict]:
+    """Reference: the old per-client generator sums over lists of dicts."""
+    out = []
+    for i in range(len(frame.clients)):
+        data = [
+            {"recurring": r, "project": p, "one_time": o}
+            for r, p, o in zip(frame.recurring[i].tolist(), frame.project[i].tolist(), frame.one_time[i].tolist())
+        ]
+        total = sum(m["recurring"] + m["project"] + m["one_time"] for m in data)
+        first = data[0]["recurring"] + data[0]["project"] + data[0]["one_time"]
+        last = data[-1]["recurring"] + data[-1]["project"] + data[-1]["one_time"]
+        out.append({
+            "total_revenue_period": total,
+            "avg_monthly_revenue": round(total / len(data), 0),
+            "latest_month_revenue": last,
+            "revenue_growth_pct": round((last - first) / first * 100, 1),
+            "recurring_pct_of_total": round(sum(m["recurring"] for m in data) / total * 100, 1),
+        })
+    return out
+
+
+def bench(n_clients: int, n_months: int, repeats: int = 5):
+    """Time the vectorized portfolio pass against the per-client Python loop."""
+    frame = synthetic_portfolio(n_clients, n_months)
+    print(f"[bench] {n_clients:,} clients × {n_months} months")
+
+    started = time.perf_counter()
+    loop = _loop_revenue(frame)
+    loop_s = time.perf_counter() - started
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = portfolio_metrics(frame)
+        timings.append(time.perf_counter() - started)
+    vec_s = min(timings)
+
+    started = time.perf_counter()
+    revenue_metrics(frame.recurring, frame.project, frame.one_time)
+    revenue_s = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for i in range(0, n_clients, max(1, n_clients // 500))
+        if any(
+            not math.isclose(client_row(result["revenue"], i)[k], loop[i][k], abs_tol=0.1)
+            for k in loop[i]
+        )
+    )
+
+    print(f"  Python loop (revenue only):       {loop_s * 1000:9.1f} ms")
+    print(f"  Vectorized (revenue only):        {revenue_s * 1000:9.1f} ms  ({loop_s / revenue_s:,.0f}x)")
+    print(f"  Vectorized (full metric set):     {vec_s * 1000:9.1f} ms  (best of {repeats})")
+    print(f"  Sampled rows disagreeing with loop: {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized financial metrics engine.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("bench", help="Benchmark the portfolio pass against the Python loop")
+    b.add_argument("--clients", type=int, default=10_000)
+    b.add_argument("--months", type=int, default=60)
+    b.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.clients, args.months, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -28,7 +28,9 @@ Deploy:
 
 import os
 import asyncio
+import json
 import logging
+import urllib.request
 from datetime import datetime, time as dt_time
 from pathlib import Path
 import pytz
@@ -44,6 +46,7 @@ from telegram.ext import (
 import db
 import brief_agent
 import meeting_prep_agent
+from tool_stats import summarize as summarize_tool_stats
 
 load_dotenv()
 
@@ -63,6 +66,11 @@ OBSIDIAN_VAULT_PATH = Path(
     os.getenv("OBSIDIAN_VAULT_PATH", "/home/bellissimo/obsidian-vault")
 )
 
+# Agent server (agent_server.py) -- /status pulls per-tool latency stats from it.
+# Unset = /status skips the tool section.
+AGENT_SERVER_URL = os.getenv("AGENT_SERVER_URL", "").rstrip("/")
+SERVER_API_KEY = os.getenv("SERVER_API_KEY")
+
 # ---------------------------------------------------------------------------
 # MENTAL MODELS — 4-STEP REASONING CHAIN
 #
@@ -245,16 +253,37 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"Loop proven. Start command from user_id={update.effective_user.id}")
 
 
+def fetch_tool_stats() -> str:
+    """
+    Per-tool latency summary from the agent server's GET /tools/stats.
+    Blocking -- call via asyncio.to_thread. Never raises: /status must still answer.
+    """
+    if not AGENT_SERVER_URL:
+        return "Agent server not configured (AGENT_SERVER_URL)"
+    request = urllib.request.Request(
+        f"{AGENT_SERVER_URL}/tools/stats",
+        headers={"X-API-Key": SERVER_API_KEY or ""},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return summarize_tool_stats(json.load(response))
+    except Exception as e:
+        logger.warning(f"Tool stats unavailable: {e}")
+        return f"Unavailable ({e})"
+
+
 async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     /status -- system health check.
     Phase 0: confirms orchestrator is running.
     Phase 1+: will show Supabase connection, cron schedule, agent queue.
+    Tools: slowest agent tools by p95 latency, from the agent server.
     """
     if not await is_authorized(update):
         return
 
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    tool_summary = await asyncio.to_thread(fetch_tool_stats)
     await update.message.reply_text(
         "Orchestrator Status\n"
         "-------------------\n"
@@ -263,7 +292,9 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"Time:      {now}\n"
         f"Supabase:  Connected\n"
         f"Cron:      Not scheduled (Phase 2)\n"
-        f"Agents:    None spawned yet"
+        f"Agents:    None spawned yet\n\n"
+        "Tools (slowest p95 first)\n"
+        f"{tool_summary}"
     )
 
 
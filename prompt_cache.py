@@ -0,0 +1,102 @@
+"""
+prompt_cache.py — Shared prompt-building layer with cache breakpoints
+=====================================================================
+
+WHAT THIS FILE DOES:
+    Every LLM call site resends a large, unchanging prefix:
+    - agent.py:              system prompt + all of TOOL_DEFINITIONS, every iteration
+    - brief_agent.py:        STRATEGIC_NORTH_STAR.md + PROJECT_THREADS.md, every brief
+    - meeting_prep_agent.py: business context + north star, every prep
+    This module marks that prefix with cache_control breakpoints so the API
+    serves it from the prompt cache on repeat calls.
+
+WHY PROMPT CACHING:
+    The API caches everything up to a breakpoint (order: tools → system → messages).
+    Cache reads cost ~10% of normal input tokens and skip re-processing,
+    which lowers time-to-first-token. Cache writes cost ~125% once.
+    The cache lives ~5 minutes and refreshes on every hit — an agent loop
+    that calls the API 3–6 times in a minute hits it on every call after the first.
+
+THE RULE:
+    Stable content goes first, dynamic content goes last.
+    Anything that changes per call (today's date, a person's name, the task list)
+    must sit AFTER the breakpoint, or it invalidates the cache every time.
+
+NOTE:
+    Prefixes under the model minimum (~1024 tokens for Sonnet) are not cached.
+    The call still works — usage just reports zero cache reads/writes.
+"""
+
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Marks "cache everything up to and including this block"
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def build_system(stable: str | list[str], dynamic: str = "") -> list[dict]:
+    """
+    Build a system prompt as content blocks with one breakpoint after the stable part.
+
+    Args:
+        stable:  Text (or list of texts) that is identical across calls —
+                 instructions, loaded context files. Cached.
+        dynamic: Text that changes per call (dates, names). Sent after the
+                 breakpoint, so it never invalidates the cached prefix.
+
+    Returns:
+        A list of text blocks for the `system=` parameter.
+    """
+    parts = [stable] if isinstance(stable, str) else list(stable)
+    blocks = [{"type": "text", "text": text} for text in parts if text]
+    if blocks:
+        blocks[-1]["cache_control"] = CACHE_CONTROL
+    if dynamic:
+        blocks.append({"type": "text", "text": dynamic})
+    return blocks
+
+
+def cached_tools(tools: list[dict]) -> list[dict]:
+    """
+    Return a copy of the tool schemas with a breakpoint on the last tool.
+
+    WHY copy: TOOL_DEFINITIONS is shared module state — callers elsewhere
+    should keep seeing the plain schemas.
+    """
+    tools = copy.deepcopy(tools)
+    if tools:
+        tools[-1]["cache_control"] = CACHE_CONTROL
+    return tools
+
+
+def usage_stats(usage) -> dict:
+    """
+    Flatten a response.usage object into plain token counts.
+
+    input_tokens counts only the uncached part of the prompt, so the
+    full prompt size is input + cache_read + cache_write.
+    """
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+
+
+def format_usage(label: str, usage) -> str:
+    """One-line cache report, e.g. for print() in the agent loop."""
+    stats = usage_stats(usage)
+    return (
+        f"[cache] {label}: read={stats['cache_read_input_tokens']} "
+        f"write={stats['cache_creation_input_tokens']} "
+        f"uncached_in={stats['input_tokens']} out={stats['output_tokens']}"
+    )
+
+
+def log_usage(label: str, usage) -> dict:
+    """Log the cache report for one call and return the token counts."""
+    logger.info(format_usage(label, usage))
+    return usage_stats(usage)
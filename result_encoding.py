@@ -0,0 +1,276 @@
+"""
+result_encoding.py — Compact table-style encoding for tool results
+===================================================================
+
+WHAT THIS FILE DOES:
+    Turns a tool result into the text the model reads. Two formats:
+
+    json     json.dumps(result) — the default, unchanged behaviour
+    compact  YAML-ish text where lists of records become tables:
+
+        client: Acme Manufacturing Co.
+        months_returned: 12
+        monthly_detail[12]{month,recurring,project,one_time}:
+          Mar 2024,180000,45000,12000
+          Apr 2024,182000,38000,5000
+          ...
+        summary:
+          total_revenue_period: 2950000
+          revenue_growth_pct: 11.9
+        flags[2]:
+          - Emergency equipment repair ($14K) in last quarter — investigate root cause
+          - Software subscriptions ($8.5K/mo) may warrant audit for unused licenses
+
+WHY:
+    The API resends every tool result on every later iteration. In JSON,
+    "recurring", "project" and "one_time" are repeated for every month, with
+    quotes, braces and ", " around each one. The table form writes each key
+    once. Run `python result_encoding.py` for the per-tool comparison.
+
+ROUND TRIP:
+    decode_result() parses either format back to the original dict, so
+    history.py can still shrink old results whichever format they were sent in.
+    Strings that would read back as something else (numbers, true/null, text
+    with commas or quotes) are written JSON-quoted; anything the table syntax
+    can't express (odd keys, nested lists) falls back to inline JSON.
+
+Enable with AGENT_RESULT_FORMAT=compact (agent.py).
+"""
+
+import argparse
+import json
+import re
+from typing import Any
+
+FORMATS = ("json", "compact")
+
+_INDENT = "  "
+_SAFE_KEY = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_HEADER = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)(?:\[(\d+)\](?:\{([^}]*)\})?)?:(?: (.*))?$")
+
+
+# =============================================================================
+# ENCODE
+# =============================================================================
+
+def _scalar(value: Any) -> str:
+    """Bare text when it reads back unchanged, JSON otherwise."""
+    if isinstance(value, str):
+        if (
+            value
+            and value == value.strip()
+            and not any(c in value for c in ',"\n')
+            and not value.startswith(("[", "{", "- "))
+        ):
+            try:
+                json.loads(value)
+            except ValueError:
+                return value  # Wouldn't parse as a number/bool/null — safe bare
+        return json.dumps(value, ensure_ascii=False)
+    return json.dumps(value)
+
+
+def _is_table(value: Any) -> bool:
+    """A non-empty list of flat dicts that all share the same keys."""
+    if not (isinstance(value, list) and value and all(isinstance(v, dict) for v in value)):
+        return False
+    keys = list(value[0])
+    return all(
+        list(row) == keys
+        and all(_SAFE_KEY.match(k) for k in keys)
+        and not any(isinstance(v, (dict, list)) for v in row.values())
+        for row in value
+    )
+
+
+def _is_scalar_list(value: Any) -> bool:
+    return isinstance(value, list) and not any(isinstance(v, (dict, list)) for v in value)
+
+
+def _encode_dict(obj: dict, depth: int, lines: list[str]):
+    pad = _INDENT * depth
+    for key, value in obj.items():
+        if not _SAFE_KEY.match(str(key)):
+            raise ValueError(f"key not encodable: {key!r}")
+        if isinstance(value, dict) and value:
+            lines.append(f"{pad}{key}:")
+            _encode_dict(value, depth + 1, lines)
+        elif _is_table(value):
+            fields = list(value[0])
+            lines.append(f"{pad}{key}[{len(value)}]{{{','.join(fields)}}}:")
+            for row in value:
+                lines.append(pad + _INDENT + ",".join(_scalar(row[f]) for f in fields))
+        elif _is_scalar_list(value) and value:
+            lines.append(f"{pad}{key}[{len(value)}]:")
+            for item in value:
+                lines.append(f"{pad}{_INDENT}- {_scalar(item)}")
+        elif isinstance(value, (dict, list)):
+            # Empty containers and nested lists — inline JSON keeps them exact
+            lines.append(f"{pad}{key}: {json.dumps(value, ensure_ascii=False)}")
+        else:
+            lines.append(f"{pad}{key}: {_scalar(value)}")
+
+
+def encode_result(result: Any, fmt: str = "json") -> str:
+    """Tool result → the text placed in the tool_result block."""
+    if fmt == "compact" and isinstance(result, dict) and result:
+        lines: list[str] = []
+        try:
+            _encode_dict(result, 0, lines)
+            return "\n".join(lines)
+        except ValueError:
+            pass  # Something the table syntax can't express — send JSON
+    return json.dumps(result)
+
+
+# =============================================================================
+# DECODE
+# =============================================================================
+
+def _parse_scalar(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _split_row(row: str) -> list[str]:
+    """Split a table row on commas outside JSON-quoted strings."""
+    cells, start, in_string, escaped = [], 0, False, False
+    for i, c in enumerate(row):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == ",":
+            cells.append(row[start:i])
+            start = i + 1
+    cells.append(row[start:])
+    return cells
+
+
+def _decode_block(lines: list[str], pos: int, depth: int) -> tuple[dict, int]:
+    pad = _INDENT * depth
+    obj: dict = {}
+    while pos < len(lines):
+        line = lines[pos]
+        if not line.startswith(pad) or line[len(pad):].startswith(" "):
+            break  # Dedent — this block is finished
+        match = _HEADER.match(line[len(pad):])
+        if not match:
+            raise ValueError(f"unparseable line: {line!r}")
+        key, count, fields, inline = match.groups()
+        pos += 1
+        child_pad = pad + _INDENT
+
+        if fields is not None:
+            names = fields.split(",")
+            rows = lines[pos:pos + int(count)]
+            obj[key] = [
+                dict(zip(names, (_parse_scalar(c) for c in _split_row(r[len(child_pad):]))))
+                for r in rows
+            ]
+            pos += int(count)
+        elif count is not None:
+            items = lines[pos:pos + int(count)]
+            obj[key] = [_parse_scalar(item[len(child_pad) + 2:]) for item in items]
+            pos += int(count)
+        elif inline is not None:
+            obj[key] = _parse_scalar(inline)
+        else:
+            obj[key], pos = _decode_block(lines, pos, depth + 1)
+    return obj, pos
+
+
+def decode_result(text: str) -> Any:
+    """Either format → the original result. Raises ValueError if it is neither."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass  # Not JSON — try the compact form
+    lines = text.split("\n")
+    obj, pos = _decode_block(lines, 0, 0)
+    if pos != len(lines):
+        raise ValueError("trailing content after compact result")
+    return obj
+
+
+def detect_format(text: str) -> str:
+    """Which format a tool_result's content was encoded in."""
+    try:
+        json.loads(text)
+        return "json"
+    except ValueError:
+        return "compact"
+
+
+# =============================================================================
+# TOKEN COMPARISON HARNESS
+# =============================================================================
+
+def compare(exact: bool = False) -> list[dict]:
+    """
+    Tokens per tool result in each format.
+
+    exact=False estimates at ~4 chars/token (history.CHARS_PER_TOKEN).
+    exact=True asks the API (messages.count_tokens — needs ANTHROPIC_API_KEY),
+    measured as the difference from an empty message so only the result counts.
+    """
+    from history import CHARS_PER_TOKEN
+    from tools import TOOL_DISPATCH, prefetch_tool_calls
+
+    if exact:
+        from anthropic import Anthropic
+        client = Anthropic()
+
+        def count(text: str) -> int:
+            def call(content: str) -> int:
+                return client.messages.count_tokens(
+                    model="claude-sonnet-4-6",
+                    messages=[{"role": "user", "content": content}],
+                ).input_tokens
+            return call(text or " ") - call(" ")
+    else:
+        def count(text: str) -> int:
+            return len(text) // CHARS_PER_TOKEN
+
+    rows = []
+    for call in prefetch_tool_calls("Acme Manufacturing Co."):
+        name = call["name"]
+        result = TOOL_DISPATCH[name](**call["input"])
+        encoded = {fmt: encode_result(result, fmt) for fmt in FORMATS}
+        assert decode_result(encoded["compact"]) == result, f"{name}: compact round trip changed the result"
+        json_tokens, compact_tokens = count(encoded["json"]), count(encoded["compact"])
+        rows.append({
+            "tool": name,
+            "json_tokens": json_tokens,
+            "compact_tokens": compact_tokens,
+            "saved_pct": round((1 - compact_tokens / json_tokens) * 100, 1) if json_tokens else 0.0,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tool-result encodings by token count.")
+    parser.add_argument("--exact", action="store_true",
+                        help="Count with the API's token counter instead of a chars/4 estimate")
+    args = parser.parse_args()
+
+    rows = compare(exact=args.exact)
+    print(f"{'tool':<26}{'json':>8}{'compact':>10}{'saved':>9}")
+    for r in rows:
+        print(f"{r['tool']:<26}{r['json_tokens']:>8}{r['compact_tokens']:>10}{r['saved_pct']:>8.1f}%")
+    total_json = sum(r["json_tokens"] for r in rows)
+    total_compact = sum(r["compact_tokens"] for r in rows)
+    print(f"{'total':<26}{total_json:>8}{total_compact:>10}"
+          f"{(1 - total_compact / total_json) * 100 if total_json else 0:>8.1f}%")
+    print("(tokens per resend — every later iteration pays them again)")
+
+
+if __name__ == "__main__":
+    main()
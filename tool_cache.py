@@ -0,0 +1,151 @@
+"""
+tool_cache.py — Memoizing cache for tool results (TTL + LRU)
+=============================================================
+
+WHAT THIS FILE DOES:
+    Remembers tool results so the same call is not recomputed:
+    - within one run (the model asks for get_revenue_data twice)
+    - across runs (Reveal then X-Ray for the same client, minutes apart)
+
+    Keyed by tool name + canonicalized input. Each tool has its own TTL,
+    total size is capped, and the least-recently-used entries are evicted first.
+
+WHY IT MATTERS:
+    Today the tools return simulated data in microseconds. Once they call
+    QuickBooks/Xero, each call costs hundreds of milliseconds plus API quota.
+    A cache hit costs a dict lookup.
+
+HOW ENTRIES ARE STORED:
+    As JSON strings. That gives us the size for the memory cap for free,
+    and every hit returns a fresh copy — a caller that mutates a result
+    can never corrupt the cached one.
+
+THREAD SAFETY:
+    run_agent() executes tools on a thread pool, so every operation
+    takes a lock. The critical sections are tiny (dict ops only).
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class ToolResultCache:
+    """
+    In-memory TTL + LRU cache for tool results.
+
+    Args:
+        max_bytes:   Cap on the total size of cached JSON. Oldest-used entries
+                     are evicted until a new entry fits.
+        default_ttl: Seconds an entry stays fresh when the tool has no TTL of its own.
+        ttls:        Per-tool TTLs in seconds, e.g. {"get_key_metrics": 900}.
+                     A TTL of 0 disables caching for that tool.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 8 * 1024 * 1024,
+        default_ttl: float = 600,
+        ttls: Optional[dict[str, float]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+
+        # key -> (expires_at, json_text). OrderedDict order = recency (last = newest)
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(tool_name: str, tool_input: dict) -> str:
+        """
+        Canonical cache key: same tool + same arguments → same key,
+        regardless of the order the model wrote the keys in.
+        """
+        canonical = json.dumps(tool_input, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{tool_name}:{canonical}"
+
+    def ttl_for(self, tool_name: str) -> float:
+        return self.ttls.get(tool_name, self.default_ttl)
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Return (hit, result). Expired entries count as misses and are dropped."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            expires_at, text = entry
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)  # mark most recently used
+            self.hits += 1
+        return True, json.loads(text)
+
+    def put(self, key: str, tool_name: str, result: Any):
+        """Store a result. Skipped if the tool's TTL is 0 or the result alone exceeds max_bytes."""
+        ttl = self.ttl_for(tool_name)
+        if ttl <= 0:
+            return
+        text = json.dumps(result, default=str)  # A date or Decimal in a result mustn't fail a call that succeeded
+        size = len(text)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            # LRU eviction: the first item in the OrderedDict is the least recently used
+            while self._entries and self._bytes + size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+            self._entries[key] = (time.monotonic() + ttl, text)
+            self._bytes += size
+
+    def invalidate(self, *tool_names: str) -> int:
+        """Drop every entry for these tools (their data changed). Returns entries dropped."""
+        prefixes = tuple(f"{name}:" for name in tool_names)
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith(prefixes)]
+            for key in stale:
+                self._drop(key)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Counters for dashboards and /status — hit rate, size, evictions."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _drop(self, key: str):
+        """Remove an entry and release its bytes. Caller holds the lock."""
+        _, text = self._entries.pop(key)
+        self._bytes -= len(text)
@@ -0,0 +1,183 @@
+"""
+tool_stats.py — Per-tool latency, payload and error profiling
+==============================================================
+
+WHAT THIS FILE DOES:
+    Records every execute_tool() call and keeps, per tool name:
+    - call count, cache hits, error count / error rate
+    - latency p50 / p95 / p99 / max over the most recent calls
+    - a cumulative latency histogram (fixed millisecond buckets)
+    - result payload size (average and max bytes of JSON)
+
+    snapshot() exports all of it as a plain dict — agent_server.py serves it
+    at GET /tools/stats and the orchestrator's /status command summarizes it.
+
+WHY:
+    A diagnostic is only as fast as its slowest tool. With simulated data
+    every tool returns in microseconds; once they call QuickBooks/Xero, one
+    slow integration dominates the run — and this shows which one.
+
+WHY RECENT SAMPLES FOR PERCENTILES:
+    Exact percentiles need the raw samples. Keeping the last `window` calls
+    per tool bounds memory and makes p95 reflect how the tool behaves now,
+    not an hour ago. The histogram keeps the all-time shape alongside it.
+
+HOOKS:
+    execute_tool() calls every function in tools.TOOL_HOOKS with one event
+    dict per call — ToolStats.record is the default hook. Append your own
+    (a logger, a metrics exporter) to observe the same stream:
+
+        {"tool": "get_revenue_data", "seconds": 0.42, "bytes": 1830,
+         "error": False, "cached": False}
+
+THREAD SAFETY:
+    run_agent() executes tools on a thread pool, so record() and snapshot()
+    take a lock. Percentiles are computed at snapshot time, not per call.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is "+Inf")
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 for an empty one)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class _ToolSeries:
+    """Counters and samples for one tool. Caller holds ToolStats' lock."""
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.total_bytes = 0
+        self.max_bytes = 0
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, seconds: float, size: int, error: bool, cached: bool):
+        self.calls += 1
+        self.total_bytes += size
+        self.max_bytes = max(self.max_bytes, size)
+        if error:
+            self.errors += 1
+        if cached:
+            # A cache hit says nothing about the integration's speed — count it only
+            self.cache_hits += 1
+            return
+        self.total_seconds += seconds
+        self.latencies.append(seconds)
+        ms = seconds * 1000
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def summary(self) -> dict:
+        samples = sorted(self.latencies)
+        executed = self.calls - self.cache_hits
+
+        def ms(seconds: float) -> float:
+            return round(seconds * 1000, 2)
+
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 3) if self.calls else 0.0,
+            "latency_ms": {
+                "p50": ms(percentile(samples, 50)),
+                "p95": ms(percentile(samples, 95)),
+                "p99": ms(percentile(samples, 99)),
+                "max": ms(samples[-1]) if samples else 0.0,
+                "mean": ms(self.total_seconds / executed) if executed else 0.0,
+                "total": ms(self.total_seconds),
+                "samples": len(samples),
+            },
+            "histogram_ms": {
+                **{f"le_{bound}": n for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                "le_inf": self.buckets[-1],
+            },
+            "payload_bytes": {
+                "avg": round(self.total_bytes / self.calls) if self.calls else 0,
+                "max": self.max_bytes,
+            },
+        }
+
+
+class ToolStats:
+    """
+    Thread-safe per-tool profiler.
+
+    Args:
+        window: Latency samples kept per tool for the percentiles.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._series: dict[str, _ToolSeries] = {}
+        self._lock = threading.Lock()
+        self._since = time.time()
+
+    def record(self, event: dict):
+        """Hook for execute_tool(): one event per call (see HOOKS above)."""
+        with self._lock:
+            series = self._series.get(event["tool"])
+            if series is None:
+                series = self._series[event["tool"]] = _ToolSeries(self.window)
+            series.add(event["seconds"], event["bytes"], event["error"], event["cached"])
+
+    def snapshot(self) -> dict:
+        """
+        Every tool's summary, slowest (by p95) first.
+
+        {"since": "...", "calls": 42, "tools": {"get_accounts_receivable": {...}, ...}}
+        """
+        with self._lock:
+            tools = {name: series.summary() for name, series in self._series.items()}
+            since = self._since
+        ordered = dict(sorted(tools.items(), key=lambda kv: kv[1]["latency_ms"]["p95"], reverse=True))
+        return {
+            "since": datetime.fromtimestamp(since, timezone.utc).isoformat(),
+            "calls": sum(t["calls"] for t in tools.values()),
+            "tools": ordered,
+        }
+
+    def reset(self):
+        """Start a fresh measurement window (e.g. after swapping in a real integration)."""
+        with self._lock:
+            self._series.clear()
+            self._since = time.time()
+
+
+def summarize(snapshot: dict, limit: int = 5) -> str:
+    """
+    A few plain-text lines for chat (the orchestrator's /status):
+
+        get_accounts_receivable  12 calls  p50 410ms  p95 1900ms  err 8%  avg 2.1KB
+    """
+    tools = snapshot.get("tools") or {}
+    if not tools:
+        return "No tool calls recorded yet"
+    lines = []
+    for name, t in list(tools.items())[:limit]:
+        lat = t["latency_ms"]
+        lines.append(
+            f"{name}  {t['calls']} calls  p50 {lat['p50']:.0f}ms  p95 {lat['p95']:.0f}ms  "
+            f"err {t['error_rate'] * 100:.0f}%  avg {t['payload_bytes']['avg'] / 1024:.1f}KB"
+        )
+    if len(tools) > limit:
+        lines.append(f"(+{len(tools) - limit} more)")
+    return "\n".join(lines)
@@ -23,13 +23,73 @@ HOW TOOL DEFINITIONS WORK:
 
 TO ADD A REAL API:
     1. Add the tool definition to TOOL_DEFINITIONS
-    2. Add a case in execute_tool()
-    3. Write the actual function (replace the simulated return)
+    2. Add an entry to TOOL_DISPATCH (bottom of this file)
+    3. Write the actual function (replace the simulated return) — plain `def`
+       or `async def`; both execute_tool() and execute_tool_async() handle either
+    4. Optionally give it a timeout (TOOL_TIMEOUTS) and a concurrency cap (TOOL_CONCURRENCY)
     agent.py never changes.
+
+TIMEOUTS, LIMITS AND CANCELLATION:
+    Every call runs under its tool's timeout (queueing for a slot included) and
+    its concurrency cap, so one hung accounting API costs one tool's timeout —
+    not the whole diagnostic — and can't pile up unbounded outbound calls.
+    A timeout raises ToolTimeoutError. `async def` tools are truly cancelled
+    (on timeout, or when the run's task is cancelled); a plain `def` can't be
+    interrupted, so it keeps its slot until it actually returns.
+    The cap is counted separately for sync callers (execute_tool, one set of
+    slots per process) and async ones (execute_tool_async, one set per event
+    loop) — a process mixing both can run up to twice a tool's cap.
+
+RESULT CACHE:
+    execute_tool() memoizes results in TOOL_CACHE (tool_cache.py), keyed by
+    tool name + canonicalized input, with per-tool TTLs in TOOL_CACHE_TTLS.
+    Set TOOL_CACHE_ENABLED=false to turn it off, or pass use_cache=False per call.
+    A data_store import drops the cached results of the tool that reads that
+    dataset (DATASET_TOOLS) — at once in this process, within
+    DATA_VERSION_POLL_SECONDS when the import ran elsewhere (the CLI).
+
+PROFILING:
+    Every call is reported to the functions in TOOL_HOOKS — by default
+    TOOL_STATS (tool_stats.py), which keeps per-tool call counts, p50/p95/p99
+    latency, payload size and error rate. GET /tools/stats on agent_server.py
+    serves the snapshot.
+
+DERIVED METRICS:
+    Totals, growth, mix and aging shares are computed by metrics_engine.py —
+    the same vectorized functions that run over a whole portfolio at once.
 """
 
+import asyncio
+import functools
+import inspect
 import json
-from typing import Any
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ar_engine import cached_ar_aging, ledger_path
+from data_store import IMPORT_HOOKS, open_data_store
+from metrics_engine import (
+    AR_BUCKETS,
+    ar_metrics,
+    cash_flow_metrics,
+    client_row,
+    columns,
+    revenue_metrics,
+)
+from tool_cache import ToolResultCache
+from tool_stats import ToolStats
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
 
 
 # =============================================================================
@@ -141,42 +201,369 @@ TOOL_DEFINITIONS = [
 ]
 
 
+# =============================================================================
+# PREFETCH — the full data pull for one client, without asking the model
+# =============================================================================
+
+# Arguments for each tool in prefetch mode (client_name is added per call).
+# WHY all five: both the Reveal and X-Ray prompts tell the model to call ALL
+# relevant tools, and in practice it does — so fetch them before the first call.
+PREFETCH_TOOL_INPUTS = {
+    "get_revenue_data": {"months": 12},
+    "get_expense_breakdown": {"period": "last_quarter"},
+    "get_cash_flow_statement": {},
+    "get_key_metrics": {},
+    "get_accounts_receivable": {},
+}
+
+
+def prefetch_tool_calls(client_name: str) -> list[dict]:
+    """Tool calls ({"name", "input"}) that cover a full diagnostic for one client."""
+    return [
+        {"name": name, "input": {"client_name": client_name, **extra}}
+        for name, extra in PREFETCH_TOOL_INPUTS.items()
+    ]
+
+
+# =============================================================================
+# RESULT CACHE — skip recomputing identical tool calls
+# =============================================================================
+
+# How long each tool's result stays fresh (seconds). 0 = never cache.
+# WHY per-tool: monthly revenue barely moves within an hour; AR changes
+# every time a payment lands, so it gets the shortest window.
+TOOL_CACHE_TTLS = {
+    "get_revenue_data": 3600,
+    "get_expense_breakdown": 3600,
+    "get_cash_flow_statement": 900,
+    "get_key_metrics": 900,
+    "get_accounts_receivable": 300,
+}
+
+TOOL_CACHE: Optional[ToolResultCache] = None
+if os.getenv("TOOL_CACHE_ENABLED", "true").lower() not in ("0", "false", "no"):
+    TOOL_CACHE = ToolResultCache(
+        max_bytes=int(os.getenv("TOOL_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+        ttls=TOOL_CACHE_TTLS,
+    )
+
+
+def _cache_key(tool_name: str, func, tool_input: dict) -> str:
+    """
+    Canonicalize the input before keying — defaults filled in — so
+    {"client_name": "Acme"} and {"client_name": "Acme", "months": 12} share a key.
+    """
+    try:
+        bound = inspect.signature(func).bind(**tool_input)
+        bound.apply_defaults()
+        tool_input = dict(bound.arguments)
+    except TypeError:
+        pass  # Bad arguments — the call itself will raise; key on the raw input
+    return ToolResultCache.make_key(tool_name, tool_input)
+
+
+def _is_cacheable(result: Any) -> bool:
+    """Never cache error payloads — the next call should retry for real."""
+    return not (isinstance(result, dict) and "error" in result)
+
+
+# data_store dataset → the tool that reads it; importing the dataset drops that tool's cached results
+DATASET_TOOLS = {
+    "revenue": "get_revenue_data",
+    "expenses": "get_expense_breakdown",
+    "cash_flow": "get_cash_flow_statement",
+    "key_metrics": "get_key_metrics",
+    "ar_aging": "get_accounts_receivable",
+    "ar_overdue": "get_accounts_receivable",
+}
+
+# How often the store's import versions are checked for imports run by another process
+DATA_VERSION_POLL_SECONDS = 2.0
+
+_data_versions: Optional[dict[str, int]] = None
+_next_version_check = 0.0
+_data_versions_lock = threading.Lock()
+
+
+def _drop_imported(dataset: str):
+    """An import replaced this dataset's rows — cached results built from the old ones are stale."""
+    if TOOL_CACHE and dataset in DATASET_TOOLS:
+        TOOL_CACHE.invalidate(DATASET_TOOLS[dataset])
+
+
+IMPORT_HOOKS.append(_drop_imported)  # Imports in this process
+
+
+def _check_data_versions():
+    """Imports in other processes: compare the store's import versions, at most every DATA_VERSION_POLL_SECONDS."""
+    global _data_versions, _next_version_check
+    import_versions = getattr(DATA_STORE, "import_versions", None)
+    if TOOL_CACHE is None or import_versions is None or time.monotonic() < _next_version_check:
+        return
+    with _data_versions_lock:
+        if time.monotonic() < _next_version_check:
+            return  # Another thread just checked
+        _next_version_check = time.monotonic() + DATA_VERSION_POLL_SECONDS
+        versions = import_versions()
+        if _data_versions is not None:
+            for dataset, version in versions.items():
+                if _data_versions.get(dataset) != version:
+                    _drop_imported(dataset)
+        _data_versions = versions
+
+
+# =============================================================================
+# TIMEOUTS + CONCURRENCY LIMITS — per tool
+# =============================================================================
+
+# Longest a caller waits for one call (seconds), waiting for a free slot included
+DEFAULT_TOOL_TIMEOUT = 30
+TOOL_TIMEOUTS = {
+    "get_revenue_data": 20,
+    "get_expense_breakdown": 20,
+    "get_cash_flow_statement": 20,
+    "get_key_metrics": 20,
+    "get_accounts_receivable": 60,   # Folding a large invoice ledger takes seconds
+}
+
+# Max calls of each tool in flight at once — protects the accounting APIs' rate limits
+DEFAULT_TOOL_CONCURRENCY = 8
+TOOL_CONCURRENCY = {
+    "get_accounts_receivable": 2,    # Ledger folds are CPU + disk heavy
+}
+
+
+class ToolTimeoutError(TimeoutError):
+    """A tool call exceeded its TOOL_TIMEOUTS entry."""
+
+    def __init__(self, tool_name: str, timeout: float, waiting: bool = False):
+        where = "waiting for a free slot" if waiting else "running"
+        super().__init__(f"{tool_name} timed out after {timeout}s ({where})")
+        self.tool_name = tool_name
+        self.timeout = timeout
+
+
+def tool_timeout(tool_name: str) -> float:
+    return TOOL_TIMEOUTS.get(tool_name, DEFAULT_TOOL_TIMEOUT)
+
+
+def tool_concurrency(tool_name: str) -> int:
+    return TOOL_CONCURRENCY.get(tool_name, DEFAULT_TOOL_CONCURRENCY)
+
+
+# Sync callers share one semaphore per tool across threads. The slot is released
+# when the call really returns — an abandoned (timed-out) call still counts.
+_thread_limits: dict[str, threading.BoundedSemaphore] = {}
+_thread_limits_lock = threading.Lock()
+
+# Sync tools run here so execute_tool() can stop waiting on a hung one
+_sync_tool_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="tool")
+
+# Async callers: asyncio.Semaphore is bound to one event loop, so one set per loop.
+# Not shared with _thread_limits — a blocking acquire would stall the loop
+_loop_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def _thread_limit(tool_name: str) -> threading.BoundedSemaphore:
+    with _thread_limits_lock:
+        if tool_name not in _thread_limits:
+            _thread_limits[tool_name] = threading.BoundedSemaphore(tool_concurrency(tool_name))
+        return _thread_limits[tool_name]
+
+
+def _loop_limit(tool_name: str) -> asyncio.Semaphore:
+    limits = _loop_limits.setdefault(asyncio.get_running_loop(), {})
+    if tool_name not in limits:
+        limits[tool_name] = asyncio.Semaphore(tool_concurrency(tool_name))
+    return limits[tool_name]
+
+
+def _call_with_limits(tool_name: str, func, tool_input: dict) -> Any:
+    """Sync path: take a slot, run the tool in the tool pool, give up at the deadline."""
+    timeout = tool_timeout(tool_name)
+    deadline = time.monotonic() + timeout
+    limit = _thread_limit(tool_name)
+    if not limit.acquire(timeout=timeout):
+        raise ToolTimeoutError(tool_name, timeout, waiting=True)
+
+    if inspect.iscoroutinefunction(func):
+        # Async implementation called from sync code — wait_for really cancels it
+        def call():
+            remaining = max(deadline - time.monotonic(), 0)
+            return asyncio.run(asyncio.wait_for(func(**tool_input), remaining))
+    else:
+        def call():
+            return func(**tool_input)
+
+    future = _sync_tool_pool.submit(call)
+    future.add_done_callback(lambda _: limit.release())
+    try:
+        return future.result(timeout=max(deadline - time.monotonic(), 0))
+    except (FutureTimeoutError, asyncio.TimeoutError):
+        raise ToolTimeoutError(tool_name, timeout) from None
+
+
+async def _call_with_limits_async(tool_name: str, func, tool_input: dict) -> Any:
+    """
+    Async path: same contract. Cancelling the caller cancels an `async def`
+    tool; a plain `def` keeps running in the tool pool and keeps its slot
+    until it returns, exactly as on the sync path.
+    """
+    timeout = tool_timeout(tool_name)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    limit = _loop_limit(tool_name)
+    try:
+        await asyncio.wait_for(limit.acquire(), timeout)
+    except asyncio.TimeoutError:
+        raise ToolTimeoutError(tool_name, timeout, waiting=True) from None
+
+    remaining = max(deadline - loop.time(), 0)
+    if inspect.iscoroutinefunction(func):
+        try:
+            return await asyncio.wait_for(func(**tool_input), remaining)
+        except asyncio.TimeoutError:
+            raise ToolTimeoutError(tool_name, timeout) from None
+        finally:
+            limit.release()
+
+    future = loop.run_in_executor(_sync_tool_pool, functools.partial(func, **tool_input))
+    future.add_done_callback(lambda _: limit.release())
+    try:
+        # shield: a timeout or cancelled run stops the wait, not the thread (or its slot)
+        return await asyncio.wait_for(asyncio.shield(future), remaining)
+    except asyncio.TimeoutError:
+        raise ToolTimeoutError(tool_name, timeout) from None
+
+
+# =============================================================================
+# PROFILING HOOKS — observe every call
+# =============================================================================
+
+# Per-tool latency / payload / error profile (tool_stats.py)
+TOOL_STATS = ToolStats(window=int(os.getenv("TOOL_STATS_WINDOW", "1000")))
+
+# Called once per execute_tool() call with {"tool", "seconds", "bytes", "error", "cached"}.
+# Append your own callable to observe the same stream.
+TOOL_HOOKS = [TOOL_STATS.record]
+
+_UNFINISHED = object()  # Outcome of a call that was cancelled — not reported
+
+
+def _report(tool_name: str, started: float, outcome: Any, cached: bool):
+    """Send one call's event to every hook. A broken hook never breaks the tool call."""
+    if outcome is _UNFINISHED:
+        return
+    event = {
+        "tool": tool_name,
+        "seconds": time.perf_counter() - started,
+        "bytes": len(json.dumps(outcome, default=str)),
+        "error": not _is_cacheable(outcome),
+        "cached": cached,
+    }
+    for hook in TOOL_HOOKS:
+        try:
+            hook(event)
+        except Exception:
+            logger.exception("Tool hook %r failed", hook)
+
+
 # =============================================================================
 # TOOL DISPATCHER — Routes tool calls to their implementations
 # =============================================================================
 
-def execute_tool(tool_name: str, tool_input: dict) -> Any:
+def execute_tool(tool_name: str, tool_input: dict, use_cache: bool = True) -> Any:
     """
     Dispatch a tool call to the appropriate function.
 
     WHY THIS PATTERN:
         The agent loop calls this with whatever tool name and inputs the model requested.
         Centralizing dispatch here means agent.py stays clean and generic.
-        New tools = add a case here + a function below. That's it.
+        New tools = add an entry to TOOL_DISPATCH + a function below. That's it.
     """
-    dispatch = {
-        "get_revenue_data": _get_revenue_data,
-        "get_expense_breakdown": _get_expense_breakdown,
-        "get_cash_flow_statement": _get_cash_flow_statement,
-        "get_key_metrics": _get_key_metrics,
-        "get_accounts_receivable": _get_accounts_receivable,
-    }
+    if tool_name not in TOOL_DISPATCH:
+        return {"error": f"Unknown tool: {tool_name}"}
+
+    func = TOOL_DISPATCH[tool_name]
+    started = time.perf_counter()
+    outcome, cached = _UNFINISHED, False
+    try:
+        key = _cache_key(tool_name, func, tool_input) if use_cache and TOOL_CACHE else None
+        if key:
+            _check_data_versions()
+            hit, value = TOOL_CACHE.get(key)
+            if hit:
+                outcome, cached = value, True
+                return value
+
+        # Runs under the tool's timeout and concurrency cap — raises ToolTimeoutError
+        outcome = result = _call_with_limits(tool_name, func, tool_input)
 
-    if tool_name not in dispatch:
+        if key and _is_cacheable(result):
+            TOOL_CACHE.put(key, tool_name, result)
+        return result
+    except Exception as e:
+        outcome = {"error": str(e)}  # For the hooks — the exception still propagates
+        raise
+    finally:
+        _report(tool_name, started, outcome, cached)
+
+
+async def execute_tool_async(tool_name: str, tool_input: dict, use_cache: bool = True) -> Any:
+    """
+    Async twin of execute_tool() for run_agent_async().
+
+    Tool implementations may be plain functions or `async def`:
+        - async def → awaited directly on the event loop (no thread held)
+        - def       → run in the tool thread pool so a blocking HTTP call
+                      never stalls the other agents sharing the loop
+    Swap a simulated tool for an async QuickBooks/Xero client and the
+    async agent loop picks it up with no other changes.
+    """
+    if tool_name not in TOOL_DISPATCH:
         return {"error": f"Unknown tool: {tool_name}"}
 
-    return dispatch[tool_name](**tool_input)
+    func = TOOL_DISPATCH[tool_name]
+    started = time.perf_counter()
+    outcome, cached = _UNFINISHED, False
+    try:
+        key = _cache_key(tool_name, func, tool_input) if use_cache and TOOL_CACHE else None
+        if key:
+            _check_data_versions()
+            hit, value = TOOL_CACHE.get(key)
+            if hit:
+                outcome, cached = value, True
+                return value
+
+        outcome = result = await _call_with_limits_async(tool_name, func, tool_input)
+
+        if key and _is_cacheable(result):
+            TOOL_CACHE.put(key, tool_name, result)
+        return result
+    except Exception as e:
+        outcome = {"error": str(e)}
+        raise
+    finally:
+        _report(tool_name, started, outcome, cached)
 
 
 # =============================================================================
 # TOOL IMPLEMENTATIONS — Simulated data (swap in real APIs here)
 # =============================================================================
 
+# Real per-client data when FINANCIAL_DB is set (data_store.py); None = simulated Acme data.
+# Any object with the FinancialDataSource methods can be assigned here.
+DATA_STORE = open_data_store()
+
+
 def _get_revenue_data(client_name: str, months: int = 12) -> dict:
     """
     Simulates 12 months of revenue data for Acme Manufacturing Co.
     Real version: query QuickBooks/Xero API for P&L by month.
     """
+    if DATA_STORE is not None:
+        return DATA_STORE.revenue_data(client_name, months)
+
     # Simulated realistic data for a $3M/year manufacturing business
     monthly_revenue = [
         {"month": "Mar 2024", "recurring": 180000, "project": 45000, "one_time": 12000},
@@ -196,26 +583,14 @@ def _get_revenue_data(client_name: str, months: int = 12) -> dict:
     # Return only as many months as requested
     data = monthly_revenue[-months:]
 
-    # Calculate summary stats
-    total = sum(m["recurring"] + m["project"] + m["one_time"] for m in data)
-    avg_monthly = total / len(data)
-    first_month = data[0]["recurring"] + data[0]["project"] + data[0]["one_time"]
-    last_month = data[-1]["recurring"] + data[-1]["project"] + data[-1]["one_time"]
-    growth_pct = ((last_month - first_month) / first_month) * 100
+    # Summary stats — same vectorized code path as the portfolio view (metrics_engine.py)
+    summary = client_row(revenue_metrics(**columns(data, ("recurring", "project", "one_time"))))
 
     return {
         "client": client_name,
         "months_returned": len(data),
         "monthly_detail": data,
-        "summary": {
-            "total_revenue_period": total,
-            "avg_monthly_revenue": round(avg_monthly, 0),
-            "latest_month_revenue": last_month,
-            "revenue_growth_pct": round(growth_pct, 1),
-            "recurring_pct_of_total": round(
-                sum(m["recurring"] for m in data) / total * 100, 1
-            ),
-        },
+        "summary": summary,
     }
 
 
@@ -224,6 +599,9 @@ def _get_expense_breakdown(client_name: str, period: str = "last_quarter") -> di
     Simulates expense data for Acme Manufacturing Co.
     Real version: query QuickBooks expense categories via API.
     """
+    if DATA_STORE is not None:
+        return DATA_STORE.expense_breakdown(client_name, period)
+
     expenses = {
         "last_month": {
             "total_expenses": 218000,
@@ -295,34 +673,56 @@ def _get_cash_flow_statement(client_name: str) -> dict:
     Simulates a cash flow statement for Acme Manufacturing Co.
     Real version: pull from accounting software or build from bank feeds.
     """
+    if DATA_STORE is not None:
+        return DATA_STORE.cash_flow_statement(client_name)
+
+    operating = {
+        "net_income": 280000,
+        "depreciation_amortization": 42000,
+        "changes_in_working_capital": -118000,  # Negative = working capital consuming cash
+        "accounts_receivable_change": -95000,    # AR growing (cash tied up)
+        "accounts_payable_change": 22000,
+        "inventory_change": -45000,
+    }
+    beginning_cash = 187000
+    monthly_burn_rate = 54333                    # Based on operating expenses
+    total_investing_cf = -85000
+    total_financing_cf = -108000
+
+    # Roll-ups (operating CF, net change, runway, FCF) via metrics_engine.py
+    m = client_row(cash_flow_metrics(
+        net_income=np.array([operating["net_income"]]),
+        depreciation_amortization=np.array([operating["depreciation_amortization"]]),
+        changes_in_working_capital=np.array([operating["changes_in_working_capital"]]),
+        total_investing_cf=np.array([total_investing_cf]),
+        total_financing_cf=np.array([total_financing_cf]),
+        beginning_cash=np.array([beginning_cash]),
+        monthly_burn_rate=np.array([monthly_burn_rate]),
+    ))
+
     return {
         "client": client_name,
         "period": "Last 12 months",
         "operating_cash_flow": {
-            "net_income": 280000,
-            "depreciation_amortization": 42000,
-            "changes_in_working_capital": -118000,  # Negative = working capital consuming cash
-            "accounts_receivable_change": -95000,    # AR growing (cash tied up)
-            "accounts_payable_change": 22000,
-            "inventory_change": -45000,
-            "total_operating_cf": 204000,
+            **operating,
+            "total_operating_cf": m["total_operating_cf"],
         },
         "investing_cash_flow": {
             "equipment_purchases": -85000,
-            "total_investing_cf": -85000,
+            "total_investing_cf": total_investing_cf,
         },
         "financing_cash_flow": {
             "loan_repayments": -48000,
             "owner_distributions": -60000,
-            "total_financing_cf": -108000,
+            "total_financing_cf": total_financing_cf,
         },
         "summary": {
-            "net_cash_change": 11000,
-            "beginning_cash": 187000,
-            "ending_cash_balance": 198000,
-            "monthly_burn_rate": 54333,        # Based on operating expenses
-            "months_of_runway": 3.6,           # 198K / 54.3K — RED FLAG
-            "free_cash_flow": 119000,          # Operating CF - Capex
+            "net_cash_change": m["net_cash_change"],
+            "beginning_cash": beginning_cash,
+            "ending_cash_balance": m["ending_cash_balance"],
+            "monthly_burn_rate": monthly_burn_rate,
+            "months_of_runway": m["months_of_runway"],      # 198K / 54.3K — RED FLAG
+            "free_cash_flow": m["free_cash_flow"],          # Operating CF - Capex
         },
         "flags": [
             "CRITICAL: Only 3.6 months of runway — immediate attention required",
@@ -337,6 +737,9 @@ def _get_key_metrics(client_name: str) -> dict:
     Simulates pre-calculated KPIs for Acme Manufacturing Co.
     Real version: calculate from P&L + Balance Sheet pulled from accounting API.
     """
+    if DATA_STORE is not None:
+        return DATA_STORE.key_metrics(client_name)
+
     return {
         "client": client_name,
         "as_of": "February 2025",
@@ -375,15 +778,30 @@ def _get_accounts_receivable(client_name: str) -> dict:
     Simulates an AR aging report for Acme Manufacturing Co.
     Real version: pull aging report from QuickBooks via API.
     """
+    # A raw invoice ledger beats pre-bucketed numbers (ar_engine.py, cached on disk)
+    ledger = ledger_path(client_name)
+    if ledger is not None:
+        return cached_ar_aging(ledger, client_name)
+    if DATA_STORE is not None:
+        return DATA_STORE.accounts_receivable(client_name)
+
+    bucket_amounts = {
+        "current_0_30_days": 168000,
+        "late_31_60_days":   89000,
+        "late_61_90_days":   54000,
+        "overdue_90_plus":   31000,
+    }
+
+    # Total and bucket shares via metrics_engine.py
+    m = client_row(ar_metrics(np.array([[bucket_amounts[name] for name in AR_BUCKETS]])))
+
     return {
         "client": client_name,
         "as_of": "February 2025",
-        "total_ar": 342000,
+        "total_ar": m["total_ar"],
         "aging_buckets": {
-            "current_0_30_days": {"amount": 168000, "pct": 49.1},
-            "late_31_60_days":   {"amount": 89000,  "pct": 26.0},
-            "late_61_90_days":   {"amount": 54000,  "pct": 15.8},
-            "overdue_90_plus":   {"amount": 31000,  "pct": 9.1},
+            name: {"amount": bucket_amounts[name], "pct": pct}
+            for name, pct in zip(AR_BUCKETS, m["bucket_pct"])
         },
         "top_overdue_accounts": [
             {"customer": "BuildRight Corp",  "amount": 18500, "days_outstanding": 97},
@@ -396,3 +814,16 @@ def _get_accounts_receivable(client_name: str) -> dict:
             "AR days of 52 vs AP days of 31 = negative cash conversion cycle gap",
         ],
     }
+
+
+# =============================================================================
+# DISPATCH TABLE — tool name → implementation (sync or async def)
+# =============================================================================
+
+TOOL_DISPATCH = {
+    "get_revenue_data": _get_revenue_data,
+    "get_expense_breakdown": _get_expense_breakdown,
+    "get_cash_flow_statement": _get_cash_flow_statement,
+    "get_key_metrics": _get_key_metrics,
+    "get_accounts_receivable": _get_accounts_receivable,
+}
@@ -0,0 +1,215 @@
+"""
+tracing.py — Per-iteration latency and token trace for agent runs
+==================================================================
+
+WHAT THIS FILE DOES:
+    Records one structured entry per agent-loop iteration:
+        - API latency (and time to first token when streaming)
+        - usage: input, output, cache read, cache write tokens
+        - stop_reason and model
+        - wall time of every tool call in the turn
+    plus run totals. The trace comes back with the result
+    (run_agent(..., return_trace=True)) and is stored on agent_server jobs.
+
+WHY:
+    A run takes 30–60 seconds and print() lines don't say where it goes.
+    With a trace per run you can see it: "iteration 3 spent 14s in the API,
+    tools took 0.2s, cache read 2.1K tokens" — and spot regressions by
+    comparing traces across deploys.
+"""
+
+import time
+from typing import Optional
+
+from prompt_cache import usage_stats
+
+# USD per million tokens: (input, output). Used for per-tier cost in the trace.
+# Cache reads bill at 10% of input, cache writes at 125%.
+MODEL_PRICING = {
+    "claude-sonnet-4-6": (3.00, 15.00),
+    "claude-haiku-4-5-20251001": (1.00, 5.00),
+}
+CACHE_READ_MULTIPLIER = 0.10
+CACHE_WRITE_MULTIPLIER = 1.25
+
+TOKEN_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def estimate_cost(model: str, tokens: dict) -> Optional[float]:
+    """USD cost of one call's token counts at `model` prices (None if unpriced)."""
+    if model not in MODEL_PRICING:
+        return None
+    input_price, output_price = MODEL_PRICING[model]
+    cost = (
+        tokens["input_tokens"] * input_price
+        + tokens["cache_read_input_tokens"] * input_price * CACHE_READ_MULTIPLIER
+        + tokens["cache_creation_input_tokens"] * input_price * CACHE_WRITE_MULTIPLIER
+        + tokens["output_tokens"] * output_price
+    )
+    return cost / 1_000_000
+
+
+class RunTrace:
+    """
+    Collects the trace for one agent run.
+
+    Usage (inside the agent loop):
+        trace = RunTrace(client_name, mode)
+        record = trace.start_iteration(iteration, model)
+        ... call API ...
+        trace.record_response(record, response, latency_seconds)
+        ... each tool ...
+        trace.record_tool(record, name, tool_use_id, wall_seconds, is_error)
+        trace.finish("completed")
+        trace.to_dict()
+    """
+
+    def __init__(self, client_name: str, mode: str, primary_model: Optional[str] = None):
+        self.client_name = client_name
+        self.mode = mode
+        self.primary_model = primary_model  # The strong model — baseline for "saved"
+        self.status = "running"
+        self.iterations: list[dict] = []
+        self.history_tokens_saved = 0
+        self.resumed_from: Optional[int] = None  # Checkpoint iteration this run resumed from
+        self._started = time.monotonic()
+        self._finished: Optional[float] = None
+
+    def start_iteration(self, iteration: int, model: str) -> dict:
+        record = {
+            "iteration": iteration,
+            "model": model,
+            "api_latency_ms": None,
+            "ttft_ms": None,
+            "stop_reason": None,
+            **{name: 0 for name in TOKEN_FIELDS},
+            "tools": [],
+            "tool_wall_ms": 0.0,
+            "discarded": False,  # True when a cascade escalation threw this call away
+        }
+        self.iterations.append(record)
+        return record
+
+    def record_response(
+        self,
+        record: dict,
+        response,
+        latency_s: float,
+        ttft_s: Optional[float] = None,
+    ):
+        record["api_latency_ms"] = _ms(latency_s)
+        if ttft_s is not None:
+            record["ttft_ms"] = _ms(ttft_s)
+        record["stop_reason"] = response.stop_reason
+        record.update(usage_stats(response.usage))
+
+    def record_tool(
+        self,
+        record: dict,
+        name: str,
+        tool_use_id: str,
+        wall_s: float,
+        is_error: bool = False,
+    ):
+        record["tools"].append({
+            "name": name,
+            "tool_use_id": tool_use_id,
+            "wall_ms": _ms(wall_s),
+            "is_error": is_error,
+        })
+
+    def record_tool_turn(self, record: dict, wall_s: float):
+        """Wall time for the whole tool turn (concurrent tools overlap)."""
+        record["tool_wall_ms"] = _ms(wall_s)
+
+    def restore(self, iterations: list[dict], history_tokens_saved: int, resumed_from: int):
+        """Carry the records from before a checkpoint into a resumed run."""
+        self.iterations = list(iterations)
+        self.history_tokens_saved = history_tokens_saved
+        self.resumed_from = resumed_from
+
+    def finish(self, status: str = "completed"):
+        self.status = status
+        self._finished = time.monotonic()
+
+    def to_dict(self) -> dict:
+        end = self._finished if self._finished is not None else time.monotonic()
+        totals = {name: sum(r[name] for r in self.iterations) for name in TOKEN_FIELDS}
+        totals["api_latency_ms"] = round(
+            sum(r["api_latency_ms"] or 0 for r in self.iterations), 1
+        )
+        totals["tool_wall_ms"] = round(sum(r["tool_wall_ms"] for r in self.iterations), 1)
+        return {
+            "client_name": self.client_name,
+            "mode": self.mode,
+            "status": self.status,
+            "total_ms": _ms(end - self._started),
+            "iterations": self.iterations,
+            "totals": totals,
+            "history_tokens_saved": self.history_tokens_saved,
+            "resumed_from": self.resumed_from,
+            "tiers": self._tier_stats(),
+        }
+
+    def _tier_stats(self) -> dict:
+        """
+        Per-model rollup: calls, latency, tokens, cost.
+
+        For every tier other than primary_model it also estimates what was saved:
+            cost_saved_usd        — same tokens billed at primary prices, minus actual
+            latency_saved_ms_est  — (avg primary call − avg tier call) × tier calls,
+                                    only when both tiers ran in this run
+        Calls discarded by an escalation count as waste, not savings.
+        """
+        tiers: dict[str, dict] = {}
+        for record in self.iterations:
+            if record["api_latency_ms"] is None:
+                continue  # prefetch pseudo-iteration — no model call
+            tier = tiers.setdefault(record["model"], {
+                "calls": 0,
+                "discarded_calls": 0,
+                "api_latency_ms": 0.0,
+                **{name: 0 for name in TOKEN_FIELDS},
+                "cost_usd": 0.0,
+                "_kept_cost_at_primary": 0.0,
+                "_kept_cost": 0.0,
+                "_kept_calls": 0,
+            })
+            cost = estimate_cost(record["model"], record) or 0.0
+            tier["calls"] += 1
+            tier["api_latency_ms"] += record["api_latency_ms"]
+            tier["cost_usd"] += cost
+            for name in TOKEN_FIELDS:
+                tier[name] += record[name]
+            if record["discarded"]:
+                tier["discarded_calls"] += 1
+            else:
+                tier["_kept_calls"] += 1
+                tier["_kept_cost"] += cost
+                tier["_kept_cost_at_primary"] += estimate_cost(self.primary_model, record) or 0.0
+
+        primary = tiers.get(self.primary_model)
+        primary_avg_ms = primary["api_latency_ms"] / primary["calls"] if primary else None
+
+        for model, tier in tiers.items():
+            tier["avg_latency_ms"] = round(tier["api_latency_ms"] / tier["calls"], 1)
+            tier["api_latency_ms"] = round(tier["api_latency_ms"], 1)
+            tier["cost_usd"] = round(tier["cost_usd"], 6)
+            if self.primary_model and model != self.primary_model:
+                tier["cost_saved_usd"] = round(tier["_kept_cost_at_primary"] - tier["_kept_cost"], 6)
+                tier["latency_saved_ms_est"] = (
+                    round((primary_avg_ms - tier["avg_latency_ms"]) * tier["_kept_calls"], 1)
+                    if primary_avg_ms is not None else None
+                )
+            for key in ("_kept_cost_at_primary", "_kept_cost", "_kept_calls"):
+                del tier[key]
+        return tiers
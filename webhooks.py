@@ -0,0 +1,258 @@
+"""
+webhooks.py — Completion callbacks for agent_server jobs
+=========================================================
+
+WHAT THIS FILE DOES:
+    A submission can carry a callback_url. When its job finishes (completed,
+    failed or cancelled), the server POSTs the same JSON that GET /jobs/{id}
+    returns to that URL — the integration gets the report without polling.
+
+WHY A DURABLE QUEUE:
+    Receivers go down, deploys restart the server, and a POST fired straight
+    from the finishing job would be lost either way. Every callback is a row
+    in the job store's webhooks table (job_store.py) from the moment it is
+    registered, and stays there until it is delivered or gives up. Any
+    server/worker process can deliver it — they claim rows with a lease.
+
+RETRIES:
+    Network errors, timeouts, 5xx, 408 and 429 are retried with exponential
+    backoff: ~10s, 20s, 40s ... capped at an hour, jittered so a receiver that
+    comes back isn't hit by every retry at once. After WEBHOOK_MAX_ATTEMPTS
+    the delivery is marked failed. Other 4xx and redirects fail at once —
+    retrying won't change the answer.
+
+CONCURRENCY:
+    At most WEBHOOK_CONCURRENCY deliveries per process are in flight, and at
+    most WEBHOOK_HOST_CONCURRENCY to any one host, so one slow receiver
+    can't take every slot or get flooded after an outage.
+
+RECEIVING:
+    Delivery is at-least-once. Each POST carries X-Webhook-Delivery (stable
+    across retries) and X-Job-Id — dedupe on those. Answer with any 2xx.
+
+STATS:
+    Every attempt is recorded on its row: attempts, last error, the POST's
+    duration and the lag from job completion to delivery. stats() summarizes
+    them — agent_server serves it at GET /webhooks/stats.
+"""
+
+import asyncio
+import http.client
+import json
+import logging
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from tool_stats import percentile
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Attempts before a delivery is marked failed (~21 minutes of retries at 8)
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+
+# Deliveries in flight per process, and per receiving host
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "4"))
+WEBHOOK_HOST_CONCURRENCY = 2
+
+WEBHOOK_TIMEOUT_SECONDS = 10
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+
+# A claimed delivery is hidden from other processes this long — longer than
+# the worst wait for a host slot plus the POST itself
+LEASE_SECONDS = 120
+
+# Due deliveries are looked for this often; a job finishing in this process wakes the loop at once
+POLL_SECONDS = 2.0
+
+
+class WebhookError(Exception):
+    """One failed POST. retryable=False means trying again won't help."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """urllib turns a redirected POST into a GET without the body — report the redirect instead."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Wait after the `attempts`-th failure: doubling from BACKOFF_BASE_SECONDS, capped, jittered."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def post_json(url: str, payload: dict, delivery_id: int, timeout: float = WEBHOOK_TIMEOUT_SECONDS) -> int:
+    """POST payload as JSON. Returns the 2xx status; raises WebhookError otherwise."""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        method="POST",
+        headers={
+            "Content-Type": "application/json",
+            "User-Agent": "bellissimo-agent-server",
+            "X-Webhook-Delivery": str(delivery_id),
+            "X-Job-Id": payload["job_id"],
+        },
+    )
+    try:
+        with _opener.open(request, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        raise WebhookError(f"HTTP {e.code}", retryable=e.code >= 500 or e.code in (408, 429)) from e
+    except (urllib.error.URLError, OSError) as e:  # Refused, DNS, TLS, timeout
+        raise WebhookError(str(getattr(e, "reason", e)) or type(e).__name__) from e
+    except http.client.HTTPException as e:  # Malformed or truncated response
+        raise WebhookError(f"{type(e).__name__}: {str(e).strip()}".rstrip(": ")) from e
+
+
+def _lag_ms(completed_at: Optional[str], registered_at: float) -> Optional[float]:
+    """Job completion → now. A callback registered after the job finished counts from registration."""
+    if not completed_at:
+        return None
+    since = max(datetime.fromisoformat(completed_at).timestamp(), registered_at)
+    return round((time.time() - since) * 1000, 1)
+
+
+class WebhookDispatcher:
+    """
+    Delivers due webhooks from the job store until cancelled.
+
+    Args:
+        store:       the job store (job_store.JobStore) holding the webhooks table.
+        payload_for: finished job record → the JSON body to POST.
+    """
+
+    def __init__(self, store, payload_for: Callable[[dict], dict]):
+        self.store = store
+        self.payload_for = payload_for
+        self._wake = asyncio.Event()
+        self._in_flight: set[asyncio.Task] = set()
+        # Receiving host → (its slot semaphore, deliveries using or waiting on it).
+        # Dropped when the count hits 0, so the dict only holds hosts in use
+        self._hosts: dict[str, tuple[asyncio.Semaphore, int]] = {}
+
+    def notify(self):
+        """A job finished (or a callback was registered on a finished one) — look now, not at the next poll."""
+        self._wake.set()
+
+    async def run(self):
+        try:
+            while True:
+                free = WEBHOOK_CONCURRENCY - len(self._in_flight)
+                due = self.store.claim_webhooks(free, LEASE_SECONDS) if free > 0 else []
+                for delivery in due:
+                    task = asyncio.create_task(self._deliver(delivery))
+                    self._in_flight.add(task)
+                    task.add_done_callback(self._finished)
+                # Nothing more is due, or every slot is busy — a finishing delivery wakes us early
+                await self._wait(POLL_SECONDS)
+        finally:
+            # Unfinished deliveries keep their lease and come due again after it
+            for task in self._in_flight:
+                task.cancel()
+
+    def _finished(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        self._wake.set()  # A slot opened up
+        if not task.cancelled() and task.exception() is not None:
+            # Not a failed POST (those are recorded) — the lease expires and it is retried
+            logger.error("webhook delivery crashed", exc_info=task.exception())
+
+    async def _wait(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _deliver(self, delivery: dict):
+        delivery_id, url = delivery["delivery_id"], delivery["url"]
+        record = self.store.get(delivery["job_id"])
+        if record is None:
+            self.store.finish_webhook(delivery_id, request_ms=0.0, error="Job no longer stored")
+            return
+
+        host = urlsplit(url).netloc
+        slot, users = self._hosts.get(host, (None, 0))
+        slot = slot or asyncio.Semaphore(WEBHOOK_HOST_CONCURRENCY)
+        self._hosts[host] = (slot, users + 1)
+        try:
+            async with slot:
+                started = time.monotonic()
+                try:
+                    await asyncio.to_thread(post_json, url, self.payload_for(record), delivery_id)
+                    error = None
+                except WebhookError as e:
+                    error, retryable = str(e), e.retryable
+                request_ms = round((time.monotonic() - started) * 1000, 1)
+        finally:
+            users = self._hosts[host][1] - 1
+            if users:
+                self._hosts[host] = (slot, users)
+            else:
+                del self._hosts[host]
+
+        attempts = delivery["attempts"] + 1
+        if error is None:
+            lag_ms = _lag_ms(record["completed_at"], delivery["created_at"])
+            self.store.finish_webhook(delivery_id, request_ms=request_ms, lag_ms=lag_ms)
+            logger.info("webhook %s for %s delivered to %s (%.0f ms after completion)",
+                        delivery_id, record["job_id"], host, lag_ms or 0)
+            return
+
+        retry_at = None
+        if retryable and attempts < WEBHOOK_MAX_ATTEMPTS:
+            retry_at = time.time() + backoff_seconds(attempts)
+        self.store.finish_webhook(delivery_id, request_ms=request_ms, error=error, retry_at=retry_at)
+        logger.warning("webhook %s for %s to %s failed (attempt %d): %s%s",
+                       delivery_id, record["job_id"], host, attempts, error,
+                       "" if retry_at else " — giving up")
+
+
+def stats(store, sample: int = 1000) -> dict:
+    """
+    Delivery counts plus latency over the newest `sample` successful deliveries.
+
+    {"deliveries": {"pending": 2, "delivered": 40, "failed": 1, "failed_attempts": 5},
+     "latency_ms": {"request": {"p50": ..}, "after_completion": {"p50": ..}},
+     "retried": 3, "samples": 40}
+    """
+    recent = store.recent_deliveries(sample)
+
+    def summary(values: list[float]) -> dict:
+        values = sorted(values)
+        return {
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": values[-1] if values else 0.0,
+        }
+
+    return {
+        "deliveries": store.webhook_counts(),
+        "latency_ms": {
+            "request": summary([d["request_ms"] for d in recent if d["request_ms"] is not None]),
+            "after_completion": summary([d["lag_ms"] for d in recent if d["lag_ms"] is not None]),
+        },
+        "retried": sum(1 for d in recent if d["attempts"] > 1),
+        "samples": len(recent),
+    }